@@ -0,0 +1,123 @@
+################### IMPORTS ######################
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from main import build_best_price_table, clean_price, mark_best_prices
+
+# Best-price stage (mark_best_prices + build_best_price_table) on a synthetic catalog.
+#   python -m benchmarks.bench_best_prices [--rows N] [--check-rows N] [--seed N]
+# The row-by-row implementation it replaced is kept below as the reference: outputs are
+# compared as CSV text on a catalog small enough for it, then the new stage is timed at --rows.
+
+SOURCES = ["Mainstreet", "Crepdogcrew", "Hypefly", "Culture-circle"]
+SIZES = [f"UK {n / 2:g}" for n in range(6, 28)] + ["EU 42", "US 9", "N/A"]
+
+################### REFERENCE ######################
+
+def legacy_mark_best_prices(new_df):
+    new_df['price_numeric'] = new_df['price'].apply(clean_price)
+    new_df['is_best_price'] = False
+    for (product_no, size), group in new_df.groupby(['product_no', 'size']):
+        if size in ['N/A', 'Error', ''] or group['price_numeric'].isna().all():
+            continue
+        min_price = group['price_numeric'].min()
+        if min_price == float('inf'):
+            continue
+        new_df.loc[(new_df['product_no'] == product_no) &
+                   (new_df['size'] == size) &
+                   (new_df['price_numeric'] == min_price), 'is_best_price'] = True
+    return new_df.drop(columns=['price_numeric'])
+
+
+def legacy_build_best_price_table(new_df):
+    best_price_rows = new_df[new_df['is_best_price'] == True]
+    best_price_rows = best_price_rows.drop(columns=['is_best_price'])
+    best_price_rows.rename(columns={'price': 'best_price', 'source': 'best_seller'}, inplace=True)
+    companies = [f"{company}_price" for company in new_df['source'].unique().tolist()]
+    for company in companies:
+        best_price_rows[company] = '-'
+    for index, row in best_price_rows.iterrows():
+        matching_rows = new_df[(new_df['product_no'] == row['product_no']) & (new_df['size'] == row['size'])]
+        for _, match_row in matching_rows.iterrows():
+            source_column = f"{match_row['source']}_price"
+            if source_column in companies:
+                best_price_rows.at[index, source_column] = match_row['price']
+    columns = ['product_no', 'title', 'url', 'size'] + companies + ['best_price', 'best_seller', 'description', 'sku', 'images']
+    return best_price_rows[columns]
+
+################### SYNTHETIC CATALOG ######################
+
+def price_text(rng, value):
+    # The formats the stores produce, plus the failure values the scrapers write
+    roll = rng.random()
+    if roll < 0.03:
+        return "N/A"
+    if roll < 0.05:
+        return "Error"
+    if roll < 0.5:
+        return f"Rs. {value:,.2f}"
+    return f"Rs. {value:,.0f}"
+
+
+def catalog(rows, seed=0) -> pd.DataFrame:
+    # product_no blocks of every source listing a random subset of sizes, prices close enough to tie
+    rng = np.random.default_rng(seed)
+    records, product_no = [], 0
+    while len(records) < rows:
+        product_no += 1
+        base = int(rng.integers(50, 400)) * 100 - 1
+        for source in SOURCES:
+            if rng.random() < 0.1:
+                continue  # not every store carries every product
+            title = f"Sneaker {product_no} ({source})"
+            for size in rng.choice(SIZES, size=int(rng.integers(1, 12)), replace=False):
+                price = price_text(rng, base + int(rng.integers(0, 4)) * 500)
+                records.append({
+                    "product_no": product_no,
+                    "title": title,
+                    "url": f"https://{source.lower()}.example/products/{product_no}",
+                    "size": size,
+                    "price": price,
+                    "description": "N/A",
+                    "sku": "N/A",
+                    "images": "N/A",
+                    "source": source,
+                })
+                if rng.random() < 0.01:
+                    records.append(dict(records[-1], price=price_text(rng, base)))  # a repeated listing
+    return pd.DataFrame(records[:rows])
+
+
+def run_stage(mark, build, df):
+    start = time.perf_counter()
+    marked = mark(df.copy())
+    table = build(marked)
+    return marked, table, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=120_000)
+    parser.add_argument("--check-rows", type=int, default=4_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    small = catalog(args.check_rows, args.seed)
+    legacy = run_stage(legacy_mark_best_prices, legacy_build_best_price_table, small)
+    current = run_stage(mark_best_prices, build_best_price_table, small)
+    identical = all(a.to_csv(index=False) == b.to_csv(index=False) for a, b in zip(legacy[:2], current[:2]))
+    print(f"{args.check_rows:>8} rows  row-by-row {legacy[2]:8.2f}s  vectorized {current[2]:8.3f}s  "
+          f"speedup {legacy[2] / current[2]:6.0f}x  identical CSVs: {identical}")
+
+    large = catalog(args.rows, args.seed)
+    marked, table, elapsed = run_stage(mark_best_prices, build_best_price_table, large)
+    print(f"{args.rows:>8} rows  vectorized {elapsed:8.3f}s  "
+          f"({int(marked['is_best_price'].sum())} best-price rows, {len(table)} table rows)")
+    if not identical:
+        raise SystemExit("OUTPUT MISMATCH against the row-by-row implementation")
+
+
+if __name__ == "__main__":
+    main()
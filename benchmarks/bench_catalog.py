@@ -0,0 +1,77 @@
+################### IMPORTS ######################
+
+import argparse
+import os
+import tempfile
+import time
+import pandas as pd
+from catalog import materialize, memory_report, split_rows
+from normalize import normalize_frame
+from output_sink import HAS_PYARROW, TASK_COLUMN
+
+# Memory and output size of flat rows against the product and variant tables, on
+# DATA_ANALYSIS_1.csv tiled to a larger catalog (each copy a new set of product URLs).
+#   python -m benchmarks.bench_catalog [--copies N]
+
+SOURCE_CSV = "DATA_ANALYSIS_1.csv"
+
+################### CATALOG ######################
+
+def synthetic_catalog(copies) -> pd.DataFrame:
+    # The scraped rows as the output sink receives them, with one task per URL of every copy
+    df = normalize_frame(pd.read_csv(SOURCE_CSV, keep_default_na=False))
+    tasks = (df["url"] != df["url"].shift()).cumsum() - 1
+    frames = []
+    for copy in range(copies):
+        frame = df.copy()
+        frame["url"] = frame["url"] + f"#{copy}"
+        frame[TASK_COLUMN] = tasks + copy * (tasks.iloc[-1] + 1)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def file_sizes_mb(flat, products, variants) -> dict:
+    # Bytes on disk per format: the flat rows in one file against the two tables
+    sizes = {}
+    with tempfile.TemporaryDirectory() as directory:
+        writers = {"csv": lambda frame, path: frame.to_csv(path, index=False)}
+        if HAS_PYARROW:
+            writers["parquet"] = lambda frame, path: frame.to_parquet(path, index=False)
+        for name, write in writers.items():
+            paths = [os.path.join(directory, f"{table}.{name}") for table in ("flat", "products", "variants")]
+            for frame, path in zip((flat, products, variants), paths):
+                write(frame, path)
+            flat_mb, products_mb, variants_mb = (os.path.getsize(path) / 1024 ** 2 for path in paths)
+            sizes[name] = {"flat_mb": round(flat_mb, 2), "tables_mb": round(products_mb + variants_mb, 2)}
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=2000)
+    args = parser.parse_args()
+
+    flat = synthetic_catalog(args.copies)
+    print(f"{len(flat)} rows ({args.copies} copies of {SOURCE_CSV})")
+
+    start = time.perf_counter()
+    products, variants = split_rows(flat, TASK_COLUMN)
+    split_s = time.perf_counter() - start
+    start = time.perf_counter()
+    view = materialize(products, variants, TASK_COLUMN)
+    materialize_s = time.perf_counter() - start
+
+    report = memory_report(flat, products, variants)
+    tables_mb = report["products_mb"] + report["variants_mb"]
+    print(f"\n{'':<22} {'MB':>9}")
+    print(f"{'flat rows':<22} {report['flat_mb']:>9.1f}")
+    print(f"{'products + variants':<22} {tables_mb:>9.1f}  ({report['products']} products, saving {report['saving']:.0%})")
+    print("flat MB by column: " + ", ".join(f"{column} {mb}" for column, mb in report["by_column_mb"].items()))
+    for name, sizes in file_sizes_mb(flat, products, variants).items():
+        print(f"{name} on disk: flat {sizes['flat_mb']} MB, tables {sizes['tables_mb']} MB")
+    print(f"\nsplit {split_s:.3f}s, materialize {materialize_s:.3f}s")
+    print(f"materialized view identical to the flat rows: {view[flat.columns].astype(object).equals(flat.astype(object))}")
+
+
+if __name__ == "__main__":
+    main()
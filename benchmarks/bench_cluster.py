@@ -0,0 +1,118 @@
+################### IMPORTS ######################
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import pandas as pd
+from cluster import Coordinator, FileBroker, LocalBroker, Worker
+from job_queue import JobQueue
+from main import JOBS_PER_DOMAIN, ScrapeTask, sink_rows
+from output_sink import OutputSink
+
+# Coordinator/worker scraping on a synthetic link sheet in which one store is much slower than
+# the others, with and without work stealing.
+#   python -m benchmarks.bench_cluster [--rows N] [--workers N] [--latency S] [--slow-factor F]
+# Pages are simulated by sleeping for the store's latency. Each store's jobs are sharded to one
+# worker, so without stealing the run lasts as long as the slow store's shard; with it, the
+# workers that finish their own shards take the slow store's remaining jobs. The coordinator
+# drains a real JobQueue into a real OutputSink.
+
+STORES = {
+    "mainstreet": "https://marketplace.mainstreet.co.in/products/",
+    "crepdogcrew": "https://crepdogcrew.com/products/",
+    "hypefly": "https://hypefly.co.in/products/",
+    "culture-circle": "https://www.culture-circle.com/products/all/",
+}
+SLOW_STORE = "hypefly"
+SIZES = ["UK 7", "UK 8", "UK 9", "UK 10"]
+
+################### SYNTHETIC SCRAPE ######################
+
+class SimulatedScrape:
+    # Stands in for main.scrape_cluster_job: sleeps for the store's latency and returns a page's
+    # rows ready for the sink
+    def __init__(self, latency, slow_factor):
+        self.latency = latency
+        self.slow_factor = slow_factor
+
+    def __call__(self, job):
+        time.sleep(self.latency * (self.slow_factor if SLOW_STORE in job.url else 1))
+        product = job.url.rsplit("/", 1)[-1]
+        rows = pd.DataFrame({"title": f"Sneaker {product}", "url": job.url, "size": SIZES,
+                             "price": [f"Rs. {9000 + 100 * i:,}" for i in range(len(SIZES))],
+                             "description": "N/A", "sku": "N/A", "images": "N/A"})
+        return sink_rows(ScrapeTask(job.row, job.column, job.url), rows), None
+
+
+def finish(queue, sink, job, rows, failure):
+    # main.finish_rows without the per-URL output
+    queue.complete(job)
+    sink.append(job.task, job.url, rows)
+
+################### MEASUREMENT ######################
+
+def run(mode, steal, args, directory) -> Coordinator:
+    sink = OutputSink(os.path.join(directory, "run"))
+    urls = [f"{base}{row}" for row in range(args.rows) for base in STORES.values()]
+    sink.open(urls)
+    queue = JobQueue(os.path.join(directory, "queue.sqlite"))
+    for task, url in enumerate(urls):
+        queue.enqueue(task, url, task // len(STORES), list(STORES)[task % len(STORES)])
+    scrape = SimulatedScrape(args.latency, args.slow_factor)
+
+    if mode == "threads":
+        broker = LocalBroker(steal=steal)
+        workers = [Worker(broker, scrape).start() for _ in range(args.workers)]
+    else:
+        broker = FileBroker(os.path.join(directory, "broker"), steal=steal)
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=Worker(broker, scrape, name=f"worker-{i}").run) for i in range(args.workers)]
+        for worker in workers:
+            worker.start()
+        while len(broker.workers()) < args.workers:
+            time.sleep(0.05)
+    coordinator = Coordinator(broker, JOBS_PER_DOMAIN)
+    coordinator.run(queue, sink, finish, args.workers)
+    for worker in workers:
+        worker.join()
+    stored = sink.metrics()["rows"]
+    queue.close()
+    sink.remove()
+    assert stored == len(urls) * len(SIZES), f"{stored} rows stored, expected {len(urls) * len(SIZES)}"
+    return coordinator
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=30, help="link sheet rows, one URL per store each")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per page on the fast stores")
+    parser.add_argument("--slow-factor", type=float, default=5.0, help=f"how much slower {SLOW_STORE} is")
+    args = parser.parse_args()
+
+    jobs = args.rows * len(STORES)
+    work = args.rows * args.latency * (len(STORES) - 1 + args.slow_factor)
+    print(f"{jobs} jobs on {len(STORES)} stores, {work:.1f}s of simulated page time; "
+          f"{args.workers} workers could finish in {work / args.workers:.1f}s at best")
+    print(f"\n{'broker':<18} {'stealing':<9} {'seconds':>8} {'jobs/min':>9} {'stolen':>7}")
+    reports = {}
+    for mode in ("threads", "processes"):
+        for steal in (False, True):
+            with tempfile.TemporaryDirectory() as directory:
+                coordinator = run(mode, steal, args, directory)
+            seconds = coordinator.stats["seconds"]
+            report = coordinator.worker_report()
+            label = "LocalBroker" if mode == "threads" else "FileBroker"
+            print(f"{label:<18} {'on' if steal else 'off':<9} {seconds:>8.2f} {jobs * 60 / seconds:>9.0f} "
+                  f"{report['stolen'].sum():>7}")
+            reports[(label, steal)] = report
+    print("\nper worker, FileBroker with stealing:")
+    print(reports[("FileBroker", True)].to_string(index=False))
+    print("\nper worker, FileBroker without stealing:")
+    print(reports[("FileBroker", False)].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+################### IMPORTS ######################
+
+import argparse
+import statistics
+import time
+from benchmarks.fixture_server import serve
+from benchmarks.saved_pages import load_pages, write_pages
+from html_parser import make_soup
+from embedded_state import parse_embedded_state, scrape_culture_circle_state
+from main import parse_culture_circle_page, scrape_culture_circle_product
+from rate_limiter import RATE_LIMITER
+
+# Embedded-state extraction vs the DOM path on saved culture-circle pages.
+#   python -m benchmarks.bench_culture_circle [--repeat N] [--browser]
+
+COMPARED_COLUMNS = ["title", "size", "price", "images"]
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def main():
+    # The fixture server is local: politeness delays would only be measured as latency
+    RATE_LIMITER.enabled = False
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--browser", action="store_true", help="also time the Selenium path (needs Chrome)")
+    args = parser.parse_args()
+
+    write_pages()
+    pages = load_pages("culture-circle")
+    routes = {f"/products/all/{handle}": ("text/html; charset=utf-8", page.encode("utf-8")) for handle, page in pages.items()}
+
+    print(f"{'page':<40} {'KB':>6} {'dom parse ms':>13} {'state parse ms':>15} {'state fetch ms':>15} {'browser ms':>11}  same")
+    with serve(routes) as server:
+        for handle, page in pages.items():
+            url = f"{server.base_url}/products/all/{handle}"
+            dom_df, dom_ms = timed(lambda: parse_culture_circle_page(make_soup(page, "culture-circle"), url), args.repeat)
+            state_df, state_ms = timed(lambda: parse_embedded_state(page, url), args.repeat)
+            _, fetch_ms = timed(lambda: scrape_culture_circle_state(url), args.repeat)
+            browser_ms = "-"
+            if args.browser:
+                _, browser = timed(lambda: scrape_culture_circle_product(url), 1)
+                browser_ms = f"{browser:.0f}"
+            same = dom_df[COMPARED_COLUMNS].equals(state_df[COMPARED_COLUMNS])
+            print(f"{handle[:40]:<40} {len(page) / 1024:>6.0f} {dom_ms:>13.2f} {state_ms:>15.2f} {fetch_ms:>15.2f} {browser_ms:>11}  {same}")
+
+
+if __name__ == "__main__":
+    main()
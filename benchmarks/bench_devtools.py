@@ -0,0 +1,125 @@
+################### IMPORTS ######################
+
+import argparse
+import asyncio
+import threading
+import time
+from benchmarks.bench_scrapers import RssSampler
+from rate_limiter import RATE_LIMITER
+from benchmarks.fixture_server import mount_sites, serve, site_routes, site_urls
+
+# One browser per concurrent URL (the pooled Selenium scrapers) against many tabs of one browser.
+#   python -m benchmarks.bench_devtools [--concurrency N] [--repeat N]
+# Both modes scrape the fixture pages in the browser (no fast paths). Needs Chrome, and psutil
+# for the Chrome memory figures.
+
+
+def jobs(urls, repeat) -> list:
+    return [(site, url) for _ in range(repeat) for site, site_urls_ in urls.items() for url in site_urls_]
+
+
+class Sampling:
+    # Samples child-process RSS every 100ms while a run is in progress
+    def __init__(self, sampler):
+        self.sampler = sampler
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        def loop():
+            while not self._stop.wait(0.1):
+                self.sampler.sample()
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def bench_browsers(work, concurrency) -> dict:
+    import main
+    from orchestrator import ConcurrentScraper, ScrapeTask
+    scrapers = {
+        "mainstreet": main.scrape_mainstreet_product,
+        "crepdogcrew": main.scrape_crepdogcrew_product,
+        "hypefly": main.scrape_hypefly_product,
+        "culture-circle": main.scrape_culture_circle_product,
+    }
+    tasks = [ScrapeTask(i, site, url) for i, (site, url) in enumerate(work)]
+    # Every fixture URL is on one host, so lift the per-domain cap to the concurrency under test
+    executor = ConcurrentScraper(lambda url: scrapers[next(s for s in scrapers if s in url)](url),
+                                 max_workers=concurrency, default_limit=concurrency)
+    main.DRIVER_POOL.max_idle = concurrency
+    sampler = RssSampler()
+    start = time.perf_counter()
+    with Sampling(sampler):
+        failures = sum(1 for result in executor.run(tasks) if result.error is not None)
+    elapsed = time.perf_counter() - start
+    main.DRIVER_POOL.close()
+    return report("browser per URL", work, elapsed, failures, sampler, concurrency)
+
+
+def bench_tabs(work, concurrency) -> dict:
+    import main
+    from devtools import DevToolsBrowser
+    sampler = RssSampler()
+
+    async def run():
+        browser = await DevToolsBrowser(concurrency).start()
+
+        async def scrape(site, url):
+            try:
+                async with browser.tab(site) as tab:
+                    await main.TAB_SCRAPERS[site](tab, url)
+                return 0
+            except Exception as e:
+                print(f"[ERROR] {site} {url}: {e}")
+                return 1
+
+        try:
+            return sum(await asyncio.gather(*(scrape(site, url) for site, url in work))), browser.metrics()
+        finally:
+            await browser.close()
+
+    start = time.perf_counter()
+    with Sampling(sampler):
+        failures, metrics = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    result = report("tabs in one browser", work, elapsed, failures, sampler, concurrency)
+    result["tab_heap_mb"] = {"avg": metrics["avg_tab_heap_mb"], "max": metrics["max_tab_heap_mb"]}
+    return result
+
+
+def report(mode, work, elapsed, failures, sampler, concurrency) -> dict:
+    memory = sampler.report()
+    result = {
+        "mode": mode,
+        "seconds": round(elapsed, 2),
+        "products_per_min": round(len(work) / (elapsed / 60), 1),
+        "failures": failures,
+    }
+    if "peak_children_rss_mb" in memory:
+        result["chrome_rss_mb"] = memory["peak_children_rss_mb"]
+        result["rss_per_concurrent_page_mb"] = round(memory["peak_children_rss_mb"] / concurrency, 1)
+    return result
+
+
+def main():
+    # The fixture server is local: politeness delays would only be measured as latency
+    RATE_LIMITER.enabled = False
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    with serve(site_routes()) as server:
+        mount_sites(server.base_url)
+        work = jobs(site_urls(server.base_url, server.routes), args.repeat)
+        print(f"{len(work)} product pages, {args.concurrency} at a time")
+        for result in (bench_browsers(work, args.concurrency), bench_tabs(work, args.concurrency)):
+            print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+################### IMPORTS ######################
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+from crawler import SHOPIFY_PAGE_SIZE, DiscoveryCrawler, Frontier, canonical_url
+from rate_limiter import RATE_LIMITER
+from benchmarks.fixture_server import SITE_PATHS, mount_sites, serve, site_routes
+
+# Discovery benchmark against a synthetic catalog on the local fixture server.
+#   python -m benchmarks.bench_discovery [--products N] [--pipeline]
+# The streaming crawler (Bloom-filter frontier) is compared with fetching every page first
+# and deduplicating the collected list with pandas. --pipeline runs main.main(seeds=...)
+# over a feed of the saved product pages.
+
+LISTING_PAGE_SIZE = 48
+TRENDING_LINKS = 8   # products every listing page links to again in its "trending" strip
+
+################### FIXTURE CATALOG ######################
+
+def feed_routes(prefix, collection, handles) -> dict:
+    # Shopify products.json pages for one collection, plus the empty page after the last full one
+    routes = {}
+    for page in range(len(handles) // SHOPIFY_PAGE_SIZE + 1):
+        products = [{"handle": handle} for handle in handles[page * SHOPIFY_PAGE_SIZE:(page + 1) * SHOPIFY_PAGE_SIZE]]
+        path = f"{prefix}/collections/{collection}/products.json?limit={SHOPIFY_PAGE_SIZE}&page={page + 1}"
+        routes[path] = ("application/json", json.dumps({"products": products}).encode("utf-8"))
+    return routes
+
+
+def listing_routes(prefix, collection, handles) -> dict:
+    # HTML listing pages with rel=next links, a trending strip of repeated products and
+    # links to each product under its collection path as well as the plain one
+    pages = [handles[start:start + LISTING_PAGE_SIZE] for start in range(0, len(handles), LISTING_PAGE_SIZE)]
+    trending = handles[:TRENDING_LINKS]
+    routes = {}
+    for number, page in enumerate(pages, start=1):
+        links = [f'<a href="{prefix}/collections/{collection}/products/{handle}"><img alt="{handle}"></a>'
+                 f'<a href="{prefix}/products/{handle}?variant=1">{handle}</a>' for handle in page]
+        links += [f'<a href="{prefix}/products/{handle}">trending</a>' for handle in trending]
+        if number < len(pages):
+            links.append(f'<a rel="next" href="?page={number + 1}">Next</a>')
+        body = f"<html><body><nav><a href=\"{prefix}/\">Home</a></nav>{''.join(links)}</body></html>"
+        path = f"{prefix}/collections/{collection}" + ("" if number == 1 else f"?page={number}")
+        routes[path] = ("text/html; charset=utf-8", body.encode("utf-8"))
+    return routes
+
+
+def catalog(products):
+    # Two Shopify collections and two listing collections, each pair overlapping by half
+    handles = [f"sneaker-{number:06d}" for number in range(products)]
+    half = products // 2
+    routes = {}
+    routes.update(feed_routes("/mainstreet", "all", handles))
+    routes.update(feed_routes("/mainstreet", "sale", handles[half // 2:half // 2 + half]))
+    routes.update(listing_routes("/hypefly", "sneakers", handles[:half]))
+    routes.update(listing_routes("/hypefly", "new", handles[half // 2:]))
+    seeds = ["/mainstreet/collections/all", "/mainstreet/collections/sale",
+             "/hypefly/collections/sneakers", "/hypefly/collections/new"]
+    expected = products * 2  # every handle once per store
+    return routes, seeds, expected
+
+################### MEASUREMENT ######################
+
+def bench_streaming(seeds) -> dict:
+    crawler = DiscoveryCrawler(Frontier())
+    start = time.perf_counter()
+    first, urls = None, []
+    for _, url in crawler.crawl(seeds):
+        if first is None:
+            first = time.perf_counter() - start
+        urls.append(url)
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "first_url_s": first, "urls": urls,
+            "seen_set_kb": crawler.frontier.seen.nbytes / 1024, "metrics": crawler.metrics()}
+
+
+def bench_collect(seeds) -> dict:
+    # Every page fetched in turn, then one drop_duplicates over everything collected
+    crawler = DiscoveryCrawler(workers=1)
+    start = time.perf_counter()
+    collected = [(crawler.seed_site(seed)[0], url) for seed in seeds for urls in crawler.seed_pages(seed) for url in urls]
+    tracemalloc.start()
+    frame = pd.DataFrame(collected, columns=["site", "url"])
+    frame["url"] = frame["url"].map(canonical_url)
+    frame = frame.drop_duplicates("url")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "first_url_s": elapsed, "urls": frame["url"].tolist(),
+            "seen_set_kb": peak / 1024, "offered": len(collected)}
+
+
+def bench_pipeline(base_url, routes) -> dict:
+    import main
+    handles = [path[len(SITE_PATHS["mainstreet"]):] for path in routes
+               if path.startswith(SITE_PATHS["mainstreet"]) and not path.endswith(".js")]
+    routes.update(feed_routes("/mainstreet", "all", handles))
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        main.main(output_dir=output_dir, seeds=[base_url + "/mainstreet/collections/all"])
+        elapsed = time.perf_counter() - start
+        data = pd.read_csv(os.path.join(output_dir, "DATA_ANALYSIS_1.csv"))
+    return {"seconds": round(elapsed, 2), "products": data["url"].nunique(), "rows": len(data)}
+
+
+def main():
+    # The fixture server is local: politeness delays would only be measured as latency
+    RATE_LIMITER.enabled = False
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=7000)
+    parser.add_argument("--pipeline", action="store_true")
+    args = parser.parse_args()
+
+    routes, seeds, expected = catalog(args.products)
+    if args.pipeline:
+        routes.update(site_routes())
+    with serve(routes) as server:
+        mount_sites(server.base_url)
+        seeds = [server.base_url + seed for seed in seeds]
+        streaming = bench_streaming(seeds)
+        collect = bench_collect(seeds)
+        pipeline = bench_pipeline(server.base_url, server.routes) if args.pipeline else None
+
+    print(f"{len(seeds)} seeds, {expected} unique products, {collect['offered']} product links")
+    print(f"\n{'':<22} {'seconds':>9} {'first URL s':>12} {'seen-set KB':>12} {'unique URLs':>12}")
+    for label, result in (("collect + dedupe", collect), ("streaming crawler", streaming)):
+        print(f"{label:<22} {result['seconds']:>9.2f} {result['first_url_s']:>12.3f} "
+              f"{result['seen_set_kb']:>12.1f} {len(result['urls']):>12}")
+    missed = set(collect["urls"]) - set(streaming["urls"])
+    print(f"\nsame URLs in the same order: {streaming['urls'] == collect['urls']}")
+    print(f"URLs the Bloom filter wrongly took for duplicates: {len(missed)}")
+    print(f"crawler metrics: {streaming['metrics']}")
+    if pipeline is not None:
+        print(f"pipeline: {pipeline}")
+
+
+if __name__ == "__main__":
+    main()
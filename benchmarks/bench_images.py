@@ -0,0 +1,104 @@
+################### IMPORTS ######################
+
+import argparse
+import io
+import random
+import tempfile
+import time
+import pandas as pd
+from images import HAS_PIL, ImageStore, split_image_urls
+from benchmarks.fixture_server import serve
+
+if HAS_PIL:
+    from PIL import Image
+
+# Image stage benchmark against a stub image server on the local fixture server.
+#   python -m benchmarks.bench_images [--products N] [--workers N] [--latency S]
+# Every product photo is served by three stores: the same JPEG bytes by two of them and a
+# smaller PNG of it by the third. The store should keep one image ID per photo.
+
+STORES = ("mainstreet", "crepdogcrew", "hypefly")
+PHOTO_SIZE = 800
+RESIZED = 400
+
+################### STUB IMAGES ######################
+
+def photo(seed) -> "Image.Image":
+    # A smooth synthetic product shot: a random 12x12 colour grid scaled up
+    rng = random.Random(seed)
+    grid = Image.frombytes("RGB", (12, 12), bytes(rng.randrange(256) for _ in range(12 * 12 * 3)))
+    return grid.resize((PHOTO_SIZE, PHOTO_SIZE), Image.Resampling.BICUBIC)
+
+
+def encoded(image, format, **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, **options)
+    return buffer.getvalue()
+
+
+def image_routes(products):
+    # Routes for every store's copy of every photo, and the images cell each store's row would hold
+    routes, cells = {}, {}
+    for number in range(products):
+        image = photo(number)
+        jpeg = encoded(image, "JPEG", quality=85)
+        png = encoded(image.resize((RESIZED, RESIZED), Image.Resampling.LANCZOS), "PNG")
+        paths = [f"/mainstreet/cdn/{number}.jpg", f"/crepdogcrew/cdn/sneaker-{number}.jpg", f"/hypefly/img/{number}.png"]
+        routes[paths[0]] = routes[paths[1]] = ("image/jpeg", jpeg)
+        routes[paths[2]] = ("image/png", png)
+        for store, path in zip(STORES, paths):
+            cells[(number, store)] = path
+    return routes, cells
+
+################### MEASUREMENT ######################
+
+def bench_fetch(urls, workers) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        store = ImageStore(directory, workers=workers)
+        start = time.perf_counter()
+        store.fetch_all(urls)
+        elapsed = time.perf_counter() - start
+        column = store.ids_for(pd.Series(urls))
+        start = time.perf_counter()
+        store.fetch_all(urls)  # a rerun only asks for URLs the index does not know
+        rerun = time.perf_counter() - start
+        manifest = store.manifest()
+        metrics = store.metrics()
+        store.close()
+    return {"seconds": elapsed, "rerun_s": rerun, "column": column, "manifest": manifest, "metrics": metrics}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.03, help="seconds the stub server waits per image, like a CDN")
+    args = parser.parse_args()
+    if not HAS_PIL:
+        raise SystemExit("bench_images needs Pillow to draw the stub images")
+
+    routes, cells = image_routes(args.products)
+    with serve(routes, delay=args.latency) as server:
+        urls = [server.base_url + path for path in cells.values()]
+        sequential = bench_fetch(urls, workers=1)
+        concurrent = bench_fetch(urls, workers=args.workers)
+        hits = server.hits
+
+    print(f"{args.products} photos, {len(urls)} image URLs across {len(STORES)} stores, {hits} requests served")
+    print(f"\n{'':<22} {'seconds':>9} {'rerun s':>9} {'image IDs':>10} {'stored MB':>10}")
+    for label, result in (("1 worker", sequential), (f"{args.workers} workers", concurrent)):
+        print(f"{label:<22} {result['seconds']:>9.2f} {result['rerun_s']:>9.3f} "
+              f"{len(result['manifest']):>10} {result['metrics']['bytes'] / 1024 ** 2:>10.1f}")
+
+    # The images column of each store's rows, with URLs swapped for image IDs
+    column = concurrent["column"]
+    per_photo = column.groupby([number for number, _ in cells]).nunique()
+    served = sum(len(body) for _, body in routes.values())
+    print(f"\nmetrics: {concurrent['metrics']}")
+    print(f"bytes served {served / 1024 ** 2:.1f} MB, stored {concurrent['metrics']['bytes'] / 1024 ** 2:.1f} MB")
+    print(f"photos whose three store URLs share one image ID: {(per_photo == 1).sum()} of {args.products}")
+    print(f"every URL replaced by an image ID: {not column.map(split_image_urls).map(len).any()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+################### IMPORTS ######################
+
+import argparse
+import random
+import time
+from collections import Counter
+import pandas as pd
+from matching import ProductMatcher, title_tokens, token_weights, weighted_jaccard
+from main import ProductNumberer
+
+# Cross-store product matching on a synthetic catalog: every product listed by up to four
+# stores, each titling it its own way, with some listings missing.
+#   python -m benchmarks.bench_matching [--products N] [--missing F]
+# The indexed matcher is compared with link-sheet row alignment (ProductNumberer) and, on a
+# sample, with comparing every pair of titles.
+
+MODELS = ["Jordan 1 Low", "Jordan 1 Mid", "Jordan 1 High OG", "Jordan 4", "Jordan 11 Retro", "Dunk Low",
+          "Dunk High", "Air Force 1 '07", "Air Max 90", "Air Max 1", "Air Max 97", "Yeezy Boost 350 V2",
+          "Yeezy Slide", "Samba OG", "Gazelle Indoor", "New Balance 550", "New Balance 9060", "Blazer Mid '77"]
+# Colourways are a nickname or two ("Legend", "Panda") and a common colour or two, as on the
+# stores. Nicknames are drawn Zipf-distributed from NICKNAMES made-up words: a few are reused
+# by many releases, most by a handful.
+COLOURS = ["white", "black", "grey", "light", "brown", "blue", "red", "green", "pink", "sail", "cream",
+           "bone", "navy", "orange", "purple", "gum", "volt", "olive", "sand", "smoke"]
+SYLLABLES = ["ba", "lu", "ko", "ri", "ta", "mo", "ne", "chi", "ga", "zo", "pe", "va", "dra", "sen", "kai", "lor"]
+NICKNAMES = 3000
+EDITIONS = ["", "", "", "(GS)", "(W)"]
+
+# Site base URLs, so row alignment can tell the stores apart
+STORES = {
+    "Mainstreet": "https://marketplace.mainstreet.co.in/products/",
+    "Crepdogcrew": "https://crepdogcrew.com/products/",
+    "Hypefly": "https://hypefly.co.in/products/",
+    "Culture-circle": "https://www.culture-circle.com/products/all/",
+}
+
+################### SYNTHETIC CATALOG ######################
+
+def store_title(store, model, colours, edition, year, rng) -> str:
+    # Each store's habits: brand prefixes, release years, quotes, "SE", a dropped colour word
+    colourway = " ".join(word.title() for word in colours)
+    if store == "Mainstreet":
+        return f"Nike Air {model} {colourway} ({year}) {edition}".strip()
+    if store == "Crepdogcrew":
+        return f"{model} {colourway} {edition}".strip()
+    if store == "Hypefly":
+        return f"{model} SE '{colourway}' {edition}".strip()
+    kept = colours if len(colours) < 3 else rng.sample(colours, len(colours) - 1)
+    return f"{model} {' '.join(word.title() for word in kept)} {edition}".strip()
+
+
+def nicknames(rng) -> list:
+    words = set()
+    while len(words) < NICKNAMES:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))))
+    return sorted(words)
+
+
+def catalog(products, missing, seed=7) -> pd.DataFrame:
+    # One row per listing, product by product in link-sheet order, with the true product
+    rng = random.Random(seed)
+    names = nicknames(rng)
+    zipf = [1 / rank for rank in range(1, len(names) + 1)]
+    seen, rows = set(), []
+    while len(seen) < products:
+        model, edition = rng.choice(MODELS), rng.choice(EDITIONS)
+        colours = tuple(dict.fromkeys(rng.choices(names, zipf, k=rng.randint(1, 2)) + rng.sample(COLOURS, rng.randint(1, 2))))
+        if (model, frozenset(colours), edition) in seen:
+            continue
+        seen.add((model, frozenset(colours), edition))
+        truth, year = len(seen), rng.randint(2015, 2024)
+        sku = f"{rng.choice('ABCDFH')}{rng.choice('NQVZ')}{rng.randint(1000, 9999)}-{rng.randint(0, 999):03d}"
+        for store, base in STORES.items():
+            if rng.random() < missing:
+                continue
+            rows.append({
+                "title": store_title(store, model, list(colours), edition, year, rng),
+                "url": f"{base}{truth}-{store.lower()}",
+                "sku": sku if store in ("Crepdogcrew", "Hypefly") and rng.random() < 0.5 else "N/A",
+                "source": store,
+                "truth": truth,
+            })
+    return pd.DataFrame(rows)
+
+################### MEASUREMENT ######################
+
+def pair_scores(predicted, truth) -> dict:
+    # Pairwise precision and recall: of the listing pairs put in one product, how many belong
+    # together, and of those that belong together, how many were put in one product
+    def pairs(counts):
+        return sum(count * (count - 1) // 2 for count in counts)
+    both = pairs(Counter(zip(predicted, truth)).values())
+    found, actual = pairs(Counter(predicted).values()), pairs(Counter(truth).values())
+    return {"precision": both / found if found else 1.0, "recall": both / actual if actual else 1.0,
+            "products": len(set(predicted))}
+
+
+def all_pairs(token_sets, weights, threshold) -> set:
+    # Every title compared with every other one
+    return {(j, i) for i in range(len(token_sets)) for j in range(i)
+            if token_sets[i] and token_sets[j] and weighted_jaccard(token_sets[i], token_sets[j], weights) >= threshold}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--missing", type=float, default=0.1, help="share of listings a store does not have")
+    parser.add_argument("--sample", type=int, default=1500, help="listings compared pair by pair")
+    args = parser.parse_args()
+
+    listings = catalog(args.products, args.missing)
+    print(f"{args.products} products, {len(listings)} listings from {len(STORES)} stores "
+          f"({args.missing:.0%} of listings missing)")
+
+    start = time.perf_counter()
+    aligned = ProductNumberer(len(STORES)).numbers(listings["url"])
+    aligned_s = time.perf_counter() - start
+    matcher = ProductMatcher()
+    matched = matcher.match(listings.drop(columns="truth"))
+
+    print(f"\n{'':<18} {'seconds':>9} {'products':>9} {'precision':>10} {'recall':>8}")
+    for label, numbers, seconds in (("row alignment", aligned, aligned_s),
+                                    ("indexed matcher", matched, matcher.metrics()["seconds"])):
+        scores = pair_scores(list(numbers), listings["truth"].tolist())
+        print(f"{label:<18} {seconds:>9.2f} {scores['products']:>9} {scores['precision']:>10.3f} {scores['recall']:>8.3f}")
+    n = len(listings)
+    print(f"\ntitle pairs compared: {matcher.metrics()['compared']} of {n * (n - 1) // 2} ({matcher.metrics()['compared'] / (n * (n - 1) / 2):.4%})")
+    print(f"matcher metrics: {matcher.metrics()}")
+
+    # Title pairs the index finds, against comparing every pair; with --sample above
+    # MAX_POSTINGS, pairs that only share stop tokens can be missed
+    sample = [title_tokens(title) for title in listings["title"].head(args.sample)]
+    start = time.perf_counter()
+    weights = token_weights(sample)
+    expected = all_pairs(sample, weights, matcher.threshold)
+    brute_s = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = {(j, i) for _, j, i in matcher.candidate_pairs(sample, weights)}
+    indexed_s = time.perf_counter() - start
+    print(f"\nfirst {len(sample)} listings: all pairs {brute_s:.2f}s, index {indexed_s:.3f}s, "
+          f"{len(indexed & expected)} of {len(expected)} pairs found, {len(indexed - expected)} extra")
+
+
+if __name__ == "__main__":
+    main()
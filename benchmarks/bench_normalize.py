@@ -0,0 +1,79 @@
+################### IMPORTS ######################
+
+import argparse
+import re
+import statistics
+import time
+import pandas as pd
+from normalize import canonical_sizes, display_prices, normalize_sizes, parse_prices, price_values
+
+# Price and size normalization throughput on DATA_ANALYSIS_1.csv, tiled to a larger catalog.
+#   python -m benchmarks.bench_normalize [--copies N] [--repeat N]
+# The row-by-row helpers main.py used before normalize.py are kept below for comparison.
+
+SOURCE_CSV = "DATA_ANALYSIS_1.csv"
+
+################### REFERENCE ######################
+
+def legacy_fix_size_format(size):
+    if not isinstance(size, str):
+        return size
+    return re.sub(r'^(UK|EU|US)\s*', r'\1 ', size.strip(), flags=re.IGNORECASE)
+
+
+def legacy_clean_price(price):
+    if not isinstance(price, str) or price in ['N/A', 'Error', '']:
+        return float('inf')
+    price = re.sub(r'[₹Rs.\s,]', '', price.strip())
+    try:
+        return float(price)
+    except ValueError:
+        return float('inf')
+
+
+def legacy(df):
+    prices = df['price'].astype(str).str.replace('₹', 'Rs. ', regex=False)
+    return prices.apply(legacy_clean_price), df['size'].apply(legacy_fix_size_format)
+
+
+def vectorized(df):
+    prices = display_prices(df['price'])
+    return price_values(prices), canonical_sizes(df['size'])
+
+
+def median_s(function, df, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(df)
+        samples.append(time.perf_counter() - start)
+    return result, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = pd.read_csv(SOURCE_CSV, keep_default_na=False)
+    df = pd.concat([df] * args.copies, ignore_index=True)
+    print(f"{len(df)} rows ({args.copies} copies of {SOURCE_CSV})")
+
+    (old_prices, old_sizes), old_s = median_s(legacy, df, args.repeat)
+    (new_prices, new_sizes), new_s = median_s(vectorized, df, args.repeat)
+    print(f"{'row-by-row':<12} {old_s:8.3f}s  {len(df) / old_s:>12,.0f} rows/s")
+    print(f"{'vectorized':<12} {new_s:8.3f}s  {len(df) / new_s:>12,.0f} rows/s  speedup {old_s / new_s:.0f}x")
+
+    for label, function, column in (("parse_prices", parse_prices, "price"), ("normalize_sizes", normalize_sizes, "size")):
+        _, seconds = median_s(lambda frame: function(frame[column]), df, args.repeat)
+        print(f"  {label:<16} {seconds:8.3f}s  {len(df) / seconds:>12,.0f} rows/s")
+
+    print(f"sizes identical to fix_size_format: {bool((new_sizes == old_sizes).all())}")
+    # The old regex also stripped the decimal point, so "Rs. 10,999.00" read as 1,099,900
+    differing = df.loc[new_prices != old_prices, 'price'].unique()
+    print(f"price values that now differ: {len(differing)} distinct, e.g. {list(differing[:3])}")
+
+
+if __name__ == "__main__":
+    main()
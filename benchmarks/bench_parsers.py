@@ -0,0 +1,94 @@
+################### IMPORTS ######################
+
+import argparse
+import glob
+import json
+import statistics
+import time
+from html_parser import BACKENDS, SITE_SELECTORS, make_soup
+from benchmarks.saved_pages import load_pages, write_pages
+
+# Parser backends and strainers on the saved product pages and the notebooks' HTML outputs.
+#   python -m benchmarks.bench_parsers [--repeat N]
+# Every configuration is checked against the full html.parser parse the scrapers always used.
+
+BASELINE = ("html.parser", False)
+
+
+def nodes(soup, selectors):
+    # What the scrapers read: tag name, stripped text and attributes of every selected node
+    extracted = []
+    for selector in selectors:
+        for el in soup.select(selector):
+            attrs = tuple(sorted((k, " ".join(v) if isinstance(v, list) else v) for k, v in el.attrs.items()))
+            extracted.append((selector, el.name, el.get_text(strip=True), attrs))
+    return extracted
+
+
+def notebook_snapshots():
+    snapshots = {}
+    for path in sorted(glob.glob("*.ipynb")):
+        with open(path, encoding="utf-8") as f:
+            notebook = json.load(f)
+        for cell_no, cell in enumerate(notebook["cells"]):
+            for output in cell.get("outputs", []):
+                markup = output.get("data", {}).get("text/html")
+                if markup:
+                    snapshots[f"{path}#{cell_no}"] = "".join(markup)
+    return snapshots
+
+
+def median_ms(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def configurations():
+    return [(backend, strained) for backend in BACKENDS for strained in (False, True)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    write_pages()
+
+    print(f"{'site':<15} {'backend':<12} {'strained':<9} {'median ms':>10} {'speedup':>8}  identical")
+    all_identical = True
+    for site, selectors in SITE_SELECTORS.items():
+        pages = load_pages(site)
+        timings, outputs = {}, {}
+        for backend, strained in configurations():
+            total, extracted = 0.0, []
+            for page in pages.values():
+                soup, ms = median_ms(lambda: make_soup(page, site if strained else None, backend), args.repeat)
+                total += ms
+                extracted.append(nodes(soup, selectors))
+            timings[(backend, strained)], outputs[(backend, strained)] = total, extracted
+        for config in configurations():
+            identical = outputs[config] == outputs[BASELINE]
+            all_identical &= identical
+            print(f"{site:<15} {config[0]:<12} {str(config[1]):<9} {timings[config]:>10.2f} "
+                  f"{timings[BASELINE] / timings[config]:>7.1f}x  {identical}")
+
+    # The notebook outputs are pandas tables, not product pages: compare full parses only
+    snapshots = notebook_snapshots()
+    for backend in BACKENDS:
+        total, identical = 0.0, True
+        for markup in snapshots.values():
+            soup, ms = median_ms(lambda: make_soup(markup, None, backend), args.repeat)
+            baseline = make_soup(markup, None, "html.parser")
+            total += ms
+            identical &= nodes(soup, ["td", "th"]) == nodes(baseline, ["td", "th"])
+        all_identical &= identical
+        print(f"{'notebooks':<15} {backend:<12} {'False':<9} {total:>10.2f} {'':>8}  {identical}")
+
+    print("All outputs identical." if all_identical else "OUTPUT MISMATCH between backends.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+################### IMPORTS ######################
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from urllib.parse import urlencode, urlparse
+import pandas as pd
+from main import build_best_price_table, mark_best_prices
+from price_service import PriceService, SnapshotWriter, start_price_server
+
+# Load test of the best-price service on a synthetic catalog.
+#   python -m benchmarks.bench_price_service [--products N] [--clients N] [--seconds S]
+# Lookups through the Python API and over HTTP are timed against re-reading and scanning
+# FINAL_BEST_PRICES.csv, while new snapshots are published and swapped in under load. Every
+# snapshot k prices each offer k rupees above the first one, so an answer mixing two
+# snapshots would show. Clients and the publisher run in processes of their own.
+
+SOURCES = ["Mainstreet", "Crepdogcrew", "Hypefly", "Culture-circle"]
+SIZES = [f"UK {size:g}" for size in (5, 5.5, 6, 6.5, 7, 7.5, 8, 8.5, 9, 9.5, 10, 11)]
+
+################### SYNTHETIC SNAPSHOTS ######################
+
+def offers(products, seed=3) -> pd.DataFrame:
+    # A DATA_ANALYSIS_2 block: every product at every store in every size
+    rng = random.Random(seed)
+    rows = []
+    for product_no in range(1, products + 1):
+        base = rng.randrange(6000, 30000)
+        for source in SOURCES:
+            url = f"https://{source.lower()}.example/products/{product_no}"
+            for size in SIZES:
+                rows.append((product_no, f"Sneaker {product_no}", f"SK{product_no:06d}-100", url, source, size,
+                             base + rng.randrange(0, 3000)))
+    df = pd.DataFrame(rows, columns=["product_no", "title", "sku", "url", "source", "size", "rupees"])
+    return df
+
+
+def publish(df, directory, version) -> str:
+    block = df.assign(price="Rs. " + (df["rupees"] + version).map("{:,}".format)).drop(columns="rupees")
+    snapshot = SnapshotWriter(directory, name=f"v{version:04d}")
+    snapshot.append(block)
+    snapshot.publish()
+    return snapshot.name
+
+################### MEASUREMENT ######################
+
+def percentiles(samples) -> str:
+    samples = sorted(samples)
+    pick = lambda share: samples[min(len(samples) - 1, int(share * len(samples)))] * 1e6
+    return f"p50 {pick(0.5):8.1f}us  p99 {pick(0.99):8.1f}us"
+
+
+def bench_csv_scan(df, directory, queries) -> list:
+    # The consumer interface before the service: read the final table and filter it
+    path = os.path.join(directory, "FINAL_BEST_PRICES.csv")
+    block = df.assign(price="Rs. " + df["rupees"].map("{:,}".format), description="N/A", images="N/A").drop(columns="rupees")
+    build_best_price_table(mark_best_prices(block)).to_csv(path, index=False)
+    samples = []
+    for product_no, size in queries:
+        start = time.perf_counter()
+        table = pd.read_csv(path)
+        table[(table["product_no"] == product_no) & (table["size"] == size)]
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_api(service, queries) -> list:
+    samples = []
+    for product_no, size in queries:
+        start = time.perf_counter()
+        service.best(product_no, size)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def version(snapshot) -> int:
+    return int(snapshot.lstrip("v"))
+
+
+def http_client(base_url, products, seconds, expected, seed, results):
+    # One client process: /best over a keep-alive connection, each answer checked against the
+    # prices of the snapshot it names. http.client rather than requests, whose per-call
+    # overhead would be most of what is measured.
+    rng, address = random.Random(seed), urlparse(base_url)
+    connection = http.client.HTTPConnection(address.hostname, address.port, timeout=5)
+    samples, errors, mixed, snapshots = [], 0, 0, set()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        product_no, size = rng.randint(1, products), rng.choice(SIZES)
+        start = time.perf_counter()
+        try:
+            connection.request("GET", f"/best?{urlencode({'product': product_no, 'size': size})}")
+            answer = json.loads(connection.getresponse().read())
+        except Exception:
+            errors += 1
+            connection.close()
+            continue
+        samples.append(time.perf_counter() - start)
+        snapshots.add(answer["snapshot"])
+        if answer["offer"]["price_paise"] // 100 != expected[(product_no, size)] + version(answer["snapshot"]):
+            mixed += 1
+    results.put((samples, errors, mixed, snapshots))
+
+
+def publisher(df, directory, seconds, swap_every):
+    # Publishes a new snapshot every swap_every seconds, as finished runs would
+    deadline, number = time.perf_counter() + seconds, 0
+    while time.perf_counter() + swap_every < deadline:
+        time.sleep(swap_every)
+        number += 1
+        publish(df, directory, number)
+
+
+def bench_http(base_url, df, products, clients, seconds, directory, swap_every) -> dict:
+    # Client processes query /best while another process publishes snapshots and the service
+    # swaps to them; the processes keep the clients off the service's interpreter
+    context = multiprocessing.get_context("fork")
+    expected = df.groupby(["product_no", "size"])["rupees"].min().to_dict()
+    results = context.Queue()
+    processes = [context.Process(target=http_client, args=(base_url, products, seconds, expected, seed, results))
+                 for seed in range(clients)]
+    processes.append(context.Process(target=publisher, args=(df, directory, seconds, swap_every)))
+    for process in processes:
+        process.start()
+    samples, errors, mixed, snapshots = [], 0, 0, set()
+    for _ in range(clients):
+        client_samples, client_errors, client_mixed, client_snapshots = results.get()
+        samples += client_samples
+        errors += client_errors
+        mixed += client_mixed
+        snapshots |= client_snapshots
+    for process in processes:
+        process.join()
+    return {"samples": samples, "errors": errors, "mixed": mixed, "snapshots": len(snapshots)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--swap-every", type=float, default=3.0, help="seconds between published snapshots")
+    args = parser.parse_args()
+
+    df = offers(args.products)
+    rng = random.Random(1)
+    queries = [(rng.randint(1, args.products), rng.choice(SIZES)) for _ in range(20000)]
+    with tempfile.TemporaryDirectory() as directory:
+        snapshots = os.path.join(directory, "snapshots")
+        publish(df, snapshots, 0)
+        service = PriceService(snapshots)
+        start = time.perf_counter()
+        service.load()
+        load_s = time.perf_counter() - start
+        print(f"{args.products} products, {len(df)} offers; snapshot loaded and indexed in {load_s:.2f}s")
+
+        scan = bench_csv_scan(df, directory, queries[:20])
+        api = bench_api(service, queries)
+        service.watch(interval=0.2)
+        server = start_price_server(service, 0)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        http = bench_http(base_url, df, args.products, args.clients, args.seconds, snapshots, args.swap_every)
+        server.shutdown()
+        service.stop()
+
+    print(f"\n{'':<28} latency")
+    print(f"{'CSV re-read + scan':<28} {percentiles(scan)}  ({len(scan)} queries)")
+    print(f"{'PriceService.best':<28} {percentiles(api)}  ({len(api)} queries)")
+    print(f"{'HTTP /best, ' + str(args.clients) + ' clients':<28} {percentiles(http['samples'])}  "
+          f"({len(http['samples']) / args.seconds:.0f} queries/s)")
+    print(f"\nsnapshots swapped in under load: {service.metrics()['swaps'] - 1}, seen in answers: {http['snapshots']}")
+    print(f"HTTP errors: {http['errors']}, answers mixing snapshots: {http['mixed']}")
+    print(f"service metrics: {service.metrics()}")
+    print(f"API speedup over the CSV scan: {statistics.median(scan) / statistics.median(api):,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
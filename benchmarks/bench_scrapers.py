@@ -0,0 +1,207 @@
+################### IMPORTS ######################
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import pandas as pd
+from rate_limiter import RATE_LIMITER
+from benchmarks.fixture_server import SITE_PATHS, mount_sites, serve, site_routes, site_urls
+from benchmarks.saved_pages import handle_of
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Scraper and pipeline benchmark against the local fixture server.
+#   python -m benchmarks.bench_scrapers [--repeat N] [--path default|browser] [--save-baseline]
+# "default" goes through call_scraper (fast paths first), "browser" calls the scrape_*_product
+# functions directly and needs Chrome. Results are compared with benchmarks/baseline.json; the
+# first run on a machine (or --save-baseline) stores its numbers there for that path.
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+TOLERANCE = 0.25  # allowed slowdown before a metric counts as a regression
+
+LINK_COLUMNS = {
+    "Mainstreet": "mainstreet",
+    "Crepdogcrew": "crepdogcrew",
+    "hyepfly": "hypefly",
+    "culture circle": "culture-circle",
+}
+
+################### MEASUREMENT ######################
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = (len(ordered) - 1) * q
+    low, high = int(index), min(int(index) + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (index - low)
+
+
+class RssSampler:
+    # Peak resident memory of this process plus its children (Chrome, chromedriver) when psutil is available
+    def __init__(self):
+        self.peak_children_mb = 0.0
+
+    def sample(self):
+        if psutil is None:
+            return
+        children = psutil.Process().children(recursive=True)
+        total = 0
+        for child in children:
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak_children_mb = max(self.peak_children_mb, total / 1024 ** 2)
+
+    def report(self) -> dict:
+        self_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        if sys.platform == "darwin":
+            self_mb /= 1024  # macOS reports bytes
+        report = {"peak_rss_mb": round(self_mb, 1)}
+        if psutil is not None:
+            report["peak_children_rss_mb"] = round(self.peak_children_mb, 1)
+        return report
+
+
+def scrapers(path):
+    import main
+    if path == "browser":
+        return {
+            "mainstreet": main.scrape_mainstreet_product,
+            "crepdogcrew": main.scrape_crepdogcrew_product,
+            "hypefly": main.scrape_hypefly_product,
+            "culture-circle": main.scrape_culture_circle_product,
+        }
+    return {site: main.call_scraper for site in SITE_PATHS}
+
+
+def bench_sites(urls, path, repeat, sampler) -> dict:
+    results = {}
+    for site, scraper in scrapers(path).items():
+        latencies, failures = [], 0
+        for _ in range(repeat):
+            for url in urls.get(site, []):
+                start = time.perf_counter()
+                try:
+                    df = scraper(url)
+                    if df is None or df.empty or (df["title"] == "Error").all():
+                        failures += 1
+                except Exception as e:
+                    print(f"[ERROR] {site} {url}: {e}")
+                    failures += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+                sampler.sample()
+        results[site] = {
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "products_per_min": round(len(latencies) / (sum(latencies) / 60000), 1) if latencies else 0.0,
+            "failures": failures,
+        }
+    return results
+
+
+def fixture_links(base_url, links_csv) -> pd.DataFrame:
+    # The link sheet with every store URL pointed at the fixture server
+    links = pd.read_csv(links_csv)
+    for column, site in LINK_COLUMNS.items():
+        if column in links.columns:
+            links[column] = [base_url + SITE_PATHS[site] + handle_of(url) for url in links[column]]
+    return links
+
+
+def bench_pipeline(base_url, sampler) -> dict:
+    import main
+    with tempfile.TemporaryDirectory() as output_dir:
+        links_csv = os.path.join(output_dir, "links.csv")
+        fixture_links(base_url, main.LINKS_CSV).to_csv(links_csv, index=False)
+        start = time.perf_counter()
+        main.main(links_csv=links_csv, output_dir=output_dir)
+        elapsed = time.perf_counter() - start
+        sampler.sample()
+        products = len(pd.read_csv(links_csv)) * len(LINK_COLUMNS)
+        rows = len(pd.read_csv(os.path.join(output_dir, "DATA_ANALYSIS_1.csv")))
+    return {
+        "seconds": round(elapsed, 2),
+        "products_per_min": round(products / (elapsed / 60), 1),
+        "rows": rows,
+    }
+
+################### BASELINE ######################
+
+def regressions(current, baseline) -> list:
+    found = []
+    for site, metrics in current["sites"].items():
+        base = baseline.get("sites", {}).get(site)
+        if not base:
+            continue
+        if metrics["p95_ms"] > base["p95_ms"] * (1 + TOLERANCE):
+            found.append(f"{site}: p95 {metrics['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+        if metrics["products_per_min"] < base["products_per_min"] * (1 - TOLERANCE):
+            found.append(f"{site}: {metrics['products_per_min']} products/min vs baseline {base['products_per_min']}")
+    pipeline, base = current.get("pipeline"), baseline.get("pipeline")
+    if pipeline and base and pipeline["products_per_min"] < base["products_per_min"] * (1 - TOLERANCE):
+        found.append(f"pipeline: {pipeline['products_per_min']} products/min vs baseline {base['products_per_min']}")
+    return found
+
+
+def save_baseline(baselines, key, report):
+    baselines[key] = report
+    with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2)
+    print(f"Saved baseline to {BASELINE_PATH}")
+
+
+def main():
+    # The fixture server is local: politeness delays would only be measured as latency
+    RATE_LIMITER.enabled = False
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--path", choices=["default", "browser"], default="default")
+    parser.add_argument("--skip-pipeline", action="store_true")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    sampler = RssSampler()
+    with serve(site_routes()) as server:
+        mount_sites(server.base_url)
+        urls = site_urls(server.base_url, server.routes)
+        report = {"path": args.path, "repeat": args.repeat, "sites": bench_sites(urls, args.path, args.repeat, sampler)}
+        if not args.skip_pipeline:
+            report["pipeline"] = bench_pipeline(server.base_url, sampler)
+    report.update(sampler.report())
+
+    print(f"\n{'site':<15} {'p50 ms':>9} {'p95 ms':>9} {'products/min':>13} {'failures':>9}")
+    for site, metrics in report["sites"].items():
+        print(f"{site:<15} {metrics['p50_ms']:>9.2f} {metrics['p95_ms']:>9.2f} {metrics['products_per_min']:>13.1f} {metrics['failures']:>9}")
+    if "pipeline" in report:
+        print(f"pipeline: {report['pipeline']}")
+    print({key: value for key, value in report.items() if key.startswith("peak")})
+
+    baseline_key = args.path
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    if args.save_baseline or baseline_key not in baselines:
+        if not args.save_baseline:
+            print("No stored baseline for this path; this run becomes the baseline.")
+        save_baseline(baselines, baseline_key, report)
+        return
+    found = regressions(report, baselines[baseline_key])
+    if found:
+        print("REGRESSIONS:\n  " + "\n  ".join(found))
+        sys.exit(1)
+    print("No regressions against the stored baseline.")
+
+
+if __name__ == "__main__":
+    main()
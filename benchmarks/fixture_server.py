@@ -0,0 +1,103 @@
+################### IMPORTS ######################
+
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+################### FIXTURE SERVER ######################
+
+class FixtureServer(ThreadingHTTPServer):
+    # Serves recorded pages from memory: routes maps a path to (content type, body bytes).
+    # delay adds that many seconds before each response, like a remote server's latency.
+    daemon_threads = True
+
+    def __init__(self, routes, host="127.0.0.1", port=0, delay=0.0):
+        self.routes = dict(routes)
+        self.delay = delay
+        self.hits = 0
+        super().__init__((host, port), FixtureHandler)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the live stores
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.hits += 1
+        # Routes with a query string (feed and listing pages) match exactly, the rest by path
+        route = self.server.routes.get(self.path) or self.server.routes.get(urlparse(self.path).path)
+        if route is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        content_type, body = route
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve(routes, delay=0.0):
+    server = FixtureServer(routes, delay=delay)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+################### SITE FIXTURES ######################
+
+# Path prefix per site. mount_sites() registers each prefix of a server with its site, so
+# call_scraper dispatches fixture URLs as it does live ones.
+SITE_PATHS = {
+    "mainstreet": "/mainstreet/products/",
+    "crepdogcrew": "/crepdogcrew/products/",
+    "hypefly": "/hypefly/products/",
+    "culture-circle": "/culture-circle/products/all/",
+}
+
+
+def mount_sites(base_url: str):
+    from site_spec import SITES
+    for site in SITE_PATHS:
+        SITES.mount(f"{base_url}/{site}", site)
+
+
+def site_routes(pages_dir=None) -> dict:
+    # Recorded pages (and Shopify product JSON) for the four stores
+    from benchmarks.saved_pages import PAGES_DIR, load_pages, write_pages
+    pages_dir = pages_dir or PAGES_DIR
+    write_pages(pages_dir=pages_dir)
+    routes = {}
+    for site, prefix in SITE_PATHS.items():
+        for handle, page in load_pages(site, pages_dir).items():
+            routes[prefix + handle] = ("text/html; charset=utf-8", page.encode("utf-8"))
+        for handle, payload in load_pages(site, pages_dir, ".js").items():
+            routes[prefix + handle + ".js"] = ("application/json", payload.encode("utf-8"))
+    return routes
+
+
+def site_urls(base_url: str, routes: dict) -> dict:
+    urls = {}
+    for path in routes:
+        if not path.endswith(".js"):
+            site = path.split("/")[1]
+            urls.setdefault(site, []).append(base_url + path)
+    return urls
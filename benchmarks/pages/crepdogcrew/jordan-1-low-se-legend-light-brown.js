@@ -0,0 +1 @@
+{"title": "Jordan 1 Low SE Legend Light Brown", "handle": "jordan-1-low-se-legend-light-brown", "description": "<p>Color Shown:Legend Light Brown/Sail/Neutral Grey/Archaeo Brown NOTE - UK 3 to UK 6 are GS pairs.</p><p>SKU - HF1567-200</p>", "options": [{"name": "Size", "position": 1, "values": ["UK 3.5", "UK 6.5", "UK 7", "UK 7.5", "UK 8.5", "UK 9", "UK 9.5", "UK 10", "UK 11", "UK 12"]}], "images": ["//crepdogcrew.com/cdn/shop/files/EditsbyAhmar01_6a22ecfa-a28d-461f-a895-ef6cf1b46255.png?v=1744911762&width=1080", "//crepdogcrew.com/cdn/shop/files/Jordan1LowSELEGENDLIGHTBROWN2.png?v=1744911763&width=1080"], "variants": [{"id": 1, "title": "UK 3.5", "option1": "UK 3.5", "available": true, "price": 899900}, {"id": 2, "title": "UK 6.5", "option1": "UK 6.5", "available": true, "price": 1049900}, {"id": 3, "title": "UK 7", "option1": "UK 7", "available": true, "price": 1099900}, {"id": 4, "title": "UK 7.5", "option1": "UK 7.5", "available": true, "price": 1049900}, {"id": 5, "title": "UK 8.5", "option1": "UK 8.5", "available": true, "price": 1049900}, {"id": 6, "title": "UK 9", "option1": "UK 9", "available": true, "price": 1099900}, {"id": 7, "title": "UK 9.5", "option1": "UK 9.5", "available": true, "price": 1099900}, {"id": 8, "title": "UK 10", "option1": "UK 10", "available": true, "price": 1199900}, {"id": 9, "title": "UK 11", "option1": "UK 11", "available": true, "price": 1199900}, {"id": 10, "title": "UK 12", "option1": "UK 12", "available": true, "price": 1399900}]}
\ No newline at end of file
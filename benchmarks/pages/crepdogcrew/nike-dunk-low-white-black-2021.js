@@ -0,0 +1 @@
+{"title": "Nike Dunk Low White Black (Panda)", "handle": "nike-dunk-low-white-black-2021", "description": "<p>The &#x27;80s basketball favorite makes a return with glossy layers and iconic hues evocative of college teams. Crafted for the courts but even an urban star, the &#x27;80s. The Nike Dunk Low brings &#x27;80s style to the streets with its famous basketball style, while its low, cushioned neck allows you to wear it anywhere in optimal comfort.The Nike Dunk Low &#x27;Black White,&#x27; also referred to as the &#x27;Panda,&#x27; features a two-tone colour palette that emphasises the classic model&#x27;s clean lines, which were crafted by designer Peter Moore and are responsible for the shoe&#x27;s seamless transition from the hardwood to the street. The white leather top is contrasted with black accents that wrap around the toe and heel in the Nike Dunk Low White Black. Nike lettering in white shines out against a black setting on the embroidered tongue tag and heel tab.Released as a collegiate sneaker, Nike Dunks can now be found on the feet of celebrities and commoners alike. Limited editions like Off White Dunks, from the 2019 collab betweenNike and Virgil Abloh’s design label Off-White further cemented Dunks’ place in sneaker folklore.Get the latest Nike Dunks, Nike SB Dunks and more limited edition sneakers only on Crepdog Crew. NOTE - UK 3 to UK 6 are GS pairs.</p>", "options": [{"name": "Size", "position": 1, "values": ["UK 3.5", "UK 4.5", "UK 5", "UK 5.5", "UK 6", "UK 8.5", "UK 11"]}], "images": ["//crepdogcrew.com/cdn/shop/files/image_8f504660-fd59-4e51-9f60-97c58eb56af9.jpg?v=1744912882&width=1001", "//crepdogcrew.com/cdn/shop/files/panda_1.png?v=1744912882&width=1080"], "variants": [{"id": 1, "title": "UK 3.5", "option1": "UK 3.5", "available": true, "price": 849900}, {"id": 2, "title": "UK 4.5", "option1": "UK 4.5", "available": true, "price": 699900}, {"id": 3, "title": "UK 5", "option1": "UK 5", "available": true, "price": 799900}, {"id": 4, "title": "UK 5.5", "option1": "UK 5.5", "available": true, "price": 799900}, {"id": 5, "title": "UK 6", "option1": "UK 6", "available": true, "price": 999900}, {"id": 6, "title": "UK 8.5", "option1": "UK 8.5", "available": true, "price": 899900}, {"id": 7, "title": "UK 11", "option1": "UK 11", "available": true, "price": 849900}]}
\ No newline at end of file
@@ -0,0 +1 @@
+{"title": "Nike Air Jordan 1 Low Legend Light Brown", "handle": "nike-air-jordan-1-low-legend-light-brown", "description": "<p>The Air Jordan 1 Low SE &#x27;Legend Light Brown&#x27; is a modern reinterpretation of the iconic AJ1 Low, blending premium materials with a neutral color palette. The upper combines smooth leather and soft suede in shades of Legend Light Brown, Sail, Neutral Grey, and Archaeo Brown, offering a versatile and stylish aesthetic. Equipped with Nike Air cushioning, this sneaker ensures comfort with every step, while the durable rubber outsole provides reliable traction for daily wear. Design elements such as the Wings logo on the heel and the Jumpman logo on the tongue pay homage to the brand&#x27;s heritage.</p>", "options": [{"name": "Size", "position": 1, "values": ["UK 6", "UK 6.5", "UK 7", "UK 7.5", "UK 8", "UK 8.5", "UK 9", "UK 9.5", "UK 10", "UK 11", "UK 12"]}], "images": ["//marketplace.mainstreet.co.in/cdn/shop/files/Artboard4_d6a5cdae-0563-4c60-8683-3a6ff23bf2d7.png?v=1742302467&width=416", "//marketplace.mainstreet.co.in/cdn/shop/files/Artboard5_afbd23cc-1a7e-4bd6-a1ab-54153a9d8c14.png?v=1742302466&width=416", "//marketplace.mainstreet.co.in/cdn/shop/files/Artboard6_df1794c4-efc0-498a-bc00-23ba367526fd.png?v=1742302467&width=416"], "variants": [{"id": 1, "title": "UK 6", "option1": "UK 6", "available": true, "price": 1099900}, {"id": 2, "title": "UK 6.5", "option1": "UK 6.5", "available": true, "price": 1099900}, {"id": 3, "title": "UK 7", "option1": "UK 7", "available": true, "price": 1099900}, {"id": 4, "title": "UK 7.5", "option1": "UK 7.5", "available": true, "price": 1099900}, {"id": 5, "title": "UK 8", "option1": "UK 8", "available": true, "price": 1099900}, {"id": 6, "title": "UK 8.5", "option1": "UK 8.5", "available": true, "price": 1099900}, {"id": 7, "title": "UK 9", "option1": "UK 9", "available": true, "price": 1099900}, {"id": 8, "title": "UK 9.5", "option1": "UK 9.5", "available": true, "price": 1099900}, {"id": 9, "title": "UK 10", "option1": "UK 10", "available": true, "price": 1099900}, {"id": 10, "title": "UK 11", "option1": "UK 11", "available": true, "price": 1099900}, {"id": 11, "title": "UK 12", "option1": "UK 12", "available": true, "price": 1099900}]}
\ No newline at end of file
@@ -0,0 +1 @@
+{"title": "Nike Dunk Low Retro White Black Panda (2021)", "handle": "nike-dunk-low-retro-white-black-panda-2035", "description": "<p>Size Guide - These fit true to size, so go for the size that fits you in most brands. If you wear a UK 8, go for a UK 8.The Nike Dunk Low Retro White Black Panda (2021) offers a classic black and white colourway that is both versatile and timeless. The premium leather upper and cushioned sole provide comfort, making these sneakers perfect for everyday wear, while the clean design ensures they can pair with virtually any outfit.</p>", "options": [{"name": "Size", "position": 1, "values": ["UK 4", "UK 5", "UK 5.5", "UK 6", "UK 8", "UK 8.5", "UK 9.5", "UK 10", "UK 11", "UK 12"]}], "images": ["//marketplace.mainstreet.co.in/cdn/shop/files/Artboard33_b1fde7e4-f0a8-4ca7-931d-5f4d54d7bd15.png?v=1742211942&width=416", "//marketplace.mainstreet.co.in/cdn/shop/files/Artboard32_5ed084ec-a1e6-4eb6-9eb6-84f39fe17e22.png?v=1742211942&width=416", "//marketplace.mainstreet.co.in/cdn/shop/files/Artboard31_f0af6d2e-44b7-4424-bb0f-420d1d249de8.png?v=1742211942&width=416"], "variants": [{"id": 1, "title": "UK 4", "option1": "UK 4", "available": true, "price": 999900}, {"id": 2, "title": "UK 5", "option1": "UK 5", "available": true, "price": 999900}, {"id": 3, "title": "UK 5.5", "option1": "UK 5.5", "available": true, "price": 1049900}, {"id": 4, "title": "UK 6", "option1": "UK 6", "available": true, "price": 999900}, {"id": 5, "title": "UK 8", "option1": "UK 8", "available": true, "price": 999900}, {"id": 6, "title": "UK 8.5", "option1": "UK 8.5", "available": true, "price": 1099900}, {"id": 7, "title": "UK 9.5", "option1": "UK 9.5", "available": true, "price": 1099900}, {"id": 8, "title": "UK 10", "option1": "UK 10", "available": true, "price": 799900}, {"id": 9, "title": "UK 11", "option1": "UK 11", "available": true, "price": 999900}, {"id": 10, "title": "UK 12", "option1": "UK 12", "available": true, "price": 999900}]}
\ No newline at end of file
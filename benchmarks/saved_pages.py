@@ -0,0 +1,240 @@
+################### IMPORTS ######################
+
+import html
+import json
+import os
+import re
+import sys
+import pandas as pd
+
+# Saved product pages used by the benchmarks. They are rebuilt from the rows in
+# DATA_ANALYSIS_1.csv with each site's markup, so they run offline and stay deterministic.
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+SOURCE_CSV = "DATA_ANALYSIS_1.csv"
+
+# Related-product cards appended to every page so its size is close to a live product page
+FILLER_CARDS = 120
+
+
+def handle_of(url: str) -> str:
+    match = re.search(r"/products/(?:all/)?([^/?#]+)", url)
+    return match.group(1) if match else "product"
+
+
+def raw_price(price: str) -> str:
+    # DATA_ANALYSIS_1 stores cleaned prices; pages show the rupee sign
+    return price.replace("Rs. ", "₹") if isinstance(price, str) else "N/A"
+
+
+def price_number(price: str):
+    digits = re.sub(r"[^\d.]", "", price.replace("Rs.", ""))
+    return float(digits) if digits else None
+
+
+def filler(site: str) -> str:
+    cards = "".join(
+        f'<li class="{site}-card"><a href="/products/related-{i}"><img src="/img/related-{i}.webp" alt="Related {i}">'
+        f'<p class="card-title">Related sneaker {i}</p><p class="card-price">₹{9999 + i * 100:,}</p></a></li>'
+        for i in range(FILLER_CARDS)
+    )
+    return f'<nav class="{site}-nav">{"<a href=/collections/all>Shop</a>" * 40}</nav><ul class="related">{cards}</ul>'
+
+
+def size_rows_of(rows: pd.DataFrame) -> list:
+    return [(r["size"], raw_price(r["price"])) for _, r in rows.iterrows() if r["size"] != "N/A"]
+
+
+def images_of(rows: pd.DataFrame) -> list:
+    return [src for src in rows.iloc[0]["images"].split(", ") if src not in ("N/A", "Error")]
+
+
+def page(title: str, site: str, main: str, tail: str = "") -> str:
+    return (
+        "<!DOCTYPE html><html><head><title>" + html.escape(title) + "</title></head><body>"
+        + filler(site) + "<main>" + main + "</main>" + tail + "</body></html>"
+    )
+
+################### MAINSTREET ######################
+
+def mainstreet_page(rows: pd.DataFrame) -> str:
+    first = rows.iloc[0]
+    size_rows = size_rows_of(rows)
+    # The theme serves protocol-relative image URLs
+    images = [src.replace("https:", "", 1) for src in images_of(rows)]
+    options = "".join(f'<option value="{html.escape(size)}">{html.escape(size)}</option>' for size, _ in size_rows)
+    thumbnails = "".join(f'<li><button><img src="{html.escape(src)}"></button></li>' for src in images)
+    price = html.escape(size_rows[0][1]) if size_rows else "N/A"
+    # Re-renders the price when a size is picked, like the theme's variant script
+    script = (
+        "<script>var prices = " + json.dumps(dict(size_rows), ensure_ascii=False) + ";"
+        "document.querySelector('select.select__select').addEventListener('change', function (e) {"
+        "setTimeout(function () { document.querySelector('span.price-item--regular').textContent = prices[e.target.value]; }, 50);"
+        "});</script>"
+    )
+    main = (
+        '<div class="product__title"><h2 class="h1">' + html.escape(first["title"]) + "</h2></div>"
+        + '<div class="price"><span class="price-item price-item--regular">' + price + "</span></div>"
+        + '<div class="select"><select class="select__select" name="options[Size]">' + options + "</select></div>"
+        + '<div class="product__description rte">' + html.escape(first["description"]) + "</div>"
+        + '<ul id="Slider-Thumbnails-template">' + thumbnails + "</ul>"
+        + '<div class="product__media media media--transparent"><img src="' + html.escape(images[0] if images else "") + '"></div>'
+    )
+    return page(first["title"], "ms", main, script)
+
+################### CREPDOGCREW ######################
+
+def crepdogcrew_page(rows: pd.DataFrame) -> str:
+    first = rows.iloc[0]
+    size_rows = size_rows_of(rows)
+    images = [src.replace("https:", "", 1) for src in images_of(rows)]
+    swatches = "".join(
+        f'<input type="radio" id="option-size-{i}" name="size" value="{html.escape(size)}">'
+        f'<label class="block-swatch" for="option-size-{i}"><span>{html.escape(size)}</span></label>'
+        for i, (size, _) in enumerate(size_rows)
+    )
+    sku = "" if first["sku"] == "N/A" else f'<p>SKU - {html.escape(first["sku"])}</p>'
+    price = html.escape(size_rows[0][1]) if size_rows else "N/A"
+    script = (
+        "<script>var prices = " + json.dumps([p for _, p in size_rows], ensure_ascii=False) + ";"
+        "document.querySelectorAll('fieldset.variant-picker__option input').forEach(function (input, i) {"
+        "input.addEventListener('click', function () {"
+        "setTimeout(function () { document.querySelector('sale-price span.cvc-money').textContent = prices[i]; }, 50);"
+        "}); });</script>"
+    )
+    main = (
+        '<h1 class="product-info__title">' + html.escape(first["title"]) + "</h1>"
+        + '<sale-price class="text-lg"><span class="cvc-money">' + price + "</span></sale-price>"
+        + '<fieldset class="variant-picker__option"><legend>Size:</legend>' + swatches + "</fieldset>"
+        + '<div class="accordion__content"><div class="prose"><p>' + html.escape(first["description"]) + "</p>" + sku + "</div></div>"
+        + '<div class="product-gallery__media snap-center is-selected"><img src="' + html.escape(images[0] if images else "") + '"></div>'
+        + "<page-dots>" + "".join(f'<button><img src="{html.escape(src)}"></button>' for src in images) + "</page-dots>"
+    )
+    return page(first["title"], "cdc", main, script)
+
+################### SHOPIFY PRODUCT JSON ######################
+
+def shopify_product(rows: pd.DataFrame, sku_in_description: bool) -> str:
+    # /products/<handle>.js payload for the Shopify fast path
+    first = rows.iloc[0]
+    description = "<p>" + html.escape(first["description"]) + "</p>"
+    if sku_in_description and first["sku"] != "N/A":
+        description += "<p>SKU - " + html.escape(first["sku"]) + "</p>"
+    size_rows = size_rows_of(rows)
+    return json.dumps({
+        "title": first["title"],
+        "handle": handle_of(first["url"]),
+        "description": description,
+        "options": [{"name": "Size", "position": 1, "values": [size for size, _ in size_rows]}],
+        "images": [src.replace("https:", "", 1) for src in images_of(rows)],
+        "variants": [
+            {"id": i + 1, "title": size, "option1": size, "available": True, "price": round(price_number(price) * 100)}
+            for i, (size, price) in enumerate(size_rows)
+        ],
+    }, ensure_ascii=False)
+
+################### HYPEFLY ######################
+
+def hypefly_page(rows: pd.DataFrame) -> str:
+    first = rows.iloc[0]
+    size_rows = size_rows_of(rows)
+    images = [src.replace("https://hypefly.co.in", "", 1) for src in images_of(rows)]
+    sizes = "".join(
+        f'<li><p>{html.escape(size)}</p><p>{html.escape(price)}</p></li>' for size, price in size_rows
+    )
+    main = (
+        '<h1 class="text-2xl">' + html.escape(first["title"]) + "</h1>"
+        + "".join(f'<img alt="{html.escape(first["title"])}" src="{html.escape(src)}">' for src in images[:1])
+        + '<button type="button"><p>Size:</p></button>'
+        + '<ul class="grid grid-cols-4">' + sizes + "</ul>"
+        + '<div class="bg-gray-200 p-4"><p>SKU: ' + html.escape(first["sku"]) + "</p>"
+        + '<div class="staticPage">' + html.escape(first["description"]) + "</div></div>"
+    )
+    return page(first["title"], "hf", main)
+
+################### CULTURE-CIRCLE ######################
+
+def culture_circle_page(rows: pd.DataFrame) -> str:
+    first = rows.iloc[0]
+    images = images_of(rows)
+    size_rows = size_rows_of(rows)
+
+    state = {
+        "props": {
+            "pageProps": {
+                "product": {
+                    "name": first["title"],
+                    "description": html.escape(first["description"]),
+                    "images": [{"url": src} for src in images],
+                    "sizes": [{"size": size, "price": price_number(price)} for size, price in size_rows],
+                },
+            },
+        },
+        "page": "/products/all/[slug]",
+        "buildId": "saved",
+    }
+
+    thumbnails = "".join(f'<img class="a_thumbnailImage___06oR" src="{html.escape(src)}">' for src in images)
+    slides = "".join(
+        f'<div class="a_sizeSlide__FHiSL"><div class="a_sizeSlideSize__jBG1p">{html.escape(size)}</div>'
+        f'<p class="a_sizeSlidePrice__NASxX">{html.escape(price)}</p></div>'
+        for size, price in size_rows
+    )
+    main = (
+        '<div class="a_productHeading__jLymj"><h2>' + html.escape(first["title"]) + "</h2></div>"
+        + '<div class="a_imageWrapper__fi6Ev"><img class="a_mainImage__kjiv_" src="' + html.escape(images[0] if images else "") + '"></div>'
+        + thumbnails
+        + '<div class="sizes">' + slides + "</div>"
+        + '<p class="w-full">' + html.escape(first["description"]) + "</p>"
+    )
+    state_script = '<script id="__NEXT_DATA__" type="application/json">' + json.dumps(state, ensure_ascii=False) + "</script>"
+    return page(first["title"], "cc", main, state_script)
+
+
+# Shopify stores also get a product JSON file next to each page
+SHOPIFY_JSON = {
+    "mainstreet": lambda rows: shopify_product(rows, sku_in_description=False),
+    "crepdogcrew": lambda rows: shopify_product(rows, sku_in_description=True),
+}
+
+BUILDERS = {
+    "Mainstreet": ("mainstreet", mainstreet_page),
+    "Crepdogcrew": ("crepdogcrew", crepdogcrew_page),
+    "Hypefly": ("hypefly", hypefly_page),
+    "Culture-circle": ("culture-circle", culture_circle_page),
+}
+
+################### WRITE PAGES ######################
+
+def write_pages(source_csv=SOURCE_CSV, pages_dir=PAGES_DIR) -> list:
+    df = pd.read_csv(source_csv, keep_default_na=False)
+    written = []
+    for (source, url), rows in df.groupby(["source", "url"], sort=False):
+        if source not in BUILDERS:
+            continue
+        site, builder = BUILDERS[source]
+        os.makedirs(os.path.join(pages_dir, site), exist_ok=True)
+        path = os.path.join(pages_dir, site, handle_of(url) + ".html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(builder(rows))
+        written.append(path)
+        if site in SHOPIFY_JSON:
+            path = os.path.join(pages_dir, site, handle_of(url) + ".js")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(SHOPIFY_JSON[site](rows))
+            written.append(path)
+    return written
+
+
+def load_pages(site: str, pages_dir=PAGES_DIR, extension=".html") -> dict:
+    site_dir = os.path.join(pages_dir, site)
+    pages = {}
+    for name in sorted(os.listdir(site_dir)):
+        if name.endswith(extension):
+            with open(os.path.join(site_dir, name), encoding="utf-8") as f:
+                pages[name[:-len(extension)]] = f.read()
+    return pages
+
+
+if __name__ == "__main__":
+    for path in write_pages(*sys.argv[1:2]):
+        print(f"Wrote {path}")
@@ -0,0 +1,78 @@
+################### IMPORTS ######################
+
+import pandas as pd
+
+################### SETTINGS ######################
+
+# Columns that describe a product page once, whatever size a row is for
+PRODUCT_COLUMNS = ["title", "url", "description", "sku", "images", "source"]
+
+# Columns with few distinct values, held as categoricals (dictionary-encoded in parquet and arrow parts)
+CATEGORICAL_COLUMNS = ["source", "size", "price", "currency", "size_system"]
+
+# Column order of the flat rows the scrapers return and the CSVs are written in
+FLAT_COLUMNS = ["title", "url", "size", "price", "description", "sku", "images", "source"]
+
+# A product's number within its task; with the task it keys the product table
+PRODUCT_KEY = "_product"
+
+################### TABLES ######################
+
+def encode(df: pd.DataFrame) -> pd.DataFrame:
+    # Categorical dtype for the low-cardinality columns present. Categoricals with different
+    # categories concat to object, so frames are encoded again after every pd.concat.
+    for column in CATEGORICAL_COLUMNS:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    return df
+
+
+def split_rows(df: pd.DataFrame, by: str):
+    # (products, variants) for flat rows: one product row per distinct page in each `by` group,
+    # and the per-size rows pointing at it through (by, PRODUCT_KEY)
+    product_columns = [column for column in PRODUCT_COLUMNS if column in df]
+    keys = [by, PRODUCT_KEY]
+    df = df.assign(**{PRODUCT_KEY: df.groupby([by] + product_columns, sort=False, dropna=False).ngroup()})
+    products = df.drop_duplicates(keys)[keys + product_columns].reset_index(drop=True)
+    variants = df.drop(columns=product_columns).reset_index(drop=True)
+    return encode(products), encode(variants)
+
+
+def materialize(products: pd.DataFrame, variants: pd.DataFrame, by: str) -> pd.DataFrame:
+    # The flat rows again, in variant order and with their original dtypes: the view the CSVs
+    # and the best-price functions work on, built one chunk at a time just before it is needed
+    keys = [by, PRODUCT_KEY]
+    flat = variants.merge(products, on=keys, how="left", sort=False)
+    first = [column for column in FLAT_COLUMNS if column in flat]
+    flat = flat[first + [column for column in flat.columns if column not in first and column != PRODUCT_KEY]]
+    for column in CATEGORICAL_COLUMNS:
+        if column in flat and isinstance(flat[column].dtype, pd.CategoricalDtype):
+            flat[column] = flat[column].astype(flat[column].cat.categories.dtype)
+    return flat
+
+
+def referenced(products: pd.DataFrame, variants: pd.DataFrame, by: str) -> pd.DataFrame:
+    # The product rows some variant still points at
+    keys = [by, PRODUCT_KEY]
+    return products[pd.MultiIndex.from_frame(products[keys]).isin(pd.MultiIndex.from_frame(variants[keys]))]
+
+################### MEMORY ######################
+
+def memory_mb(*frames) -> float:
+    return sum(frame.memory_usage(deep=True).sum() for frame in frames) / 1024 ** 2
+
+
+def memory_report(flat: pd.DataFrame, products: pd.DataFrame, variants: pd.DataFrame) -> dict:
+    # Deep in-memory size of the flat rows against the product and variant tables
+    flat_mb, tables_mb = memory_mb(flat), memory_mb(products, variants)
+    return {
+        "rows": len(flat),
+        "products": len(products),
+        "flat_mb": round(flat_mb, 2),
+        "products_mb": round(memory_mb(products), 2),
+        "variants_mb": round(memory_mb(variants), 2),
+        "saving": round(1 - tables_mb / flat_mb, 3) if flat_mb else 0.0,
+        "by_column_mb": {
+            column: round(flat[column].memory_usage(deep=True, index=False) / 1024 ** 2, 2) for column in flat.columns
+        },
+    }
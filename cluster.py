@@ -0,0 +1,456 @@
+################### IMPORTS ######################
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+import pandas as pd
+from job_queue import Job
+from orchestrator import domain_key
+
+logger = logging.getLogger(__name__)
+
+################### SETTINGS ######################
+
+CLUSTER_DIR = ".scrape_cluster"   # FileBroker's directory; workers on other hosts need it shared
+PREFETCH = 2                      # jobs waiting in the shards per worker slot, on top of the running ones
+POLL_INTERVAL = 0.1               # seconds between FileBroker checks of an empty shard or result box
+HEARTBEAT_INTERVAL = 2.0          # seconds between a worker's heartbeats, sent while Worker.run is active
+WORKER_TIMEOUT = 30.0             # a worker not heard from for this long gets no new jobs
+
+# A job's outcome as a worker reports it: rows is a DataFrame or None, failure (phase, error
+# message) or None, stolen whether the job came from another worker's shard
+Result = namedtuple("Result", ["job", "worker", "rows", "failure", "seconds", "stolen"])
+
+
+def error_text(error) -> str:
+    # Results cross process and host boundaries, so errors travel as text (as JobQueue stores them)
+    return f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+
+################### LOCAL BROKER ######################
+
+class LocalBroker:
+    """In-process broker for workers running as threads: a deque per worker shard and a result
+    list behind one lock. Stands in for FileBroker in tests and benchmarks.
+
+    Brokers hand jobs from the coordinator to workers and results back. A worker takes from the
+    front of its own shard; when that is empty it steals from the back of the longest other shard,
+    so a shard stuck behind a slow store is worked off by everyone."""
+
+    def __init__(self, steal=True):
+        self.steal = steal
+        self.stats = {"dispatched": 0, "taken": 0, "stolen": 0, "results": 0}
+        self._lock = threading.Condition()   # notified whenever there is something new to take or collect
+        self._shards = {}
+        self._results = []
+        self._stopped = False
+
+    def reset(self):
+        with self._lock:
+            self._shards = {worker: deque() for worker in self._shards}
+            self._results, self._stopped = [], False
+
+    def join(self, worker: str):
+        with self._lock:
+            self._shards.setdefault(worker, deque())
+
+    def heartbeat(self, worker: str):
+        # Threads in this process are alive for as long as it is
+        pass
+
+    def workers(self) -> list:
+        with self._lock:
+            return list(self._shards)
+
+    def dispatch(self, worker: str, job: Job):
+        with self._lock:
+            self._shards.setdefault(worker, deque()).append(job)
+            self.stats["dispatched"] += 1
+            self._lock.notify_all()
+
+    def take(self, worker: str):
+        # (job, stolen) or None when every shard is empty
+        with self._lock:
+            own = self._shards.setdefault(worker, deque())
+            if own:
+                self.stats["taken"] += 1
+                return own.popleft(), False
+            if not self.steal:
+                return None
+            victim = max(self._shards.values(), key=len)
+            if not victim:
+                return None
+            self.stats["taken"] += 1
+            self.stats["stolen"] += 1
+            return victim.pop(), True
+
+    def report(self, result: Result):
+        with self._lock:
+            self._results.append(result)
+            self._lock.notify_all()
+
+    def collect(self) -> list:
+        with self._lock:
+            results, self._results = self._results, []
+            self.stats["results"] += len(results)
+        return results
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self._lock.notify_all()
+
+    def stopped(self, since=0.0) -> bool:
+        return self._stopped
+
+    def wait(self, timeout):
+        # Until a job is dispatched, a result reported or the run stopped, or timeout seconds
+        with self._lock:
+            self._lock.wait(timeout)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(self.stats, queued=sum(len(shard) for shard in self._shards.values()))
+
+################### FILE BROKER ######################
+
+class FileBroker:
+    """Broker over a directory, for worker processes on this host or, with the directory on a
+    shared filesystem, on others. Every job is a JSON file in its worker's shard directory;
+    taking a job renames it into running/, and a rename only succeeds once, so two workers
+    never get the same job. Results come back as JSON files in results/."""
+
+    def __init__(self, path=CLUSTER_DIR, steal=True, worker_timeout=WORKER_TIMEOUT):
+        self.path = path
+        self.steal = steal
+        self.worker_timeout = worker_timeout
+        # Counted in the coordinator's process; takes and steals are counted by the workers' results
+        self.stats = {"dispatched": 0, "results": 0}
+        for name in ("shards", "running", "results", "workers"):
+            os.makedirs(os.path.join(path, name), exist_ok=True)
+
+    def _dir(self, *parts) -> str:
+        return os.path.join(self.path, *parts)
+
+    def _write(self, path, payload):
+        # Written beside the target and renamed into place, so readers never see half a file
+        tmp_path = os.path.join(os.path.dirname(path), f".tmp-{uuid.uuid4().hex}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        # Clears a previous run's jobs, results and stop flag; registered workers stay
+        for name in ("shards", "running", "results"):
+            shutil.rmtree(self._dir(name), ignore_errors=True)
+            os.makedirs(self._dir(name))
+        if os.path.exists(self._dir("STOP")):
+            os.remove(self._dir("STOP"))
+
+    ################### WORKERS ######################
+
+    def join(self, worker: str):
+        os.makedirs(self._dir("shards", worker), exist_ok=True)
+        self.heartbeat(worker)
+
+    def heartbeat(self, worker: str):
+        with open(self._dir("workers", worker), "w", encoding="utf-8") as f:
+            f.write(str(time.time()))
+
+    def workers(self) -> list:
+        # Workers with a recent heartbeat
+        now, live = time.time(), []
+        for name in sorted(os.listdir(self._dir("workers"))):
+            try:
+                if now - os.path.getmtime(self._dir("workers", name)) < self.worker_timeout:
+                    live.append(name)
+            except FileNotFoundError:
+                continue
+        return live
+
+    ################### JOBS ######################
+
+    def dispatch(self, worker: str, job: Job):
+        os.makedirs(self._dir("shards", worker), exist_ok=True)
+        self._write(self._dir("shards", worker, f"{job.task:012d}.json"), job._asdict())
+        self.stats["dispatched"] += 1
+
+    def _shard(self, worker) -> list:
+        try:
+            return sorted(name for name in os.listdir(self._dir("shards", worker)) if name.endswith(".json"))
+        except FileNotFoundError:
+            return []
+
+    def _claim(self, worker, owner, names):
+        # The first of names this worker manages to rename into running/, as a Job
+        for name in names:
+            running = self._dir("running", f"{worker}-{name}")
+            try:
+                os.rename(self._dir("shards", owner, name), running)
+            except FileNotFoundError:
+                continue  # another worker took it first
+            with open(running, encoding="utf-8") as f:
+                return Job(**json.load(f)), running
+        return None
+
+    def take(self, worker: str):
+        # (job, stolen) or None when every shard is empty
+        claimed = self._claim(worker, worker, self._shard(worker))
+        stolen = False
+        if claimed is None and self.steal:
+            shards = {owner: self._shard(owner) for owner in os.listdir(self._dir("shards")) if owner != worker}
+            for owner in sorted(shards, key=lambda owner: -len(shards[owner])):
+                if not shards[owner]:
+                    break
+                claimed = self._claim(worker, owner, reversed(shards[owner]))
+                if claimed is not None:
+                    stolen = True
+                    break
+        if claimed is None:
+            return None
+        job, running = claimed
+        os.remove(running)  # the coordinator re-leases the job if this worker dies with it
+        return job, stolen
+
+    ################### RESULTS ######################
+
+    def report(self, result: Result):
+        # Split orientation keeps the columns of a page that produced no rows
+        rows = None if result.rows is None else result.rows.to_dict(orient="split", index=False)
+        payload = result._replace(job=result.job._asdict(), rows=rows)._asdict()
+        self._write(self._dir("results", f"{result.job.task:012d}-{uuid.uuid4().hex[:8]}.json"), payload)
+
+    def collect(self) -> list:
+        results = []
+        for name in sorted(os.listdir(self._dir("results"))):
+            if name.startswith("."):
+                continue
+            path = self._dir("results", name)
+            with open(path, encoding="utf-8") as f:
+                payload = json.load(f)
+            os.remove(path)
+            rows = payload["rows"]
+            rows = None if rows is None else pd.DataFrame(rows["data"], columns=rows["columns"])
+            failure = tuple(payload["failure"]) if payload["failure"] is not None else None
+            results.append(Result(Job(**payload["job"]), payload["worker"], rows, failure,
+                                  payload["seconds"], payload["stolen"]))
+        self.stats["results"] += len(results)
+        return results
+
+    def stop(self):
+        with open(self._dir("STOP"), "w", encoding="utf-8") as f:
+            f.write(str(time.time()))
+
+    def stopped(self, since=0.0) -> bool:
+        # A stop flag left by a run that ended before this worker started does not count
+        try:
+            return os.path.getmtime(self._dir("STOP")) >= since
+        except FileNotFoundError:
+            return False
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, POLL_INTERVAL))
+
+    def metrics(self) -> dict:
+        queued = sum(len(self._shard(owner)) for owner in os.listdir(self._dir("shards")))
+        return dict(self.stats, queued=queued)
+
+################### WORKER ######################
+
+class Worker:
+    """Runs jobs from a broker with `slots` threads until the coordinator stops the run. scrape
+    maps a Job to (rows, failure), the rows ready for the output sink (see main.scrape_cluster_job)."""
+
+    def __init__(self, broker, scrape, name=None, slots=1):
+        self.broker = broker
+        self.scrape = scrape
+        self.name = name or worker_name()
+        self.slots = slots
+
+    def _run_slot(self, started):
+        while True:
+            taken = self.broker.take(self.name)
+            if taken is None:
+                if self.broker.stopped(started):
+                    return
+                self.broker.wait(POLL_INTERVAL)
+                continue
+            job, stolen = taken
+            start = time.perf_counter()
+            try:
+                rows, failure = self.scrape(job)
+            except Exception as e:
+                rows, failure = None, ("scrape", e)
+            if failure is not None:
+                failure = (failure[0], error_text(failure[1]))
+            self.broker.report(Result(job, self.name, rows, failure, time.perf_counter() - start, stolen))
+
+    def _send_heartbeats(self, done):
+        # From a thread of its own, so a page running for its whole budget does not make the
+        # coordinator take this worker for dead and hand its leases to another
+        while not done.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.broker.heartbeat(self.name)
+            except OSError as e:
+                logger.warning("Heartbeat of %s failed: %s", self.name, e)
+
+    def run(self):
+        started = time.time()
+        self.broker.join(self.name)
+        done = threading.Event()
+        heartbeats = threading.Thread(target=self._send_heartbeats, args=(done,), name=f"{self.name}-heartbeat", daemon=True)
+        heartbeats.start()
+        slots = [threading.Thread(target=self._run_slot, args=(started,), name=f"{self.name}-{slot}", daemon=True)
+                 for slot in range(self.slots)]
+        try:
+            for slot in slots:
+                slot.start()
+            for slot in slots:
+                slot.join()
+        finally:
+            done.set()
+            heartbeats.join()
+
+    def start(self) -> threading.Thread:
+        # run() on a thread of its own, for workers sharing a LocalBroker
+        thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        thread.start()
+        return thread
+
+
+def start_worker_processes(path, count, slots=1) -> list:
+    # `python cluster.py worker` processes on this host, serving the FileBroker at path
+    script = os.path.abspath(__file__)
+    return [subprocess.Popen([sys.executable, script, "worker", "--dir", os.path.abspath(path), "--slots", str(slots)],
+                             cwd=os.path.dirname(script)) for _ in range(count)]
+
+################### COORDINATOR ######################
+
+class Coordinator:
+    """Drains a JobQueue through a broker. Jobs are leased a round at a time, as in-process
+    scraping does, and each store's jobs go to one worker's shard, so a store's pages are
+    normally fetched by one browser on one host; idle workers steal the rest. The coordinator
+    is the only writer of the queue and the output sink, so results from every worker end up in
+    the same outputs. A job whose worker dies is leased out again once its lease expires."""
+
+    def __init__(self, broker, per_domain, prefetch=PREFETCH):
+        self.broker = broker
+        self.per_domain = per_domain
+        self.prefetch = prefetch
+        self.stats = {"dispatched": 0, "results": 0, "duplicates": 0, "seconds": 0.0}
+        self.by_worker = {}
+        self._shards = {}          # domain -> worker
+
+    def shard_for(self, url, workers) -> str:
+        # A store stays with its worker while that worker is alive; a new store goes to the
+        # worker with the fewest stores
+        domain = domain_key(url)
+        if self._shards.get(domain) not in workers:
+            load = {worker: 0 for worker in workers}
+            for owner in self._shards.values():
+                if owner in load:
+                    load[owner] += 1
+            self._shards[domain] = min(workers, key=lambda worker: (load[worker], worker))
+        return self._shards[domain]
+
+    def _record(self, result):
+        stats = self.by_worker.setdefault(result.worker, {"jobs": 0, "failed": 0, "stolen": 0, "rows": 0,
+                                                          "busy_s": 0.0})
+        stats["jobs"] += 1
+        stats["failed"] += result.failure is not None
+        stats["stolen"] += bool(result.stolen)
+        stats["rows"] += 0 if result.rows is None else len(result.rows)
+        stats["busy_s"] += result.seconds
+
+    def run(self, queue, sink, finish, slots, producer=None):
+        # Until the queue has nothing left to run: keeps about slots * prefetch jobs out, and passes
+        # every result to finish(queue, sink, job, rows, failure) (see main.finish_rows). slots
+        # is the number of worker slots expected; workers may join and leave during the run.
+        start = time.perf_counter()
+        self.broker.reset()
+        outstanding, waiting = {}, False
+        while True:
+            producing = producer is not None and producer.is_alive()
+            workers = self.broker.workers()
+            if not workers and not waiting:
+                logger.info("Waiting for workers to join the broker")
+            waiting = not workers
+            leased = False
+            if workers and len(outstanding) < max(slots, len(workers)) * self.prefetch:
+                for job in queue.lease(self.per_domain):
+                    # A job already out was re-leased after its lease expired: its worker is presumed gone
+                    outstanding[job.task] = job
+                    self.broker.dispatch(self.shard_for(job.url, workers), job)
+                    self.stats["dispatched"] += 1
+                    leased = True
+            results = self.broker.collect()
+            for result in results:
+                job = outstanding.pop(result.job.task, None)
+                if job is None:
+                    self.stats["duplicates"] += 1  # a re-leased job finished twice; the first result counted
+                    continue
+                self._record(result)
+                finish(queue, sink, job, result.rows, result.failure)
+            self.stats["results"] += len(results)
+            if leased or results:
+                continue
+            # Nothing came back: a good moment to checkpoint what the sink has buffered
+            sink.flush()
+            due = queue.next_due()
+            if not outstanding and due is None and not producing:
+                break
+            # With nothing out, sleep through the backoffs as drain_queue does
+            idle = not outstanding and not producing and workers and due is not None
+            if idle:
+                time.sleep(max(due, POLL_INTERVAL))
+            else:
+                self.broker.wait(POLL_INTERVAL)
+        self.broker.stop()
+        self.stats["seconds"] = round(time.perf_counter() - start, 3)
+
+    def worker_report(self) -> pd.DataFrame:
+        # One row per worker: jobs, failures, stolen jobs, rows, and throughput over the run
+        seconds = self.stats["seconds"] or 1.0
+        rows = [dict(worker=worker, **stats, jobs_per_min=round(stats["jobs"] * 60 / seconds, 1),
+                     utilization=round(stats["busy_s"] / seconds, 2))
+                for worker, stats in sorted(self.by_worker.items())]
+        report = pd.DataFrame(rows, columns=["worker", "jobs", "failed", "stolen", "rows", "busy_s",
+                                             "jobs_per_min", "utilization"])
+        report["busy_s"] = report["busy_s"].round(1)
+        return report
+
+    def metrics(self) -> dict:
+        return dict(self.stats, workers=len(self.by_worker), broker=self.broker.metrics())
+
+################### WORKER PROCESS ######################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape jobs a coordinator (main.py) hands out")
+    parser.add_argument("role", choices=["worker"])
+    parser.add_argument("--dir", default=CLUSTER_DIR, help="the coordinator's broker directory")
+    parser.add_argument("--slots", type=int, default=1, help="jobs this worker runs at a time")
+    parser.add_argument("--name")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    from main import scrape_cluster_job
+    from driver_pool import DRIVER_POOL
+
+    worker = Worker(FileBroker(args.dir), scrape_cluster_job, args.name, args.slots)
+    print(f"Worker {worker.name} serving {args.dir} with {args.slots} slots")
+    try:
+        worker.run()
+    finally:
+        DRIVER_POOL.close()
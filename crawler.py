@@ -0,0 +1,260 @@
+################### IMPORTS ######################
+
+import hashlib
+import logging
+import math
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+from bs4 import BeautifulSoup, SoupStrainer
+from html_parser import PARSER_BACKEND
+from http_session import SESSION, html_text
+from rate_limiter import RATE_LIMITER
+from site_spec import SITES, Discovery
+from tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+################### SETTINGS ######################
+
+# The seen-set is sized for this many product URLs; past it the false-positive rate climbs
+FRONTIER_CAPACITY = 1_000_000
+FRONTIER_ERROR_RATE = 1e-4       # chance a new URL is taken for one already seen (and skipped)
+
+SHOPIFY_PAGE_SIZE = 250          # products per collection feed page, Shopify's maximum
+MAX_LISTING_PAGES = 500          # pages walked per seed at most, in case pagination never ends
+DISCOVERY_WORKERS = 4            # seeds crawled at the same time
+STREAM_BUFFER = 64               # pages of URLs a seed can run ahead of the consumer
+
+# Listing pages are parsed for their links only
+LINK_STRAINER = SoupStrainer("a")
+
+# Used for seeds no site spec claims
+DEFAULT_DISCOVERY = Discovery("default.discovery", {})
+
+################### SEEN SET ######################
+
+class BloomFilter:
+    """Fixed-size set of strings: no false negatives, FRONTIER_ERROR_RATE false positives
+    up to its capacity, and memory that does not grow with the number of URLs."""
+
+    def __init__(self, capacity=FRONTIER_CAPACITY, error_rate=FRONTIER_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.count = 0
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, item):
+        # k positions from two 64-bit halves of one digest (Kirsch-Mitzenmacher double hashing)
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.bits for i in range(self.hashes)]
+
+    def add(self, item) -> bool:
+        # True if item was new; False if it (probably) was added before
+        new = False
+        array = self._array
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not array[position >> 3] & mask:
+                array[position >> 3] |= mask
+                new = True
+        self.count += new
+        return new
+
+    def __contains__(self, item) -> bool:
+        return all(self._array[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._array)
+
+################### FRONTIER ######################
+
+COLLECTION_PREFIX = re.compile(r"/collections/[^/]+(?=/products/)")
+
+
+def canonical_url(url: str) -> str:
+    # One spelling per product: no query or fragment, lower-case host, no trailing slash,
+    # and Shopify's /collections/<handle>/products/<product> reduced to /products/<product>
+    parsed = urlparse(url)
+    path = COLLECTION_PREFIX.sub("", parsed.path).rstrip("/") or "/"
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), path, "", "", ""))
+
+
+class Frontier:
+    """Product URLs in the order they were discovered, each handed out once."""
+
+    def __init__(self, capacity=FRONTIER_CAPACITY, error_rate=FRONTIER_ERROR_RATE):
+        self.seen = BloomFilter(capacity, error_rate)
+        self.stats = {"offered": 0, "new": 0, "duplicates": 0}
+
+    def add(self, url: str):
+        # The canonical URL if it was not seen before, otherwise None
+        url = canonical_url(url)
+        self.stats["offered"] += 1
+        if self.seen.add(url):
+            self.stats["new"] += 1
+            return url
+        self.stats["duplicates"] += 1
+        return None
+
+    def metrics(self) -> dict:
+        return dict(
+            self.stats,
+            seen_set_kb=round(self.seen.nbytes / 1024, 1),
+            seen_set_fill=round(self.seen.count / self.seen.capacity, 4),
+        )
+
+################### CRAWLER ######################
+
+def shopify_feed_url(url: str, page: int) -> str:
+    # /collections/<handle>/products.json for a collection URL, keeping any prefix (locale, fixture path)
+    parsed = urlparse(url)
+    match = re.search(r"/collections/[^/?#]+", parsed.path)
+    if not match:
+        raise ValueError(f"Not a Shopify collection URL: {url}")
+    query = urlencode({"limit": SHOPIFY_PAGE_SIZE, "page": page})
+    return f"{parsed.scheme}://{parsed.netloc}{parsed.path[:match.end()]}/products.json?{query}"
+
+
+def with_query_param(url: str, name: str, value) -> str:
+    parsed = urlparse(url)
+    params = [(key, val) for key, val in parse_qsl(parsed.query, keep_blank_values=True) if key != name]
+    return urlunparse(parsed._replace(query=urlencode(params + [(name, value)])))
+
+
+class DiscoveryCrawler:
+    """Walks collection and listing pages and streams the product URLs they link to.
+
+    Seeds are fetched concurrently, but URLs come out seed by seed, each seed's in page
+    order, and are deduplicated by the consumer. The same seeds give the same sequence,
+    which is what lets a crashed run resume by position."""
+
+    def __init__(self, frontier=None, session=None, workers=DISCOVERY_WORKERS, max_pages=MAX_LISTING_PAGES, sites=SITES):
+        self.frontier = frontier if frontier is not None else Frontier()
+        self.session = session or SESSION
+        self.workers = workers
+        self.max_pages = max_pages
+        self.sites = sites
+        self.stats = {"seeds": 0, "pages": 0, "feed_pages": 0, "links": 0, "failed_seeds": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def _fetch(self, site, url, accept):
+        with TRACER.span("discover_fetch", site=site, url=url):
+            with RATE_LIMITER.request(url) as request:
+                response = self.session.get(url, headers={"Accept": accept}, timeout=15)
+                request.observe(response.status_code, html_text(response), response.headers.get("Retry-After"))
+            response.raise_for_status()
+        return response
+
+    ################### PAGES ######################
+
+    def feed_pages(self, site, seed):
+        # Product URLs of a Shopify collection, one list per products.json page
+        parsed = urlparse(seed)
+        prefix = parsed.path[:parsed.path.index("/collections/")]
+        for page in range(1, self.max_pages + 1):
+            products = self._fetch(site, shopify_feed_url(seed, page), "application/json").json().get("products") or []
+            self._count(feed_pages=1)
+            if not products:
+                return
+            yield [f"{parsed.scheme}://{parsed.netloc}{prefix}/products/{product['handle']}"
+                   for product in products if product.get("handle")]
+            if len(products) < SHOPIFY_PAGE_SIZE:
+                return
+
+    def listing_pages(self, site, seed, discovery):
+        # Product URLs linked from a listing page and the pages after it, one list per page
+        url, page, visited, previous = seed, 1, set(), None
+        while url is not None and url not in visited and len(visited) < self.max_pages:
+            visited.add(url)
+            response = self._fetch(site, url, "text/html")
+            with TRACER.span("discover_parse", site=site, url=url):
+                soup = BeautifulSoup(response.text, PARSER_BACKEND, parse_only=LINK_STRAINER)
+                links = [urljoin(url, a["href"]) for a in discovery.links.select(soup) if a.get("href")]
+                products = list(dict.fromkeys(link for link in links if discovery.product_pattern.search(urlparse(link).path)))
+                next_link = discovery.next.select_one(soup)
+            self._count(pages=1)
+            # A page with no products, or the same ones again, means the page parameter ran past the end
+            if not products or products == previous:
+                return
+            yield products
+            previous = products
+            if next_link is not None and next_link.get("href"):
+                url = urljoin(url, next_link["href"])
+            elif discovery.page_param:
+                page += 1
+                url = with_query_param(seed, discovery.page_param, page)
+            else:
+                url = None
+
+    def seed_site(self, seed):
+        # Site name and discovery settings of a seed; hosts without a spec get the default ones
+        site = self.sites.lookup(seed)
+        if site is None:
+            return urlparse(seed).netloc, DEFAULT_DISCOVERY
+        return site.name, site.discovery
+
+    def seed_pages(self, seed):
+        name, discovery = self.seed_site(seed)
+        if discovery.feed == "shopify" and "/collections/" in urlparse(seed).path:
+            return self.feed_pages(name, seed)
+        return self.listing_pages(name, seed, discovery)
+
+    ################### STREAM ######################
+
+    def _crawl_seed(self, seed, stream, stop):
+        def emit(item):
+            # Blocks while the consumer is behind, unless the crawl was abandoned
+            while not stop.is_set():
+                try:
+                    stream.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            for urls in self.seed_pages(seed):
+                self._count(links=len(urls))
+                if not emit(urls):
+                    return
+        except Exception as e:
+            self._count(failed_seeds=1)
+            logger.warning("Discovery stopped for %s: %s", seed, e)
+        finally:
+            emit(None)
+
+    def crawl(self, seeds):
+        # Yields (site, url) for every product URL not seen before, as soon as its seed's turn comes
+        seeds = list(seeds)
+        self._count(seeds=len(seeds))
+        streams = [queue.Queue(STREAM_BUFFER) for _ in seeds]
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                for seed, stream in zip(seeds, streams):
+                    executor.submit(self._crawl_seed, seed, stream, stop)
+                for seed, stream in zip(seeds, streams):
+                    name, _ = self.seed_site(seed)
+                    for urls in iter(stream.get, None):
+                        for url in urls:
+                            url = self.frontier.add(url)
+                            if url is not None:
+                                yield name, url
+            finally:
+                stop.set()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(self.stats, **self.frontier.metrics())
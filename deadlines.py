@@ -0,0 +1,136 @@
+################### IMPORTS ######################
+
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+################### SETTINGS ######################
+
+# Seconds a product page may spend in the browser, every wait included; a site spec's "budget" overrides it
+PAGE_BUDGET = 60.0
+
+################### DEADLINES ######################
+
+class DeadlineExceeded(TimeoutError):
+    """A required wait found its page's budget already spent."""
+
+
+class Deadline:
+    """One page's time budget. Waits ask it for their timeout instead of using their own."""
+
+    __slots__ = ("budget", "expires_at", "shape", "skipped", "skipped_s", "clipped", "clipped_s", "expired")
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+        self.shape = None         # what the page-shape probe made of the page (see site_engine.probe_page)
+        self.skipped = 0          # waits not run because the probe showed they could not succeed
+        self.skipped_s = 0.0      # the timeouts those waits would have used
+        self.clipped = 0          # waits cut short to fit the budget
+        self.clipped_s = 0.0
+        self.expired = False
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, requested, label="wait", required=False) -> float:
+        # The requested timeout, or what is left of the budget if that is less
+        remaining = self.remaining()
+        if remaining >= requested:
+            return requested
+        self.clipped += 1
+        self.clipped_s += requested - remaining
+        if not remaining:
+            self.expired = True
+            if required:
+                raise DeadlineExceeded(f"no time left for {label} ({self.budget:g}s budget)")
+        logger.info("%s cut to %.1fs of %.1fs by the page budget", label, remaining, requested)
+        return remaining
+
+    def skip(self, timeout, label="wait"):
+        # Records a wait the probe ruled out, with the timeout it would have had
+        self.skipped += 1
+        self.skipped_s += timeout
+        logger.info("skipped %s (%.1fs): the page is %s", label, timeout, self.shape)
+
+
+class Budgets:
+    """The current page's Deadline for each thread or asyncio task, and what the deadlines
+    and probes saved over the run."""
+
+    def __init__(self, budget=PAGE_BUDGET):
+        self.budget = budget
+        self._current = contextvars.ContextVar(f"deadline_{id(self)}", default=None)
+        self._lock = threading.Lock()
+        self.stats = {"pages": 0, "expired": 0, "waits_skipped": 0, "skipped_s": 0.0,
+                      "waits_clipped": 0, "clipped_s": 0.0, "spent_s": 0.0}
+        self.shapes = defaultdict(int)
+
+    def current(self):
+        return self._current.get()
+
+    @contextmanager
+    def page(self, budget=None):
+        # Runs a page under its own deadline; waits outside a page keep their timeouts
+        deadline = Deadline(budget or self.budget)
+        token = self._current.set(deadline)
+        try:
+            yield deadline
+        finally:
+            self._current.reset(token)
+            self._record(deadline)
+
+    def timeout(self, requested, label="wait", required=False) -> float:
+        deadline = self._current.get()
+        return requested if deadline is None else deadline.timeout(requested, label, required)
+
+    def skip(self, timeout, label="wait"):
+        deadline = self._current.get()
+        if deadline is not None:
+            deadline.skip(timeout, label)
+
+    def _record(self, deadline):
+        with self._lock:
+            stats = self.stats
+            stats["pages"] += 1
+            stats["expired"] += deadline.expired
+            stats["waits_skipped"] += deadline.skipped
+            stats["skipped_s"] += deadline.skipped_s
+            stats["waits_clipped"] += deadline.clipped
+            stats["clipped_s"] += deadline.clipped_s
+            stats["spent_s"] += deadline.budget - deadline.remaining()
+            self.shapes[deadline.shape or "unprobed"] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(
+                self.stats,
+                skipped_s=round(self.stats["skipped_s"], 1),
+                clipped_s=round(self.stats["clipped_s"], 1),
+                spent_s=round(self.stats["spent_s"], 1),
+                shapes=dict(self.shapes),
+            )
+
+    def prometheus_text(self) -> str:
+        metrics = self.metrics()
+        lines = [
+            "# HELP scraper_page_budget_saved_seconds Wait timeouts not spent: skipped after a probe, or cut by the budget",
+            "# TYPE scraper_page_budget_saved_seconds counter",
+            f'scraper_page_budget_saved_seconds{{reason="probe"}} {metrics["skipped_s"]}',
+            f'scraper_page_budget_saved_seconds{{reason="deadline"}} {metrics["clipped_s"]}',
+            "# HELP scraper_page_shapes_total Pages by what the page-shape probe found",
+            "# TYPE scraper_page_shapes_total counter",
+        ]
+        lines += [f'scraper_page_shapes_total{{shape="{shape}"}} {count}' for shape, count in sorted(metrics["shapes"].items())]
+        lines += ["# HELP scraper_page_budget_expired_total Pages that ran out of budget",
+                  "# TYPE scraper_page_budget_expired_total counter",
+                  f"scraper_page_budget_expired_total {metrics['expired']}"]
+        return "\n".join(lines) + "\n"
+
+
+BUDGETS = Budgets()
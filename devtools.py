@@ -0,0 +1,296 @@
+################### IMPORTS ######################
+
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import urllib.request
+import websocket
+from contextlib import asynccontextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from driver_pool import DRIVER_POOL
+from resource_policy import REPORT_RESOURCE_SAVINGS, SITE_RESOURCE_POLICIES, ResourceSavings
+
+logger = logging.getLogger(__name__)
+
+################### SETTINGS ######################
+
+# Tabs scraped at the same time inside the one browser
+DEFAULT_CONCURRENCY = 8
+
+# Chrome arguments for the shared browser; the site profiles only differ in window size
+DEVTOOLS_ARGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-blink-features=AutomationControlled",
+    "--window-size=1920,1080",
+]
+
+
+class DevToolsError(Exception):
+    pass
+
+################### CONNECTION ######################
+
+class DevToolsConnection:
+    """One websocket to the browser; commands are awaited from asyncio, replies are read on a thread."""
+
+    def __init__(self, ws_url: str, loop=None):
+        self.ws_url = ws_url
+        self.loop = loop or asyncio.get_running_loop()
+        # Chrome rejects websocket clients that send an Origin header it was not told to allow
+        self._ws = websocket.create_connection(ws_url, suppress_origin=True, enable_multithread=True)
+        self._ids = itertools.count(1)
+        self._pending = {}                  # command id -> future
+        self._waiters = {}                  # (session id, event) -> [future]
+        self._handlers = {}                 # (session id, event) -> callback(params)
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name="devtools-reader", daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        while True:
+            try:
+                message = json.loads(self._ws.recv())
+            except Exception as e:
+                self.loop.call_soon_threadsafe(self._fail_all, e)
+                return
+            self.loop.call_soon_threadsafe(self._dispatch, message)
+
+    def _dispatch(self, message):
+        if "id" in message:
+            future = self._pending.pop(message["id"], None)
+            if future is None or future.done():
+                return
+            if "error" in message:
+                future.set_exception(DevToolsError(message["error"].get("message", str(message["error"]))))
+            else:
+                future.set_result(message.get("result", {}))
+            return
+        key = (message.get("sessionId"), message.get("method"))
+        handler = self._handlers.get(key)
+        if handler is not None:
+            handler(message.get("params", {}))
+        for future in self._waiters.pop(key, []):
+            if not future.done():
+                future.set_result(message.get("params", {}))
+
+    def _fail_all(self, error):
+        for future in list(self._pending.values()):
+            if not future.done():
+                future.set_exception(DevToolsError(f"DevTools connection lost: {error}"))
+        self._pending.clear()
+
+    async def send(self, method: str, params=None, session_id=None, timeout=30):
+        command_id = next(self._ids)
+        message = {"id": command_id, "method": method, "params": params or {}}
+        if session_id is not None:
+            message["sessionId"] = session_id
+        future = self.loop.create_future()
+        self._pending[command_id] = future
+        with self._lock:
+            self._ws.send(json.dumps(message))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(command_id, None)
+
+    def expect(self, event: str, session_id=None):
+        # Register before sending the command that triggers the event, then await the future
+        future = self.loop.create_future()
+        self._waiters.setdefault((session_id, event), []).append(future)
+        return future
+
+    def on(self, event: str, callback, session_id=None):
+        self._handlers[(session_id, event)] = callback
+
+    def off(self, session_id):
+        # Drop every handler and waiter belonging to a closed tab
+        for key in [key for key in self._handlers if key[0] == session_id]:
+            del self._handlers[key]
+        for key in [key for key in self._waiters if key[0] == session_id]:
+            for future in self._waiters.pop(key):
+                future.cancel()
+
+    def close(self):
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+
+################### TABS ######################
+
+def as_function(script: str, args, callback=False) -> str:
+    # Selenium-style script bodies (arguments[i], return, callback last) as a CDP expression
+    call = f"(function () {{ {script}\n}}).apply(null, {json.dumps(list(args))}"
+    if callback:
+        return f"new Promise(function (resolve) {{ {call}.concat([resolve])); }})"
+    return call + ")"
+
+
+class Tab:
+    """A page inside the shared browser, optionally in its own browser context (cookies, storage)."""
+
+    def __init__(self, browser, target_id, session_id, context_id=None):
+        self.browser = browser
+        self.connection = browser.connection
+        self.target_id = target_id
+        self.session_id = session_id
+        self.context_id = context_id
+        self.url = None
+        self.policy = None
+        self.savings = ResourceSavings()
+
+    async def apply_policy(self, policy):
+        # Paused requests are all blocked ones: stubbed domains get an empty 200, the rest fail
+        self.policy = policy
+        if policy is not None and policy.fetch_patterns():
+            self.connection.on("Fetch.requestPaused", self._intercept, self.session_id)
+            await self.send("Fetch.enable", {"patterns": policy.fetch_patterns()})
+        if REPORT_RESOURCE_SAVINGS:
+            self.connection.on("Network.loadingFinished", lambda params: self.savings.loaded(params.get("encodedDataLength")), self.session_id)
+            await self.send("Network.enable")
+
+    def _intercept(self, params):
+        self.savings.block(params.get("resourceType"))
+        if self.policy.stubs(params["request"]["url"]):
+            command = self.send("Fetch.fulfillRequest", {"requestId": params["requestId"], "responseCode": 200, "body": ""})
+        else:
+            command = self.send("Fetch.failRequest", {"requestId": params["requestId"], "errorReason": "BlockedByClient"})
+        asyncio.ensure_future(command).add_done_callback(lambda future: future.cancelled() or future.exception())
+
+    async def send(self, method: str, params=None, timeout=30):
+        return await self.connection.send(method, params, self.session_id, timeout)
+
+    async def goto(self, url: str, timeout=30):
+        # timeout covers the whole navigation, up to the load event
+        self.url = url
+        expires_at = asyncio.get_running_loop().time() + timeout
+        loaded = self.connection.expect("Page.loadEventFired", self.session_id)
+        result = await self.send("Page.navigate", {"url": url}, timeout)
+        if result.get("errorText"):
+            loaded.cancel()
+            raise DevToolsError(f"Navigation to {url} failed: {result['errorText']}")
+        await asyncio.wait_for(loaded, max(0.0, expires_at - asyncio.get_running_loop().time()))
+
+    async def evaluate(self, expression: str, timeout=30):
+        result = await self.send("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+            "awaitPromise": True,
+        }, timeout)
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            description = details.get("exception", {}).get("description") or details.get("text")
+            raise DevToolsError(f"Script failed: {description}")
+        return result.get("result", {}).get("value")
+
+    async def execute_script(self, script: str, *args, timeout=30):
+        return await self.evaluate(as_function(script, args), timeout)
+
+    async def execute_async_script(self, script: str, *args, timeout=30):
+        return await self.evaluate(as_function(script, args, callback=True), timeout)
+
+    async def content(self) -> str:
+        return await self.evaluate("document.documentElement.outerHTML")
+
+    async def heap_used(self) -> int:
+        return (await self.send("Runtime.getHeapUsage")).get("usedSize", 0)
+
+    async def close(self):
+        self.connection.off(self.session_id)
+        try:
+            await self.connection.send("Target.closeTarget", {"targetId": self.target_id})
+            if self.context_id is not None:
+                await self.connection.send("Target.disposeBrowserContext", {"browserContextId": self.context_id})
+        except Exception as e:
+            logger.warning("Failed to close tab %s (%s)", self.target_id, e)
+
+################### BROWSER ######################
+
+class DevToolsBrowser:
+    """One Chrome process serving many concurrent tabs over the DevTools protocol."""
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, arguments=None, isolated=True, driver_path=None):
+        self.concurrency = concurrency
+        self.arguments = arguments if arguments is not None else DEVTOOLS_ARGS
+        self.isolated = isolated      # a fresh browser context per tab, like a freshly reset pooled driver
+        self._driver_path = driver_path
+        self.driver = None
+        self.connection = None
+        self.open_tabs = 0
+        self._slots = asyncio.Semaphore(concurrency)
+        self.stats = {"tabs_opened": 0, "peak_tabs": 0, "failures": 0, "requests_blocked": 0, "kb_saved_est": 0, "heap_samples": []}
+
+    async def start(self):
+        # Chrome is launched through chromedriver so it is found and configured like the pooled drivers
+        options = Options()
+        for argument in self.arguments:
+            options.add_argument(argument)
+        service = Service(self._driver_path or DRIVER_POOL.driver_path())
+        self.driver = await asyncio.to_thread(webdriver.Chrome, service=service, options=options)
+        address = self.driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+        with urllib.request.urlopen(f"http://{address}/json/version", timeout=10) as response:
+            ws_url = json.loads(response.read())["webSocketDebuggerUrl"]
+        self.connection = DevToolsConnection(ws_url)
+        return self
+
+    async def new_tab(self, site=None) -> Tab:
+        context_id = None
+        if self.isolated:
+            context_id = (await self.connection.send("Target.createBrowserContext", {"disposeOnDetach": True}))["browserContextId"]
+        params = {"url": "about:blank"}
+        if context_id is not None:
+            params["browserContextId"] = context_id
+        target_id = (await self.connection.send("Target.createTarget", params))["targetId"]
+        session_id = (await self.connection.send("Target.attachToTarget", {"targetId": target_id, "flatten": True}))["sessionId"]
+        tab = Tab(self, target_id, session_id, context_id)
+        await tab.send("Page.enable")
+        await tab.apply_policy(SITE_RESOURCE_POLICIES.get(site))
+        self.open_tabs += 1
+        self.stats["tabs_opened"] += 1
+        self.stats["peak_tabs"] = max(self.stats["peak_tabs"], self.open_tabs)
+        return tab
+
+    async def release(self, tab: Tab):
+        if REPORT_RESOURCE_SAVINGS:
+            tab.savings.url = tab.url
+            tab.savings.log()
+            self.stats["requests_blocked"] += tab.savings.requests_blocked
+            self.stats["kb_saved_est"] += round(tab.savings.bytes_saved_est / 1024)
+        try:
+            self.stats["heap_samples"].append(await tab.heap_used())
+        except Exception:
+            pass
+        await tab.close()
+        self.open_tabs -= 1
+
+    @asynccontextmanager
+    async def tab(self, site=None):
+        # A fresh tab for one URL under the site's resource policy; waits while `concurrency` tabs are open
+        async with self._slots:
+            tab = await self.new_tab(site)
+            try:
+                yield tab
+            except Exception:
+                self.stats["failures"] += 1
+                raise
+            finally:
+                await self.release(tab)
+
+    def metrics(self) -> dict:
+        samples = self.stats["heap_samples"]
+        metrics = {key: value for key, value in self.stats.items() if key != "heap_samples"}
+        metrics["avg_tab_heap_mb"] = round(sum(samples) / len(samples) / 1024 ** 2, 1) if samples else 0.0
+        metrics["max_tab_heap_mb"] = round(max(samples) / 1024 ** 2, 1) if samples else 0.0
+        return metrics
+
+    async def close(self):
+        if self.connection is not None:
+            self.connection.close()
+        if self.driver is not None:
+            await asyncio.to_thread(self.driver.quit)
+            self.driver = None
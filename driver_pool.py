@@ -0,0 +1,214 @@
+################### IMPORTS ######################
+
+import atexit
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+from resource_policy import REPORT_RESOURCE_SAVINGS, SITE_RESOURCE_POLICIES, savings_from_performance_log
+
+################### SITE PROFILES ######################
+
+# Chrome arguments each scraper used to build by hand. A profile name maps to
+# one warm browser configuration in the pool.
+SITE_PROFILES = {
+    "mainstreet": [
+        "--no-sandbox",
+        "--disable-dev-shm-usage",
+    ],
+    "hypefly": [
+        "--disable-blink-features=AutomationControlled",
+        "--window-size=1920,1080",
+    ],
+    "crepdogcrew": [
+        "--no-sandbox",
+        "--disable-dev-shm-usage",
+        "--window-size=1920,1080",
+    ],
+    "culture-circle": [
+        "--no-sandbox",
+        "--disable-dev-shm-usage",
+        "--start-maximized",
+    ],
+}
+
+################### DRIVER POOL ######################
+
+class DriverPool:
+    """Keeps warm Chrome instances per site profile and hands them out to the scrapers."""
+
+    def __init__(self, profiles=None, max_uses=25, max_idle=2, driver_path=None, policies=None):
+        self.profiles = profiles if profiles is not None else SITE_PROFILES
+        self.policies = policies if policies is not None else SITE_RESOURCE_POLICIES
+        self.max_uses = max_uses      # recycle a browser after this many URLs
+        self.max_idle = max_idle      # warm browsers kept per profile
+        self._driver_path = driver_path
+        self._idle = defaultdict(list)   # profile -> [(driver, uses)]
+        self._uses = {}                  # id(driver) -> uses, for drivers handed out
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "created": 0,
+            "recycled": 0,
+            "crashed": 0,
+            "reset_failures": 0,
+            "requests_blocked": 0,
+            "kb_saved_est": 0,
+        }
+
+    # Resolve the chromedriver binary once for the whole run
+    def driver_path(self) -> str:
+        with self._lock:
+            if self._driver_path is None:
+                self._driver_path = ChromeDriverManager().install()
+            return self._driver_path
+
+    def _create(self, profile):
+        options = Options()
+        for argument in self.profiles[profile]:
+            options.add_argument(argument)
+        if REPORT_RESOURCE_SAVINGS:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        driver = webdriver.Chrome(service=Service(self.driver_path()), options=options)
+        policy = self.policies.get(profile)
+        if policy is not None:
+            try:
+                policy.apply(driver)
+            except Exception as e:
+                print(f"[ERROR] Failed to apply the {profile} resource policy: {str(e)}")
+        with self._lock:
+            self.stats["created"] += 1
+        return driver
+
+    def acquire(self, profile: str):
+        if profile not in self.profiles:
+            raise KeyError(f"Unknown driver profile: {profile}")
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Driver pool is closed")
+            if self._idle[profile]:
+                driver, uses = self._idle[profile].pop()
+                self.stats["hits"] += 1
+                self._uses[id(driver)] = uses
+                return driver
+            self.stats["misses"] += 1
+        driver = self._create(profile)
+        with self._lock:
+            self._uses[id(driver)] = 0
+        return driver
+
+    def release(self, profile: str, driver, broken: bool = False):
+        with self._lock:
+            uses = self._uses.pop(id(driver), 0) + 1
+
+        if broken or not self._is_alive(driver):
+            with self._lock:
+                self.stats["crashed"] += 1
+            self._quit(driver)
+            return
+
+        if REPORT_RESOURCE_SAVINGS:
+            self._report_resources(driver)
+
+        if uses >= self.max_uses:
+            with self._lock:
+                self.stats["recycled"] += 1
+            self._quit(driver)
+            return
+
+        if not self._reset(driver):
+            with self._lock:
+                self.stats["reset_failures"] += 1
+            self._quit(driver)
+            return
+
+        with self._lock:
+            if not self._closed and len(self._idle[profile]) < self.max_idle:
+                self._idle[profile].append((driver, uses))
+                return
+        self._quit(driver)
+
+    @contextmanager
+    def driver(self, profile: str):
+        driver = self.acquire(profile)
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(profile, driver, broken=broken)
+
+    # Bring a browser back to a clean state: one tab, no cookies, no storage
+    def _reset(self, driver) -> bool:
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            driver.delete_all_cookies()
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except Exception:
+                pass  # pages like about:blank have no storage
+            driver.get("about:blank")
+            if REPORT_RESOURCE_SAVINGS:
+                driver.get_log("performance")  # the next page starts with an empty log
+            return True
+        except Exception as e:
+            print(f"[ERROR] Failed to reset browser: {str(e)}")
+            return False
+
+    # What the resource policy blocked while the page the driver is leaving was loaded
+    def _report_resources(self, driver):
+        try:
+            savings = savings_from_performance_log(driver.get_log("performance"), driver.current_url)
+        except Exception:
+            return
+        savings.log()
+        with self._lock:
+            self.stats["requests_blocked"] += savings.requests_blocked
+            self.stats["kb_saved_est"] += round(savings.bytes_saved_est / 1024)
+
+    @staticmethod
+    def _is_alive(driver) -> bool:
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def metrics(self) -> dict:
+        with self._lock:
+            metrics = dict(self.stats)
+            metrics["idle"] = sum(len(drivers) for drivers in self._idle.values())
+            metrics["in_use"] = len(self._uses)
+        requests = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = metrics["hits"] / requests if requests else 0.0
+        return metrics
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle = [driver for drivers in self._idle.values() for driver, _ in drivers]
+            self._idle.clear()
+        for driver in idle:
+            self._quit(driver)
+
+
+DRIVER_POOL = DriverPool()
+atexit.register(DRIVER_POOL.close)
@@ -0,0 +1,162 @@
+################### IMPORTS ######################
+
+import json
+import logging
+import re
+import pandas as pd
+from bs4 import BeautifulSoup
+from http_session import SESSION, html_text
+from rate_limiter import RATE_LIMITER, Blocked
+from tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+################### HYDRATION STATE ######################
+
+# culture-circle is a Next.js site: the page props are serialized into this script tag
+NEXT_DATA_PATTERN = re.compile(
+    r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S
+)
+
+# Key names tried, in order, when mapping the product props to a row
+TITLE_KEYS = ("name", "title", "productName")
+DESCRIPTION_KEYS = ("description", "productDescription", "details")
+SKU_KEYS = ("sku", "styleCode", "style_code", "styleId")
+IMAGE_KEYS = ("images", "gallery", "media", "thumbnails")
+SIZE_LIST_KEYS = ("sizes", "sizePrices", "variants", "sizeChart", "inventory")
+SIZE_KEYS = ("size", "sizeLabel", "label", "title", "name")
+PRICE_KEYS = ("price", "lowestPrice", "sellingPrice", "salePrice", "amount")
+
+
+def extract_next_data(html: str) -> dict:
+    match = NEXT_DATA_PATTERN.search(html)
+    if not match:
+        raise ValueError("Page has no __NEXT_DATA__ script")
+    return json.loads(match.group(1))
+
+
+def _first(mapping, keys):
+    for key in keys:
+        value = mapping.get(key)
+        if value not in (None, "", []):
+            return value
+    return None
+
+
+def _size_entries(candidate):
+    entries = _first(candidate, SIZE_LIST_KEYS)
+    if not isinstance(entries, list) or not entries:
+        return None
+    if not all(isinstance(entry, dict) for entry in entries):
+        return None
+    if not any(_first(entry, SIZE_KEYS) is not None and _first(entry, PRICE_KEYS) is not None for entry in entries):
+        return None
+    return entries
+
+
+def find_product(state):
+    # Depth-first search for the first object that has a title and a list of size/price entries
+    stack = [state]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if _first(node, TITLE_KEYS) is not None and _size_entries(node) is not None:
+                return node
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    raise ValueError("No product with sizes found in page props")
+
+################### ROW MAPPING ######################
+
+def format_price(value):
+    if isinstance(value, dict):
+        value = _first(value, ("amount", "value", "price"))
+    if isinstance(value, (int, float)):
+        return f"₹{value:,.0f}"
+    return str(value).strip() if value is not None else "N/A"
+
+
+def format_size(value):
+    size = str(value).strip()
+    # Bare numbers are UK sizes on the product page ("UK 7")
+    if re.fullmatch(r"\d+(\.\d+)?", size):
+        size = f"UK {size}"
+    return size
+
+
+def image_urls(product):
+    images = []
+    for image in _first(product, IMAGE_KEYS) or []:
+        if isinstance(image, dict):
+            image = _first(image, ("url", "src", "original", "large"))
+        if isinstance(image, str) and image:
+            images.append(image)
+    if not images:
+        image = _first(product, ("image", "thumbnail", "mainImage"))
+        if isinstance(image, str) and image:
+            images.append(image)
+    return images or ["N/A"]
+
+
+def state_to_rows(url: str, state: dict) -> list:
+    product = find_product(state)
+    title = str(_first(product, TITLE_KEYS)).strip()
+
+    description = _first(product, DESCRIPTION_KEYS)
+    # Descriptions can be serialized as HTML; flatten like the DOM path does
+    description = BeautifulSoup(description, "html.parser").get_text(strip=True) if isinstance(description, str) else "N/A"
+    sku = _first(product, SKU_KEYS) or "N/A"
+    images = image_urls(product)
+
+    sizes_prices = []
+    seen = set()
+    for entry in _size_entries(product):
+        size, price = _first(entry, SIZE_KEYS), _first(entry, PRICE_KEYS)
+        if size is None or price is None:
+            continue
+        key = (format_size(size), format_price(price))
+        if key not in seen:
+            seen.add(key)
+            sizes_prices.append({"size": key[0], "price": key[1]})
+
+    if not sizes_prices:
+        sizes_prices = [{"size": "N/A", "price": "N/A"}]
+
+    return [{
+        "title": title,
+        "url": url,
+        "size": sp["size"],
+        "price": sp["price"],
+        "description": description or "N/A",
+        "sku": str(sku),
+        "images": ", ".join(images)
+    } for sp in sizes_prices]
+
+
+def parse_embedded_state(html: str, url: str) -> pd.DataFrame:
+    return pd.DataFrame(state_to_rows(url, extract_next_data(html)))
+
+################### FETCH ######################
+
+def scrape_culture_circle_state(url: str, session=None, timeout=15) -> pd.DataFrame:
+    # A single HTML fetch, no browser, no scrolling and no "Read more" click
+    with TRACER.span("fast_path_fetch", site="culture-circle", url=url):
+        with RATE_LIMITER.request(url) as request:
+            response = (session or SESSION).get(url, headers={"Accept": "text/html"}, timeout=timeout)
+            request.observe(response.status_code, html_text(response), response.headers.get("Retry-After"))
+        response.raise_for_status()
+    with TRACER.span("fast_path_parse", site="culture-circle", url=url) as span:
+        df = parse_embedded_state(response.text, url)
+        span.set(variant_count=len(df))
+    return df
+
+
+def scrape_with_embedded_state(url: str, fallback, session=None) -> pd.DataFrame:
+    try:
+        return scrape_culture_circle_state(url, session)
+    except Blocked:
+        raise  # a browser would only make the store push back harder
+    except Exception as e:
+        logger.warning("Embedded state extraction failed for %s (%s), falling back to the browser", url, e)
+        return fallback(url)
@@ -0,0 +1,99 @@
+################### IMPORTS ######################
+
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+from site_spec import SITES
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+################### SITE SELECTORS ######################
+
+# Every node each site reads from its soup, derived from the rules of its spec
+# (site_spec.Site.soup_selectors). The strainers below are built from these.
+SITE_SELECTORS = {site.name: site.soup_selectors for site in SITES}
+
+# "html.parser" is the standard library parser the scrapers always used; "lxml" is the C parser
+BACKENDS = ["html.parser", "lxml"] if HAS_LXML else ["html.parser"]
+PARSER_BACKEND = "lxml" if HAS_LXML else "html.parser"
+
+################### STRAINERS ######################
+
+COMPOUND_PATTERN = re.compile(r"^([a-zA-Z][\w-]*)?((?:\.[\w-]+)*)$")
+
+
+def parse_compound(selector: str):
+    # Outermost compound of a selector ("page-dots img" -> ("page-dots", set())). Keeping that
+    # element keeps its whole subtree, so descendant parts of the selector still match.
+    compound = selector.split()[0]
+    match = COMPOUND_PATTERN.match(compound)
+    if not match:
+        raise ValueError(f"Unsupported selector for a strainer: {selector}")
+    tag, classes = match.groups()
+    return tag, frozenset(c for c in classes.split(".") if c)
+
+
+class SelectorStrainer(SoupStrainer):
+    """Only builds the subtrees rooted at elements that match one of the given selectors."""
+
+    def __init__(self, selectors):
+        super().__init__()
+        self.selectors = list(selectors)
+        self.compounds = [parse_compound(selector) for selector in self.selectors]
+
+    @property
+    def includes_everything(self) -> bool:
+        return False
+
+    @property
+    def excludes_everything(self) -> bool:
+        return False
+
+    def _matches(self, name, attrs) -> bool:
+        classes = (attrs or {}).get("class") or ""
+        if isinstance(classes, str):
+            classes = classes.split()
+        classes = set(classes)
+        for tag, required in self.compounds:
+            if (tag is None or tag == name) and required <= classes:
+                return True
+        return False
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        return self._matches(name, attrs)
+
+    def allow_string_creation(self, string) -> bool:
+        return False
+
+    def search_tag(self, name, attrs=None):
+        # Entry point used by Beautiful Soup releases before 4.13
+        if hasattr(name, "name"):
+            name, attrs = name.name, name.attrs
+        return self._matches(name, dict(attrs or {}))
+
+    def __repr__(self):
+        return f"<SelectorStrainer {self.selectors}>"
+
+
+def site_strainer(selectors):
+    # None (parse the whole page) when a site reads below a selector a strainer cannot match
+    try:
+        return SelectorStrainer(selectors)
+    except ValueError:
+        return None
+
+
+STRAINERS = {site: site_strainer(selectors) for site, selectors in SITE_SELECTORS.items()}
+
+################### PARSE ######################
+
+def make_soup(html: str, site=None, backend=None) -> BeautifulSoup:
+    # Parses only the subtrees site's scraper reads; site=None parses the full page
+    backend = backend or PARSER_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown or unavailable parser backend: {backend}")
+    strainer = STRAINERS.get(site) if site is not None else None
+    return BeautifulSoup(html, backend, parse_only=strainer)
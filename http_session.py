@@ -0,0 +1,28 @@
+################### IMPORTS ######################
+
+import requests
+from requests.adapters import HTTPAdapter
+
+################### HTTP SESSION ######################
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+
+def build_session(pool_size=16) -> requests.Session:
+    # One keep-alive connection pool shared by every browserless request
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT})
+    return session
+
+
+SESSION = build_session()
+
+
+def html_text(response):
+    # The body of an HTML response (where challenge pages show up); None for JSON and other types
+    if "html" in response.headers.get("Content-Type", ""):
+        return response.text
+    return None
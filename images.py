@@ -0,0 +1,259 @@
+################### IMPORTS ######################
+
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from http_session import build_session
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+logger = logging.getLogger(__name__)
+
+################### SETTINGS ######################
+
+IMAGE_DIR = "product_images"
+IMAGE_WORKERS = 8                 # downloads in flight at once, over one pooled session
+IMAGE_TIMEOUT = 15
+MAX_IMAGE_BYTES = 20 * 1024 ** 2  # larger bodies are not stored
+
+# Two images whose 64-bit difference hashes differ in at most this many bits are the same photo
+# (another size, crop or re-encode of it). Perceptual matching needs Pillow; without it only
+# byte-identical images are merged.
+HASH_DISTANCE = 6
+HASH_BANDS = 8                    # 8-bit bands; two hashes this close share at least one band exactly
+
+# Content types stored, by file extension
+EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif",
+              "image/avif": ".avif", "image/svg+xml": ".svg"}
+
+################### URLS ######################
+
+def split_image_urls(cell) -> list:
+    # The URLs of an images cell ("a, b, c"); "N/A", "Error" and other non-URLs are dropped.
+    # Split on ", " as the scrapers join them: CDN transform parameters can hold a bare comma
+    if not isinstance(cell, str):
+        return []
+    urls = []
+    for part in cell.split(", "):
+        url = part.strip()
+        if url.startswith("//"):
+            url = "https:" + url
+        if url.startswith(("http://", "https://")):
+            urls.append(url)
+    return urls
+
+
+def image_id(digest: str) -> str:
+    return f"img-{digest[:16]}"
+
+################### PERCEPTUAL HASH ######################
+
+def describe(body: bytes):
+    # (64-bit dHash, width, height) of an image body, decoded once. The dHash is a 9x8 greyscale
+    # thumbnail, one bit per pair of horizontal neighbours; JPEGs are decoded at a reduced scale
+    # for it. All None when Pillow is missing or cannot decode the body.
+    if not HAS_PIL:
+        return None, None, None
+    try:
+        with Image.open(io.BytesIO(body)) as image:
+            width, height = image.size
+            image.draft("L", (64, 64))
+            pixels = list(image.convert("L").resize((9, 8), Image.Resampling.LANCZOS).tobytes())
+    except Exception:
+        return None, None, None
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            value = (value << 1) | (pixels[row * 9 + column] > pixels[row * 9 + column + 1])
+    return value, width, height
+
+
+class HashIndex:
+    """Near-duplicate lookup over 64-bit hashes. Each hash is filed under its HASH_BANDS byte
+    bands; two hashes within HASH_DISTANCE bits agree on at least one band, so only hashes
+    sharing a band are compared instead of all of them."""
+
+    def __init__(self, distance=HASH_DISTANCE):
+        if distance >= HASH_BANDS:
+            raise ValueError(f"distance must be below {HASH_BANDS} for band lookups to find every match")
+        self.distance = distance
+        self._bands = {}
+
+    @staticmethod
+    def _keys(value):
+        return [(band, (value >> (8 * band)) & 0xFF) for band in range(HASH_BANDS)]
+
+    def add(self, value, item):
+        for key in self._keys(value):
+            self._bands.setdefault(key, []).append((value, item))
+
+    def nearest(self, value):
+        # The closest item within the distance, or None
+        best = None
+        for key in self._keys(value):
+            for other, item in self._bands.get(key, ()):
+                distance = bin(value ^ other).count("1")
+                if distance <= self.distance and (best is None or distance < best[0]):
+                    best = (distance, item)
+        return best[1] if best else None
+
+################### IMAGE STORE ######################
+
+class ImageStore:
+    """Content-addressed image files. Each distinct body is stored once under its SHA-256, and
+    near-identical images (same photo, other size or store) share one image ID: the digest of the
+    first of them stored. An SQLite index maps URLs to digests, so a rerun only fetches new URLs."""
+
+    def __init__(self, path=IMAGE_DIR, session=None, workers=IMAGE_WORKERS, distance=HASH_DISTANCE):
+        self.path = path
+        self.session = session or build_session(pool_size=workers)
+        self.workers = workers
+        self.stats = {"urls": 0, "cached": 0, "fetched": 0, "failed": 0, "stored": 0,
+                      "duplicate_bytes": 0, "near_duplicates": 0, "bytes": 0}
+        self._hashes = HashIndex(distance)
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.join(self.path, "blobs"), exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.path, "index.sqlite"), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, digest TEXT, fetched_at REAL)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " digest TEXT PRIMARY KEY, image TEXT, file TEXT, bytes INTEGER,"
+                " width INTEGER, height INTEGER, phash TEXT)"
+            )
+            # Hashes of the images stored by earlier runs, so new ones are matched against them too
+            for digest, phash in self._db.execute("SELECT digest, phash FROM blobs WHERE phash IS NOT NULL AND image = digest"):
+                self._hashes.add(int(phash, 16), digest)
+        return self._db
+
+    def _blob_file(self, digest: str, content_type: str) -> str:
+        extension = EXTENSIONS.get(content_type.split(";")[0].strip().lower(), "")
+        return os.path.join("blobs", digest[:2], digest[2:] + extension)
+
+    ################### FETCHING ######################
+
+    def _download(self, url):
+        # (url, body, content type) or (url, None, error)
+        try:
+            with self.session.get(url, timeout=IMAGE_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "")
+                if not content_type.startswith("image/"):
+                    return url, None, f"not an image ({content_type or 'no content type'})"
+                body = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+            if len(body) > MAX_IMAGE_BYTES:
+                return url, None, "too large"
+            return url, body, content_type
+        except Exception as e:
+            return url, None, str(e)
+
+    def _fetch(self, url):
+        # Runs on a worker: download, then store; decoding and hashing overlap with other downloads
+        url, body, detail = self._download(url)
+        if body is None:
+            with self._lock:
+                self.stats["failed"] += 1
+            logger.warning("Image %s not stored: %s", url, detail)
+            return None
+        return self._store(url, body, detail)
+
+    def _store(self, url, body, content_type):
+        # Files a downloaded body and returns its digest; decoding and hashing happen outside the lock
+        digest = hashlib.sha256(body).hexdigest()
+        phash, width, height = describe(body)
+        with self._lock:
+            self.stats["fetched"] += 1
+            db = self._connect()
+            known = db.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if known:
+                self.stats["duplicate_bytes"] += len(body)
+            else:
+                image = self._hashes.nearest(phash) if phash is not None else None
+                if image is not None:
+                    self.stats["near_duplicates"] += 1
+                else:
+                    image = digest
+                    if phash is not None:
+                        self._hashes.add(phash, digest)
+                file = self._blob_file(digest, content_type)
+                full_path = os.path.join(self.path, file)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path + ".tmp", "wb") as f:
+                    f.write(body)
+                os.replace(full_path + ".tmp", full_path)
+                db.execute("INSERT INTO blobs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (digest, image, file, len(body), width, height, f"{phash:016x}" if phash is not None else None))
+                self.stats["stored"] += 1
+                self.stats["bytes"] += len(body)
+            db.execute("INSERT OR REPLACE INTO urls VALUES (?, ?, ?)", (url, digest, time.time()))
+            db.commit()
+        return digest
+
+    def fetch_all(self, urls):
+        # Downloads every URL the index does not know yet, IMAGE_WORKERS at a time
+        urls = list(dict.fromkeys(urls))
+        with self._lock:
+            db = self._connect()
+            known = {url for (url,) in db.execute("SELECT url FROM urls")}
+        todo = [url for url in urls if url not in known]
+        self.stats["urls"] += len(urls)
+        self.stats["cached"] += len(urls) - len(todo)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(self._fetch, todo))
+
+    ################### LOOKUPS ######################
+
+    def url_ids(self) -> dict:
+        # URL -> image ID of every stored URL
+        with self._lock:
+            rows = self._connect().execute("SELECT urls.url, blobs.image FROM urls JOIN blobs USING (digest)").fetchall()
+        return {url: image_id(image) for url, image in rows}
+
+    def ids_for(self, cells: pd.Series) -> pd.Series:
+        # images cells with every stored URL replaced by its image ID and repeats dropped; URLs that
+        # could not be fetched stay as they were, and cells without URLs ("N/A") are unchanged
+        ids = self.url_ids()
+
+        def convert(cell):
+            urls = split_image_urls(cell)
+            if not urls:
+                return cell
+            return ", ".join(dict.fromkeys(ids.get(url, url) for url in urls))
+
+        distinct = pd.Series(cells.unique())
+        return cells.map(dict(zip(distinct, distinct.map(convert))))
+
+    def manifest(self) -> pd.DataFrame:
+        # One row per image ID: the stored file of its first body, its size, and every URL that maps to it
+        with self._lock:
+            db = self._connect()
+            blobs = pd.read_sql_query("SELECT digest, image, file, bytes, width, height, phash FROM blobs", db)
+            urls = pd.read_sql_query("SELECT url, digest FROM urls", db)
+        urls = urls.merge(blobs[["digest", "image"]], on="digest")
+        sources = urls.groupby("image", sort=False)["url"].agg(", ".join)
+        first = blobs[blobs["digest"] == blobs["image"]].set_index("image")
+        manifest = first[["file", "bytes", "width", "height", "phash"]].join(sources.rename("urls"))
+        manifest.index = manifest.index.map(image_id)
+        return manifest.rename_axis("image_id").reset_index()
+
+    def metrics(self) -> dict:
+        return dict(self.stats)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
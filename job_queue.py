@@ -0,0 +1,182 @@
+################### IMPORTS ######################
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from orchestrator import domain_key
+
+################### SETTINGS ######################
+
+QUEUE_FILE = "queue.sqlite"
+DEFAULT_MAX_ATTEMPTS = 3
+BACKOFF_BASE = 5.0       # seconds before the first retry on a domain
+BACKOFF_MAX = 300.0      # cap on the exponential backoff
+LEASE_SECONDS = 600.0    # a leased job nobody finished is handed out again after this
+
+################### JOB QUEUE ######################
+
+Job = namedtuple("Job", ["task", "url", "row", "column", "attempts", "max_attempts"])
+
+
+class JobQueue:
+    """SQLite-backed queue of scrape jobs with leases, per-domain exponential backoff,
+    an attempt budget and a dead-letter table for jobs that used it up."""
+
+    def __init__(self, path=QUEUE_FILE, max_attempts=DEFAULT_MAX_ATTEMPTS, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.stats = {"leased": 0, "done": 0, "retried": 0, "dead": 0}
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " task INTEGER PRIMARY KEY, url TEXT, row INTEGER, col TEXT, domain TEXT,"
+                " status TEXT, attempts INTEGER, max_attempts INTEGER,"
+                " available_at REAL, lease_until REAL, last_error TEXT, last_phase TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS domains (domain TEXT PRIMARY KEY, failures INTEGER, next_at REAL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS dead_letters ("
+                " task INTEGER PRIMARY KEY, url TEXT, attempts INTEGER, error TEXT, phase TEXT, failed_at REAL)"
+            )
+        return self._db
+
+    def enqueue(self, task: int, url: str, row=None, column=None):
+        # Adds the job, or puts it back to pending if it exists: the caller's output no longer holds
+        # its rows. A dead job starts a fresh attempt budget.
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, 'pending', 0, ?, 0, 0, NULL, NULL)"
+                " ON CONFLICT(task) DO UPDATE SET status = 'pending', lease_until = 0,"
+                " attempts = CASE WHEN status = 'dead' THEN 0 ELSE attempts END",
+                (task, url, row, column, domain_key(url), self.max_attempts),
+            )
+            db.execute("DELETE FROM dead_letters WHERE task = ?", (task,))
+            db.commit()
+
+    ################### LEASING ######################
+
+    def lease(self, per_domain: int) -> list:
+        # Due jobs, at most per_domain of them for each domain that is not backing off, in task order.
+        # Leasing in small rounds lets a domain's failures hold back its remaining jobs.
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            rows = db.execute(
+                "SELECT task, url, row, col, attempts, max_attempts FROM ("
+                "  SELECT *, ROW_NUMBER() OVER (PARTITION BY domain ORDER BY task) AS turn FROM jobs"
+                "  LEFT JOIN domains USING (domain)"
+                "  WHERE (status = 'pending' OR (status = 'leased' AND lease_until < ?))"
+                "  AND available_at <= ? AND COALESCE(next_at, 0) <= ?"
+                ") WHERE turn <= ? ORDER BY task",
+                (now, now, now, per_domain),
+            ).fetchall()
+            db.executemany(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_until = ? WHERE task = ?",
+                [(now + self.lease_seconds, row[0]) for row in rows],
+            )
+            db.commit()
+            self.stats["leased"] += len(rows)
+        return [Job(task, url, row, column, attempts + 1, max_attempts) for task, url, row, column, attempts, max_attempts in rows]
+
+    def next_due(self):
+        # Seconds until the next waiting job can be leased; None when nothing is left to run
+        with self._lock:
+            db = self._connect()
+            due = db.execute(
+                "SELECT MIN(MAX(available_at, COALESCE(next_at, 0), CASE WHEN status = 'leased' THEN lease_until ELSE 0 END))"
+                " FROM jobs LEFT JOIN domains USING (domain) WHERE status IN ('pending', 'leased')"
+            ).fetchone()[0]
+        return None if due is None else max(0.0, due - time.time())
+
+    ################### OUTCOMES ######################
+
+    def complete(self, job: Job):
+        with self._lock:
+            db = self._connect()
+            db.execute("UPDATE jobs SET status = 'done', lease_until = 0 WHERE task = ?", (job.task,))
+            db.execute("UPDATE domains SET failures = 0, next_at = 0 WHERE domain = ?", (domain_key(job.url),))
+            db.commit()
+            self.stats["done"] += 1
+
+    def fail(self, job: Job, error, phase=None) -> bool:
+        # Records the failure; returns True when the job will be retried, False when it was dead-lettered
+        now = time.time()
+        error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+        with self._lock:
+            db = self._connect()
+            domain = domain_key(job.url)
+            db.execute(
+                "INSERT INTO domains VALUES (?, 1, 0) ON CONFLICT(domain) DO UPDATE SET failures = failures + 1",
+                (domain,),
+            )
+            failures = db.execute("SELECT failures FROM domains WHERE domain = ?", (domain,)).fetchone()[0]
+            if job.attempts >= job.max_attempts:
+                db.execute(
+                    "UPDATE jobs SET status = 'dead', lease_until = 0, last_error = ?, last_phase = ? WHERE task = ?",
+                    (error, phase, job.task),
+                )
+                db.execute(
+                    "INSERT OR REPLACE INTO dead_letters VALUES (?, ?, ?, ?, ?, ?)",
+                    (job.task, job.url, job.attempts, error, phase, now),
+                )
+                db.commit()
+                self.stats["dead"] += 1
+                return False
+            # Exponential in the domain's failure streak, with jitter so retries do not line up
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (failures - 1)) * random.uniform(0.8, 1.2)
+            db.execute("UPDATE domains SET next_at = ? WHERE domain = ?", (now + delay, domain))
+            db.execute(
+                "UPDATE jobs SET status = 'pending', lease_until = 0, available_at = ?, last_error = ?, last_phase = ?"
+                " WHERE task = ?",
+                (now + delay, error, phase, job.task),
+            )
+            db.commit()
+            self.stats["retried"] += 1
+            return True
+
+    ################### STATUS ######################
+
+    def dead_letters(self) -> list:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT task, url, attempts, error, phase, failed_at FROM dead_letters ORDER BY task"
+            ).fetchall()
+        return [dict(zip(("task", "url", "attempts", "error", "phase", "failed_at"), row)) for row in rows]
+
+    def tasks_by_url(self) -> dict:
+        # {url: task} for every job ever queued, so a URL found again keeps its task
+        with self._lock:
+            return dict(self._connect().execute("SELECT url, task FROM jobs").fetchall())
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def metrics(self) -> dict:
+        return dict(self.stats, **self.counts())
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,633 +1,734 @@
 ################### IMPORTS ######################
 
-import time
+import asyncio
+import functools
+import logging
+import os
 import pandas as pd
-import re
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-from webdriver_manager.chrome import ChromeDriverManager
-
-################### SCRAPER FUNCTIONS ######################
-
-def scrape_mainstreet_product(url: str) -> pd.DataFrame:
-    # Set Chrome options
-    chrome_options = Options()
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-
-    # Initialize WebDriver
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-
-    def scroll_to_bottom(driver):
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        while True:
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
-
-    def get_price(soup):
-        price_tag = soup.find("span", class_="price-item--sale")
-        if not price_tag:
-            price_tag = soup.find("span", class_="price-item--regular")
-        price = price_tag.text.strip() if price_tag else "N/A"
-        return price
-
-    try:
-        driver.get(url)
-        scroll_to_bottom(driver)
-
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "product__title"))
-        )
-
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-
-        # Title
-        title_tag = soup.find("h2", class_="h1")
-        title = title_tag.text.strip() if title_tag else "N/A"
-
-        # Description
-        desc_tag = soup.find("div", class_="product__description")
-        description = desc_tag.get_text(strip=True) if desc_tag else "N/A"
-
-        # Sizes and Prices
-        size_price_mapping = {}
+import threading
+import time
+from cluster import CLUSTER_DIR, Coordinator, FileBroker, LocalBroker, Worker, start_worker_processes
+from crawler import DiscoveryCrawler
+from deadlines import BUDGETS
+from driver_pool import DRIVER_POOL
+from shopify_fast_path import scrape_shopify_product, scrape_with_fast_path
+from embedded_state import scrape_culture_circle_state, scrape_with_embedded_state
+from devtools import DEFAULT_CONCURRENCY, DevToolsBrowser
+from images import IMAGE_DIR, ImageStore, split_image_urls
+from job_queue import QUEUE_FILE, JobQueue
+from matching import ProductMatcher
+from orchestrator import ConcurrentScraper, ScrapeTask
+from normalize import DEFAULT_CURRENCY, ONE_TO_ONE_UK, canonical_sizes, display_prices, normalize_frame, parse_price, price_values
+from output_sink import RUN_DIR, TASK_COLUMN, OutputSink
+from page_cache import PAGE_CACHE
+from price_service import SNAPSHOT_DIR, SnapshotWriter
+from rate_limiter import RATE_LIMITER, Blocked
+from site_engine import parse_page, run_driver, run_tab
+from site_spec import SITES
+from tracing import METRICS_PORT, TRACE_FILE, TRACER, start_metrics_server
+
+################### SITE SCRAPERS ######################
+
+# Every store is a spec in site_spec.SITE_SPECS (or a JSON file in sites/), run by site_engine.py
+# in a pooled browser or in a DevTools tab. A new store needs a spec, not a scraper function.
+SCRAPERS = {site.name: functools.partial(run_driver, site) for site in SITES}
+TAB_SCRAPERS = {site.name: functools.partial(run_tab, site) for site in SITES}
+
+# Browser scrapers of the four stores by name, as the benchmarks call them
+scrape_mainstreet_product = SCRAPERS["mainstreet"]
+scrape_crepdogcrew_product = SCRAPERS["crepdogcrew"]
+scrape_hypefly_product = SCRAPERS["hypefly"]
+scrape_culture_circle_product = SCRAPERS["culture-circle"]
+
+def parse_culture_circle_page(soup, url: str) -> pd.DataFrame:
+    # DOM extraction shared by the browser scraper and the saved-page benchmarks
+    return parse_page(SITES["culture-circle"], soup, url)
+
+################### PIPELINE STAGES ######################
+
+LINKS_CSV = 'links fr testing price tool - Sheet1.csv'
+
+# Worker threads used to scrape the link sheet; per-store caps live in orchestrator.DOMAIN_LIMITS
+MAX_WORKERS = 4
+
+# Scrape through a coordinator and workers (see cluster.py) instead of in this process:
+#   None     in this process, as above
+#   "local"  CLUSTER_WORKERS worker threads on an in-process broker
+#   "file"   CLUSTER_WORKERS worker processes on a broker directory (output_dir/CLUSTER_DIR); with
+#            the directory on a shared filesystem, workers on other hosts join it by running
+#            `python cluster.py worker --dir <directory>`
+CLUSTER_BROKER = None
+CLUSTER_WORKERS = MAX_WORKERS
+
+# Read Shopify stores (mainstreet, crepdogcrew) from their product JSON before starting a browser
+USE_SHOPIFY_FAST_PATH = True
+
+# Read culture-circle from the page's serialized Next.js props before starting a browser
+USE_EMBEDDED_STATE = True
+
+# Collection and listing pages to crawl for product URLs instead of reading the link sheet (see crawler.py)
+DISCOVERY_SEEDS = []
+
+# Scrape in tabs of one shared browser over the DevTools protocol instead of one browser per URL
+USE_DEVTOOLS_TABS = False
+TAB_CONCURRENCY = DEFAULT_CONCURRENCY
+
+# Number products by matching titles and SKUs across stores (see matching.py) instead of by
+# their position in the link sheet; discovered catalogs have no link sheet to align
+MATCH_PRODUCTS = False
+
+# Publish every finished run's offers as a snapshot for price_service.py, which swaps to it
+PUBLISH_PRICES = True
+
+# Download product images into a content-addressed store under output_dir/IMAGE_DIR and write
+# image IDs instead of URLs to the images column (see images.py)
+FETCH_IMAGES = False
+
+# Browser-free scrapers a spec can name as its fast path: (scraper, scraper falling back to a browser)
+FAST_PATHS = {
+    "shopify": (scrape_shopify_product, scrape_with_fast_path),
+    "embedded_state": (scrape_culture_circle_state, scrape_with_embedded_state),
+}
+
+def fast_path_for(site):
+    enabled = {"shopify": USE_SHOPIFY_FAST_PATH, "embedded_state": USE_EMBEDDED_STATE}
+    return FAST_PATHS[site.fast_path] if enabled.get(site.fast_path) else None
+
+# Function to choose scraper based on URL (host lookup in site_spec.SITES)
+def call_scraper(url):
+    site = SITES.lookup(url)
+    if site is None:
+        print(f"Unknown source in URL: {url}")
+        return None
+    fast_path = fast_path_for(site)
+    if fast_path is not None:
+        return fast_path[1](url, SCRAPERS[site.name])
+    return SCRAPERS[site.name](url)
+
+# call_scraper() for DevTools mode: fast paths run on a worker thread, the rest in a tab.
+# Each URL holds one of its store's page slots in the rate limiter while it runs.
+async def call_tab_scraper(browser, url):
+    site = SITES.lookup(url)
+    if site is None:
+        print(f"Unknown source in URL: {url}")
+        return None
+    fast_path = fast_path_for(site)
+    async with RATE_LIMITER.page_async(url):
+        if fast_path is not None:
+            try:
+                return await asyncio.to_thread(fast_path[0], url)
+            except Blocked:
+                raise  # the store is pushing back; a browser would only make it worse
+            except Exception as e:
+                print(f"[ERROR] Fast path failed for {url} ({e}), scraping it in a tab")
+        async with browser.tab(site.name) as tab:
+            return await TAB_SCRAPERS[site.name](tab, url)
+
+def load_links(path=LINKS_CSV):
+    # Load the links CSV
+    df = pd.read_csv(path)
+
+    # Normalize column names
+    df.columns = df.columns.str.strip().str.lower().str.replace(" ", "-")
+
+    # Count the number of URL columns (brands) in the input CSV
+    url_columns = [col for col in df.columns if df[col].apply(lambda x: isinstance(x, str) and x.startswith("http")).any()]
+    num_brands = len(url_columns)
+
+    df.rename(columns={
+        "mainstreet": "mainstreet",
+        "crepdogcrew": "crepdogcrew",
+        "hyepfly": "hypefly",
+        "culture-circle": "culture-circle"
+    }, inplace=True)
+
+    return df, num_brands
+
+def build_tasks(df):
+    # One task per URL cell, in row then column order
+    tasks = []
+    for index, row in df.iterrows():
+        for col_name in df.columns:
+            url = row[col_name]
+            if pd.notna(url) and isinstance(url, str) and url.startswith("http"):
+                tasks.append(ScrapeTask(index, col_name, url))
+    return tasks
+
+# Jobs leased per domain in each round of the queue; a failing domain backs off between rounds
+JOBS_PER_DOMAIN = 4
+
+def enqueue_links(df, sink, queue):
+    # Queues every URL of the link sheet the sink does not hold yet
+    tasks = build_tasks(df)
+    completed = sink.open([task.url for task in tasks])
+    pending = [(position, task) for position, task in enumerate(tasks) if task.url not in completed]
+    if completed:
+        print(f"Resuming: {len(tasks) - len(pending)} of {len(tasks)} URLs already scraped")
+    for position, task in pending:
+        queue.enqueue(position, task.url, task.row, task.column)
+    return len(pending)
+
+def start_discovery(seeds, completed, queue, crawler):
+    # Queues the crawler's product URLs as they are found, on a thread of its own so scraping
+    # starts with the first listing page. Resuming goes by URL, not by position in the crawl,
+    # which shifts when a listing fails or a catalog changes: a URL the sink holds is skipped,
+    # one an earlier run queued keeps its task, and a new one gets the next free task.
+    def discover():
+        found = 0
+        known = queue.tasks_by_url()
+        next_task = max(known.values(), default=-1) + 1
         try:
-            size_select = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "select.select__select"))
-            )
-            select = Select(size_select)
-
-            options = select.options
-            available_sizes = [opt.get_attribute("value") for opt in options if opt.get_attribute("value") and "Unavailable" not in opt.text]
-
-            for size in available_sizes:
-                retries = 2
-                for attempt in range(retries):
-                    try:
-                        size_select = WebDriverWait(driver, 10).until(
-                            EC.element_to_be_clickable((By.CSS_SELECTOR, "select.select__select"))
-                        )
-                        select = Select(size_select)
-
-                        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", size_select)
-                        time.sleep(1)
-                        select.select_by_value(size)
-
-                        time.sleep(3)
-                        WebDriverWait(driver, 15).until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, "span.price-item--sale, span.price-item--regular"))
-                        )
-
-                        updated_soup = BeautifulSoup(driver.page_source, 'html.parser')
-                        price = get_price(updated_soup)
-                        size_price_mapping[size] = price
-                        break
-
-                    except Exception as e:
-                        print(f"[ERROR] Attempt {attempt + 1} failed for size {size}: {str(e)}")
-                        if attempt == retries - 1:
-                            size_price_mapping[size] = "Error"
+            for site, url in crawler.crawl(seeds):
+                found += 1
+                if url in completed:
+                    continue
+                task = known.get(url)
+                if task is None:
+                    task = known[url] = next_task
+                    next_task += 1
+                queue.enqueue(task, url, task, site)
         except Exception as e:
-            print(f"[ERROR] Size dropdown not found: {str(e)}")
-            price = get_price(soup)
-            size_price_mapping["N/A"] = price
+            print(f"[ERROR] Discovery failed: {e}")
+        print(f"Discovered {found} product URLs from {len(seeds)} seeds")
 
-        if not size_price_mapping:
-            size_price_mapping = {"N/A": "N/A"}
-
-        # Images
-        try:
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_all_elements_located((By.XPATH, "//ul[contains(@id, 'Slider-Thumbnails')]//li//button//img"))
-            )
-            image_elements = driver.find_elements(By.XPATH, "//ul[contains(@id, 'Slider-Thumbnails')]//li//button//img")
-            images = []
-
-            for img in image_elements:
-                src = img.get_attribute("src")
-                if src.startswith("//"):
-                    src = "https:" + src
-                images.append(src)
-
-            if not images:
-                raise Exception("Primary thumbnail images not found")
-
-        except Exception:
-            try:
-                fallback_img = driver.find_element(By.XPATH, "//div[contains(@class, 'product__media') and contains(@class, 'media--transparent')]//img")
-                fallback_src = fallback_img.get_attribute("src")
-                if fallback_src.startswith("//"):
-                    fallback_src = "https:" + fallback_src
-                images = [fallback_src]
-            except Exception as fallback_error:
-                print(f"Fallback image fetch failed: {fallback_error}")
-                images = ["N/A"]
-
-        # Prepare DataFrame
-        rows = []
-        for size, price in size_price_mapping.items():
-            rows.append({
-                "title": title,
-                "url": url,
-                "size": size,
-                "price": price,
-                "description": description,
-                "sku": "N/A",
-                "images": ', '.join(images)
-            })
-
-        df = pd.DataFrame(rows)
-        return df
+    producer = threading.Thread(target=discover, name="discovery", daemon=True)
+    producer.start()
+    return producer
 
+def scrape_failure(result_df):
+    # (phase, error) when a scraper caught its own exception and returned "Error" rows instead
+    if result_df is None or result_df.empty:
+        return None
+    if result_df["title"].eq("Error").all():
+        return TRACER.last_failure() or ("scrape", "scraper returned Error rows")
+    if result_df["price"].eq("Error").any():
+        _, error = TRACER.last_failure() or (None, "some sizes have an Error price")
+        return "variants", error
+    return None
+
+def scrape_job(url, scraper):
+    # Runs one job's scrape and returns (rows, failure); failure is (phase, error) or None
+    TRACER.clear_failure()
+    try:
+        result_df = scraper(url)
     except Exception as e:
-        print(f"[ERROR] Failed to scrape {url}: {str(e)}")
-        return pd.DataFrame([{
-            "title": "Error",
-            "url": url,
-            "size": "N/A",
-            "price": "Error",
-            "description": "Error",
-            "sku": "N/A",
-            "images": "Error"
-        }])
-    
-    finally:
-        driver.quit()
-
-
-def scrape_hypefly_product(url: str) -> pd.DataFrame:
-    options = Options()
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--window-size=1920,1080")
-    
-    driver = webdriver.Chrome(options=options)
+        phase, _ = TRACER.last_failure() or ("scrape", None)
+        return None, (phase, e)
+    return result_df, scrape_failure(result_df)
+
+def finish_job(queue, sink, job, result_df, failure):
+    # A failed job is retried after its domain's backoff; its last attempt's rows are kept either way
+    finish_rows(queue, sink, job, sink_rows(ScrapeTask(job.row, job.column, job.url), result_df), failure)
+
+def finish_rows(queue, sink, job, rows, failure):
+    # finish_job() for rows already passed through sink_rows()
+    if failure is None:
+        print(f"Scraped row {job.row + 1} from {job.column.capitalize()}")
+        sink.append(job.task, job.url, rows)
+        queue.complete(job)
+        return
+    phase, error = failure
+    if queue.fail(job, error, phase):
+        print(f"Error scraping {job.url} in {phase} (attempt {job.attempts} of {job.max_attempts}): {error}, retrying later")
+        return
+    print(f"Error scraping {job.url} in {phase}: {error}, giving up after {job.attempts} attempts")
+    sink.append(job.task, job.url, rows)
+
+# How often an empty queue is checked again while discovery is still adding jobs
+PRODUCER_POLL = 0.2
+
+def drain_queue(queue, sink, run_round, producer=None):
+    # Leases due jobs round by round until none are pending, sleeping through backoffs.
+    # While a producer thread is alive, an empty queue means "wait for more", not "done".
+    while True:
+        producing = producer is not None and producer.is_alive()
+        jobs = queue.lease(JOBS_PER_DOMAIN)
+        if jobs:
+            run_round(jobs)
+            sink.flush()
+            continue
+        wait = queue.next_due()
+        if wait is None:
+            if not producing:
+                return
+            wait = PRODUCER_POLL
+        elif producing:
+            wait = min(wait, PRODUCER_POLL)
+        time.sleep(wait)
+
+async def drain_queue_async(queue, sink, run_round, producer=None):
+    # drain_queue() for coroutine rounds
+    while True:
+        producing = producer is not None and producer.is_alive()
+        jobs = queue.lease(JOBS_PER_DOMAIN)
+        if jobs:
+            await run_round(jobs)
+            sink.flush()
+            continue
+        wait = queue.next_due()
+        if wait is None:
+            if not producing:
+                return
+            wait = PRODUCER_POLL
+        elif producing:
+            wait = min(wait, PRODUCER_POLL)
+        await asyncio.sleep(wait)
+
+def scrape_links(df, max_workers=MAX_WORKERS, domain_limits=None, sink=None, queue=None, producer=None):
+    # Scrape every URL concurrently; the returned list keeps the link sheet's row and column order.
+    # With a sink and a job queue, the URLs the sink does not hold yet are queued and the queue is
+    # drained into the sink, retrying failures; nothing is returned. With df=None the jobs come
+    # from a producer thread instead (see start_discovery).
+    if sink is not None:
+        if df is not None:
+            print(f"Scraping {enqueue_links(df, sink, queue)} URLs with {max_workers} workers...")
+
+        def run_round(jobs):
+            by_task = {ScrapeTask(job.row, job.column, job.url): job for job in jobs}
+
+            def report(result):
+                result_df, failure = result.value if result.error is None else (None, ("scrape", result.error))
+                finish_job(queue, sink, by_task[result.task], result_df, failure)
+
+            executor = ConcurrentScraper(lambda url: scrape_job(url, scrape), max_workers=max_workers,
+                                         domain_limits=domain_limits, limiter=RATE_LIMITER)
+            executor.run(by_task, on_result=report, keep_values=False)
+
+        drain_queue(queue, sink, run_round, producer)
+        return None
 
+    tasks = build_tasks(df)
+    print(f"Scraping {len(tasks)} URLs with {max_workers} workers...")
+
+    def report(result):
+        task = result.task
+        if result.error is not None:
+            print(f"Error scraping {task.url}: {result.error}")
+        else:
+            print(f"Scraped row {task.row + 1} from {task.column.capitalize()}")
+
+    executor = ConcurrentScraper(scrape, max_workers=max_workers, domain_limits=domain_limits, limiter=RATE_LIMITER)
+    all_data = []
+    for result in executor.run(tasks, on_result=report):
+        if result.error is None and result.value is not None:
+            result_df = result.value
+            result_df["source"] = result.task.column.capitalize()
+            all_data.append(result_df)
+    return all_data
+
+def scrape_cluster_job(job):
+    # scrape_job() on a cluster worker: the rows come back ready for the sink, so the pages of
+    # every worker are not all normalized on the coordinator
+    result_df, failure = scrape_job(job.url, scrape)
+    return sink_rows(ScrapeTask(job.row, job.column, job.url), result_df), failure
+
+def scrape_links_cluster(df, broker, workers=CLUSTER_WORKERS, sink=None, queue=None, producer=None):
+    # scrape_links() with the queue handed out through a broker to worker threads (LocalBroker) or
+    # processes (FileBroker) started here, plus any that join it from elsewhere. Results come back
+    # to this process, which sinks them and retries failures as scrape_links() does.
+    if df is not None:
+        print(f"Scraping {enqueue_links(df, sink, queue)} URLs with {workers} cluster workers...")
+    coordinator = Coordinator(broker, JOBS_PER_DOMAIN)
+    threads, processes = [], []
+    if isinstance(broker, FileBroker):
+        processes = start_worker_processes(broker.path, workers)
+    else:
+        threads = [Worker(broker, scrape_cluster_job).start() for _ in range(workers)]
     try:
-        driver.get(url)
-        wait = WebDriverWait(driver, 10)
-        time.sleep(2)
-
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        coordinator.run(queue, sink, finish_rows, workers, producer)
+    finally:
+        broker.stop()
+        for thread in threads:
+            thread.join()
+        for process in processes:
+            process.wait()
+    print(f"Cluster metrics: {coordinator.metrics()}")
+    print(coordinator.worker_report().to_string(index=False))
+    return coordinator
+
+# Scrapes go through the page cache, which may answer without touching the network
+def scrape(url):
+    return PAGE_CACHE.cached_scrape(url, call_scraper)
+
+async def scrape_links_async(df, concurrency=TAB_CONCURRENCY, sink=None, queue=None, producer=None):
+    # scrape_links() with every page in a tab of one browser, at most `concurrency` tabs at a time
+    if sink is not None:
+        if df is not None:
+            print(f"Scraping {enqueue_links(df, sink, queue)} URLs in up to {concurrency} tabs of one browser...")
+    else:
+        tasks = build_tasks(df)
+        print(f"Scraping {len(tasks)} URLs in up to {concurrency} tabs of one browser...")
+    browser = await DevToolsBrowser(concurrency).start()
 
-        # Title
-        title = soup.find("h1").get_text(strip=True) if soup.find("h1") else "N/A"
+    async def scrape_tab(url):
+        return await PAGE_CACHE.cached_scrape_async(url, lambda url: call_tab_scraper(browser, url))
 
-        # SKU & Description
-        try:
-            info_box = soup.find("div", class_="bg-gray-200")
-            sku_elem = info_box.find("p", string=lambda x: x and x.strip().startswith("SKU:"))
-            sku = sku_elem.get_text(strip=True).split("SKU:")[1].strip() if sku_elem else "N/A"
-            description = info_box.find("div", class_="staticPage").get_text(strip=True)
-        except:
-            sku, description = "N/A", "N/A"
-
-        # Image
+    async def scrape(task):
         try:
-            img_tag = soup.find("img", {"alt": lambda x: x and title in x})
-            img_src = img_tag["src"]
-            img_url = "https://hypefly.co.in" + img_src
-        except:
-            img_url = "N/A"
-
-        # Size dropdown
+            result_df = await scrape_tab(task.url)
+        except Exception as e:
+            print(f"Error scraping {task.url}: {e}")
+            return None
+        print(f"Scraped row {task.row + 1} from {task.column.capitalize()}")
+        return result_df
+
+    # scrape_job() for a tab; every job runs in its own asyncio task, so failures are tracked per job
+    async def run_job(job):
+        TRACER.clear_failure()
         try:
-            size_btn = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[.//p[text()='Size:']]")))
-            ActionChains(driver).move_to_element(size_btn).click().perform()
-            time.sleep(2)
+            result_df = await scrape_tab(job.url)
         except Exception as e:
-            print("Failed to click Size dropdown:", e)
-
-        # Refresh soup
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        size_divs = soup.select("ul.grid li")
-
-        size_price_dict = {}
-        for div in size_divs:
-            try:
-                parts = list(div.stripped_strings)
-                size = parts[0]
-                price = parts[1] if len(parts) > 1 else "N/A"
-                size_price_dict[size] = price
-            except:
-                continue
-
-        # Build DataFrame
-        rows = [{
-            "title": title,
-            "url": url,
-            "size": size,
-            "price": price,
-            "description": description,
-            "sku": sku,
-            "images": img_url
-        } for size, price in size_price_dict.items()]
+            phase, _ = TRACER.last_failure() or ("scrape", None)
+            finish_job(queue, sink, job, None, (phase, e))
+            return
+        finish_job(queue, sink, job, result_df, scrape_failure(result_df))
 
-        return pd.DataFrame(rows)
-
-    finally:
-        driver.quit()
-
-def scrape_crepdogcrew_product(url: str) -> pd.DataFrame:
-    options = Options()
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(options=options)
+    async def run_round(jobs):
+        await asyncio.gather(*(run_job(job) for job in jobs))
 
     try:
-        # --- Scroll to Bottom ---
-        def scroll_to_bottom():
-            last_height = driver.execute_script("return document.body.scrollHeight")
-            while True:
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                if new_height == last_height:
-                    break
-                last_height = new_height
-
-        # --- Extract Price from Soup ---
-        def get_price(soup):
-            tag = soup.select_one("sale-price span.cvc-money")
-            return tag.get_text(strip=True).replace("MRP", "").strip() if tag else "N/A"
-
-        # --- Begin Scraping ---
-        driver.get(url)
-        scroll_to_bottom()
-        WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CLASS_NAME, "product-info__title")))
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-
-        title = soup.find("h1", class_="product-info__title")
-        title = title.get_text(strip=True) if title else "N/A"
-
-        desc_container = soup.find("div", class_="accordion__content")
-        description, sku = "N/A", "N/A"
-        if desc_container:
-            prose = desc_container.find("div", class_="prose")
-            if prose:
-                desc_parts = []
-                for p in prose.find_all("p"):
-                    text = p.get_text(strip=True)
-                    if "SKU" in text.upper():
-                        match = re.search(r"SKU\s*[-:–]?\s*(.+)", text, re.I)
-                        if match:
-                            sku = match.group(1).strip()
-                    else:
-                        desc_parts.append(text)
-                description = " ".join(desc_parts).strip()
-
-        size_price_mapping = {}
-        size_grid_found = False
-        for fieldset in soup.find_all("fieldset", class_="variant-picker__option"):
-            legend = fieldset.find("legend")
-            if legend and "size" in legend.get_text(strip=True).lower():
-                size_grid_found = True
-                for label in fieldset.select("label.block-swatch:not(.is-disabled)"):
-                    span = label.find("span")
-                    size = span.get_text(strip=True) if span else "N/A"
-                    input_id = label.get("for")
-                    if input_id:
-                        try:
-                            btn = driver.find_element(By.ID, input_id)
-                            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", btn)
-                            time.sleep(1)
-                            driver.execute_script("arguments[0].click();", btn)
-                            time.sleep(3)
-                            updated_soup = BeautifulSoup(driver.page_source, 'html.parser')
-                            price = get_price(updated_soup)
-                            size_price_mapping[size] = price
-                        except:
-                            size_price_mapping[size] = "Error"
-
-        if not size_grid_found:
-            size_price_mapping = {"N/A": get_price(soup)}
-
-        images = []
-        for img in soup.select("page-dots img"):
-            src = img.get("src")
-            if src and src.startswith("//"):
-                images.append("https:" + src)
-
-        if not images:
-            img = soup.select_one("div.product-gallery__media.snap-center.is-selected img")
-            if img:
-                src = img.get("src")
-                if src and src.startswith("//"):
-                    images.append("https:" + src)
-
-        if not images:
-            images = ["N/A"]
-
-        return pd.DataFrame([{
-            "title": title,
-            "url": url,
-            "size": size,
-            "price": price,
-            "description": description,
-            "sku": sku,
-            "images": ', '.join(images)
-        } for size, price in size_price_mapping.items()])
-
+        if sink is not None:
+            await drain_queue_async(queue, sink, run_round, producer)
+        else:
+            results = await asyncio.gather(*(scrape(task) for task in tasks))
     finally:
-        driver.quit()
-
-def scrape_culture_circle_product(url: str) -> pd.DataFrame:
-    options = Options()
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--start-maximized")
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        await browser.close()
+    print(f"DevTools browser metrics: {browser.metrics()}")
+    if sink is not None:
+        return None
 
-    try:
-        # --- Scroll to Bottom ---
-        def scroll_to_bottom():
-            last_height = driver.execute_script("return document.body.scrollHeight")
-            while True:
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1.5)
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                if new_height == last_height:
-                    break
-                last_height = new_height
-
-        # --- Begin Scraping ---
-        driver.get(url)
-        scroll_to_bottom()
-
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "a_productHeading__jLymj"))
-        )
+    all_data = []
+    for task, result_df in zip(tasks, results):
+        if result_df is not None:
+            result_df["source"] = task.column.capitalize()
+            all_data.append(result_df)
+    return all_data
+
+def clean_data(final_df):
+    #data cleaning, over whole columns (see normalize.py)
+    final_df['price'] = display_prices(final_df['price'])
+    final_df['size'] = canonical_sizes(final_df['size']) # Standardize the 'size' column
+    return final_df
+
+# Columns the output sink stores next to the scraped ones (see normalize.normalize_frame)
+NORMALIZED_COLUMNS = ['price_paise', 'currency', 'size_system', 'size_uk']
+
+def sink_rows(task, result_df):
+    # A finished URL's rows as the output sink stores them: cleaned, normalized and tagged with their source
+    if result_df is None:
+        return None
+    result_df["source"] = task.column.capitalize()
+    return normalize_frame(clean_data(result_df))
 
-        try:
-            read_more = driver.find_element(By.XPATH, "//button[contains(text(), 'Read more')]")
-            driver.execute_script("arguments[0].click();", read_more)
-            time.sleep(1)
-        except:
-            pass
-
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-
-        title_div = soup.find("div", class_="a_productHeading__jLymj")
-        product_name = title_div.find("h2").text.strip() if title_div and title_div.find("h2") else "N/A"
-        title = product_name
-
-        desc_tag = soup.find("p", class_="w-full")
-        description = desc_tag.get_text(strip=True) if desc_tag else "N/A"
-
-        image_tags = soup.find_all("img", class_="a_thumbnailImage___06oR")
-        images = [img['src'] for img in image_tags if img.get('src')]
-
-        # Updated Image Extraction
-        images = []
-        # Try primary image source (a_thumbnailImage___06oR)
-        image_tags = soup.find_all("img", class_="a_thumbnailImage___06oR")
-        images = [img['src'] for img in image_tags if img.get('src')]
-
-        # Fallback to a_mainImage__kjiv_ if no images found
-        if not images:
-            fallback_image = soup.find("div", class_="a_imageWrapper__fi6Ev")
-            if fallback_image:
-                img_tag = fallback_image.find("img", class_="a_mainImage__kjiv_")
-                if img_tag and img_tag.get('src'):
-                    images.append(img_tag['src'])
-
-        # If still no images, set a default placeholder
-        if not images:
-            images = ["N/A"]
-        
-        sizes_prices = []
-        seen = set()
-        size_wrappers = soup.find_all("div", class_="a_sizeSlide__FHiSL")
-        for size_div in size_wrappers:
-            size = size_div.find("div", class_="a_sizeSlideSize__jBG1p")
-            price = size_div.find("p", class_="a_sizeSlidePrice__NASxX")
-            if size and price:
-                size_text = size.get_text(strip=True)
-                price_text = price.get_text(strip=True)
-                if (size_text, price_text) not in seen:
-                    seen.add((size_text, price_text))
-                    sizes_prices.append({"size": size_text, "price": price_text})
-
-        if not sizes_prices:
-            sizes_prices = [{"size": "N/A", "price": "N/A"}]
-
-        df = pd.DataFrame([{
-            "title": title,
-            "url": url,
-            "size": sp["size"],
-            "price": sp["price"],
-            "description": description,
-            "sku": "N/A",
-            "images": ", ".join(images) if images else "N/A"
-        } for sp in sizes_prices])
-
-        return df
+def url_brand(url):
+    # Extract brand from URL
+    site = SITES.lookup(url)
+    return site.name if site is not None else 'unknown'
+
+class ProductNumberer:
+    """Numbers rows by product, one brand cycle per product; keeps its state between
+    chunks so a file streamed through it gets the numbers add_product_no() would give.
+    With num_brands=None (discovered URLs, which have no link sheet rows) every URL is
+    a product of its own."""
+
+    def __init__(self, num_brands):
+        self.num_brands = num_brands
+        self.current_product_no = 1
+        self.seen_brands = set()
+        self.cycle_started = False
+        self.first_brand = None
+        self.last_url = None
+
+    def numbers(self, urls) -> list:
+        product_no_list = []
+        for url in urls:
+            if self.num_brands is None:
+                if self.last_url is not None and url != self.last_url:
+                    self.current_product_no += 1
+                self.last_url = url
+                product_no_list.append(self.current_product_no)
+                continue
+            brand = url_brand(url)
 
-    finally:
-        driver.quit()
+            # Set the first brand encountered
+            if self.first_brand is None and brand != 'unknown':
+                self.first_brand = brand
 
-################### MAIN EXECUTION ######################
+            # Check if a new cycle is starting (only on mainstreet after full cycle)
+            if brand == self.first_brand and self.cycle_started and len(self.seen_brands) >= self.num_brands:
+                self.current_product_no += 1
+                self.seen_brands.clear()  # Reset seen_brands for the new cycle
+                self.cycle_started = False
 
-# Load the links CSV
-df = pd.read_csv('links fr testing price tool - Sheet1.csv')
+            # Add the brand to seen_brands and mark cycle as started
+            if brand != 'unknown':
+                self.seen_brands.add(brand)
+                self.cycle_started = True
 
-# Normalize column names
-df.columns = df.columns.str.strip().str.lower().str.replace(" ", "-")
+            # Append the current product_no to the list
+            product_no_list.append(self.current_product_no)
+        return product_no_list
 
-# Count the number of URL columns (brands) in the input CSV
-url_columns = [col for col in df.columns if df[col].apply(lambda x: isinstance(x, str) and x.startswith("http")).any()]
-num_brands = len(url_columns)
+    def __call__(self, final_df):
+        new_df = final_df.copy()
+        new_df['product_no'] = self.numbers(new_df['url'])
 
-df.rename(columns={
-    "mainstreet": "mainstreet",
-    "crepdogcrew": "crepdogcrew",
-    "hyepfly": "hypefly",
-    "culture-circle": "culture-circle"
-}, inplace=True)
+        # Reorder columns to make product_no the first column
+        columns = ['product_no'] + [col for col in new_df.columns if col != 'product_no']
+        return new_df[columns]
 
-# Holds all the individual product DataFrames
-all_data = []
+def add_product_no(final_df, num_brands):
+    # ADDING NEW COLUMN product_no FOR USING IT AS PRIMARY KEY WITH COLUMN size
+    return ProductNumberer(num_brands)(final_df)
 
-# Function to choose scraper based on URL
-def call_scraper(url):
-    if "mainstreet" in url:
-        return scrape_mainstreet_product(url)
-    elif "crepdogcrew" in url:
-        return scrape_crepdogcrew_product(url)
-    elif "hypefly" in url:
-        return scrape_hypefly_product(url)
-    elif "culture-circle" in url:
-        return scrape_culture_circle_product(url)
+# Function to clean and convert price to numeric (rupees; decimals are kept, so
+# "Rs. 10,999.00" and "₹10,999" compare equal)
+def clean_price(price):
+    paise, currency = parse_price(price)
+    # inf never wins the min comparison: missing prices and prices in another currency
+    return paise / 100 if paise is not None and currency == DEFAULT_CURRENCY else float('inf')
+
+INVALID_SIZES = ['N/A', 'Error', '']
+# Labels that are nothing but a size; qualified ones ("UK 6(EU40)", "UK 5(GS)") are variants of their own
+PLAIN_SIZE = r"(?:UK|US|EU) \d+(?:\.\d+)?"
+
+def comparison_sizes(new_df):
+    # The size prices are compared by: the UK size of a plain label whose conversion is one-to-one
+    # (so "UK 8", "US 9" and "EU 42.5" are one size), the size label otherwise (qualified or unknown
+    # sizes, US 6.5 / US 7 and the other pairs the chart maps to one UK size, frames without size_uk)
+    sizes = new_df['size']
+    if 'size_uk' not in new_df:
+        return sizes
+    text = sizes.where(sizes.map(type) == str).astype('string')
+    size_uk = new_df['size_uk'].astype('float64')
+    mergeable = (text.str.fullmatch(PLAIN_SIZE).fillna(False).astype(bool)
+                 & (text.str.startswith('UK ').fillna(False).astype(bool) | size_uk.isin(ONE_TO_ONE_UK)))
+    uk_sizes = size_uk[mergeable].dropna().map(lambda size: f"UK {size:g}")
+    merged = uk_sizes.reindex(new_df.index).astype(object).fillna(sizes)
+
+    # A store listing two labels of one size (say "UK 8" and "US 9") keeps them apart
+    labels = pd.DataFrame({'product_no': new_df['product_no'], 'source': new_df['source'], 'key': merged, 'size': sizes})
+    label_count = labels.groupby(['product_no', 'source', 'key'], dropna=False)['size'].transform('nunique')
+    return merged.where(label_count <= 1, sizes)
+
+def mark_best_prices(new_df):
+    # Apply price cleaning
+    new_df['price_numeric'] = price_values(new_df['price'])
+
+    # Lowest price of every (product_no, size) pair, broadcast back to its rows
+    group_min = new_df.groupby(['product_no', comparison_sizes(new_df)])['price_numeric'].transform('min')
+
+    # Rows matching their pair's minimum are best prices; invalid sizes and pairs with no valid price are skipped
+    new_df['is_best_price'] = (
+        ~new_df['size'].isin(INVALID_SIZES)
+        & (group_min != float('inf'))
+        & (new_df['price_numeric'] == group_min)
+    )
+
+    # Drop the temporary price_numeric column
+    return new_df.drop(columns=['price_numeric'])
+
+def build_best_price_table(new_df, sources=None):
+    # Filter and display rows where is_best_price is True
+    best_price_rows = new_df[new_df['is_best_price'] == True]
+
+    # Drop the is_best_price column
+    best_price_rows = best_price_rows.drop(columns=['is_best_price'])
+
+    best_price_rows.rename(columns={'price': 'best_price', 'source': 'best_seller'}, inplace=True)
+
+    # Dynamically get the list of companies and append '_price' to each
+    # (streamed blocks pass the whole file's sources so every block has the same columns)
+    if sources is None:
+        sources = new_df['source'].unique().tolist()
+    companies = [f"{company}_price" for company in sources]
+
+    # One price per (product_no, size, source), the last listed one winning as it did row by row,
+    # pivoted into a column per source; pairs a source does not sell stay '-'. Sizes are matched
+    # as mark_best_prices compares them, so a store listing the size in another system still shows.
+    sizes = comparison_sizes(new_df)
+    keys = ['product_no', 'size_key', 'source']
+    offers = new_df.assign(size_key=sizes).loc[sizes.notna(), keys + ['price']].drop_duplicates(keys, keep='last')
+    offers = offers.set_index(keys)['price']
+    prices = offers.unstack('source').reindex(columns=sources)
+    listed = pd.Series(True, index=offers.index).unstack('source', fill_value=False)
+    prices = prices.astype(object).where(listed.reindex(columns=sources, fill_value=False), '-')
+    prices.columns = companies
+
+    best_price_rows = best_price_rows.assign(size_key=sizes).join(prices, on=['product_no', 'size_key'])
+
+    # Reorder columns to have company prices at the end
+    columns = ['product_no', 'title', 'url', 'size']+ companies + ['best_price', 'best_seller','description', 'sku', 'images']
+    return best_price_rows[columns]
+
+def fetch_images(sink, output_dir):
+    # Downloads every image URL in the sink's product table into the image store
+    urls = {}
+    for products, _ in sink.iter_tables():
+        for cell in products['images'].unique():
+            urls.update(dict.fromkeys(split_image_urls(cell)))
+    store = ImageStore(os.path.join(output_dir, IMAGE_DIR))
+    print(f"Fetching {len(urls)} product images...")
+    with TRACER.span("fetch_images", site="pipeline"):
+        store.fetch_all(urls)
+    print(f"Image store metrics: {store.metrics()}")
+    return store
+
+def write_outputs(sink, output_dir, num_brands, images=None, matcher=None, snapshot=None):
+    # Streams the sink's rows into the three CSVs a chunk at a time, each chunk a flat view of the
+    # sink's product and variant tables (see catalog.py). Best prices are worked out
+    # per product_no block, and a block is only written once the next one has started.
+    # With a matcher, product_no comes from matching listings across stores and the rows are
+    # written grouped by product; with an image store, the images column holds image IDs
+    # and IMAGES.csv lists their files. A snapshot writer gets every numbered block as well.
+    paths = {name: os.path.join(output_dir, name) for name in
+             ("DATA_ANALYSIS_1.csv", "DATA_ANALYSIS_2.csv", "FINAL_BEST_PRICES.csv")}
+    written = set()
+
+    def append(df, name):
+        df.to_csv(paths[name], index=False, mode='a' if name in written else 'w', header=name not in written)
+        written.add(name)
+
+    def write_block(block):
+        if block.empty:
+            return
+        with TRACER.span("mark_best_prices", site="pipeline"):
+            block = mark_best_prices(block)
+            append(block.drop(columns=NORMALIZED_COLUMNS), "DATA_ANALYSIS_2.csv")
+        if snapshot is not None:
+            with TRACER.span("snapshot_prices", site="pipeline"):
+                snapshot.append(block)
+        with TRACER.span("build_best_price_table", site="pipeline"):
+            append(build_best_price_table(block, sources), "FINAL_BEST_PRICES.csv")
+
+    # The source columns of the final table, in the order the sources first appear
+    sources = sink.first_appearance('source')
+    if matcher is None:
+        numberer = ProductNumberer(num_brands)
+        chunks = sink.iter_chunks()
     else:
-        print(f"Unknown source in URL: {url}")
-        return None
+        def match(products):
+            with TRACER.span("match_products", site="pipeline"):
+                return matcher.match(products)
+        chunks = sink.iter_numbered(match)
+    carry = None
+    for chunk in chunks:
+        # The normalized columns stay until the best prices are marked (sizes compare by size_uk)
+        chunk = chunk.drop(columns=TASK_COLUMN)
+        if images is not None:
+            chunk['images'] = images.ids_for(chunk['images'])
+        with TRACER.span("clean_data", site="pipeline"):
+            append(chunk.drop(columns=NORMALIZED_COLUMNS + ['product_no'], errors='ignore'), "DATA_ANALYSIS_1.csv")
+        with TRACER.span("add_product_no", site="pipeline"):
+            if matcher is None:
+                numbered = numberer(chunk)
+            else:
+                numbered = chunk[['product_no'] + [col for col in chunk.columns if col != 'product_no']]
+        if carry is not None:
+            numbered = pd.concat([carry, numbered], ignore_index=True)
+        # The last product may continue in the next chunk
+        last = numbered['product_no'] == numbered['product_no'].iloc[-1]
+        write_block(numbered[~last])
+        carry = numbered[last].reset_index(drop=True)
+    if carry is not None:
+        write_block(carry)
+    if images is not None and written:
+        images.manifest().to_csv(os.path.join(output_dir, "IMAGES.csv"), index=False)
+    return bool(written)
+
+def write_dead_letters(queue, output_dir):
+    # URLs that failed every attempt, with the last error and the phase it happened in
+    path = os.path.join(output_dir, "DEAD_LETTERS.csv")
+    dead = queue.dead_letters()
+    if not dead:
+        if os.path.exists(path):
+            os.remove(path)  # left by an earlier run
+        return
+    pd.DataFrame(dead).to_csv(path, index=False)
+    print(f"{len(dead)} URLs failed every attempt. Details saved to 'DEAD_LETTERS.csv'.")
 
-# Go row by row
-for index, row in df.iterrows():
-    print(f"\nProcessing product row {index + 1}")
-    
-    for col_name in df.columns:
-        url = row[col_name]
-        if pd.notna(url) and isinstance(url, str) and url.startswith("http"):
-            print(f"Scraping from {col_name.capitalize()}...")
-            try:
-                result_df = call_scraper(url)
-                if result_df is not None:
-                    result_df["source"] = col_name.capitalize()
-                    all_data.append(result_df)
-            except Exception as e:
-                print(f"Error scraping {url}: {e}")
-
-# Final combined output
-if all_data:
-    final_df = pd.concat(all_data, ignore_index=True)
-else:
-    print("\nNo data scraped. Please check the URLs or scrapers.")
-
-#data cleaning
-final_df['price'] = final_df['price'].astype(str).str.replace('₹', 'Rs. ', regex=False)
-def fix_size_format(size):
-    if not isinstance(size, str):
-        return size  # leave non-string values (like NaN or pd.NA) untouched
-    return re.sub(r'^(UK|EU|US)\s*', r'\1 ', size.strip(), flags=re.IGNORECASE)
-final_df['size'] = final_df['size'].apply(fix_size_format) # Standardize the 'size' column
-
-final_df.to_csv("DATA_ANALYSIS_1.csv", index=False)
-print("Basic data scraping complete. Output saved to 'DATA_ANALYSIS_1.csv'.")
-
-new_df=final_df.copy()
-
-# ADDING NEW COLUMN product_no FOR USING IT AS PRIMARY KEY WITH COLUMN size
-
-# Initialize variables
-current_product_no = 1
-product_no_list = []
-seen_brands = set()
-cycle_started = False
-first_brand = None
-
-# Iterate through new_df row by row
-for index, row in new_df.iterrows():
-    url = row['url']
-    
-    # Extract brand from URL
-    if 'mainstreet' in url.lower():
-        brand = 'mainstreet'
-    elif 'crepdogcrew' in url.lower():
-        brand = 'crepdogcrew'
-    elif 'hypefly' in url.lower():
-        brand = 'hypefly'
-    elif 'culture-circle' in url.lower():
-        brand = 'culture-circle'
+################### MAIN EXECUTION ######################
+
+def main(links_csv=LINKS_CSV, output_dir=".", seeds=None):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    if METRICS_PORT:
+        start_metrics_server(TRACER, int(METRICS_PORT), extra=[RATE_LIMITER, BUDGETS])
+        print(f"Serving metrics on http://127.0.0.1:{METRICS_PORT}/metrics")
+    if TRACE_FILE:
+        TRACER.export(os.path.join(output_dir, TRACE_FILE))
+    seeds = list(seeds if seeds is not None else DISCOVERY_SEEDS)
+
+    # The link sheet (or the discovery crawl) is drained through a job queue into the sink, a URL
+    # at a time; a rerun after a crash skips the URLs the sink already holds
+    sink = OutputSink(os.path.join(output_dir, RUN_DIR))
+    queue = JobQueue(os.path.join(sink.path, QUEUE_FILE))
+    crawler = producer = None
+    if seeds:
+        # The seeds stand in for the link sheet; discovered URLs are matched to the previous
+        # run's by URL (see start_discovery)
+        df, num_brands = None, None
+        completed = sink.open(seeds)
+        if completed:
+            print(f"Resuming: {len(completed)} discovered URLs already scraped")
+        crawler = DiscoveryCrawler()
+        print(f"Discovering products from {len(seeds)} seeds...")
+        producer = start_discovery(seeds, completed, queue, crawler)
     else:
-        brand = 'unknown'
-    
-    # Set the first brand encountered
-    if first_brand is None and brand != 'unknown':
-        first_brand = brand
-        
-    # Check if a new cycle is starting (only on mainstreet after full cycle)
-    if brand == first_brand and cycle_started and len(seen_brands) >= num_brands:
-        current_product_no += 1
-        seen_brands.clear()  # Reset seen_brands for the new cycle
-        cycle_started = False
-    
-    # Add the brand to seen_brands and mark cycle as started
-    if brand != 'unknown':
-        seen_brands.add(brand)
-        cycle_started = True
-    
-    # Append the current product_no to the list
-    product_no_list.append(current_product_no)
-
-# Add the 'product_no' column to new_df
-new_df['product_no'] = product_no_list
-
-# Reorder columns to make product_no the first column
-columns = ['product_no'] + [col for col in new_df.columns if col != 'product_no']
-new_df = new_df[columns]
-
-# Function to clean and convert price to numeric
-def clean_price(price):
-    if not isinstance(price, str) or price in ['N/A', 'Error', '']:
-        return float('inf')  # Use inf for invalid prices to exclude them from min comparison
-    # Remove currency symbols, commas, and extra spaces
-    price = re.sub(r'[₹Rs.\s,]', '', price.strip())
-    try:
-        return float(price)
-    except ValueError:
-        return float('inf')  # Return inf for non-numeric prices
-
-# Apply price cleaning
-new_df['price_numeric'] = new_df['price'].apply(clean_price)
-
-# Initialize is_best_price column
-new_df['is_best_price'] = False
-
-# Group by product_no and size to find the best price
-for (product_no, size), group in new_df.groupby(['product_no', 'size']):
-    if size in ['N/A', 'Error', ''] or group['price_numeric'].isna().all():
-        continue  # Skip invalid sizes or groups with no valid prices
-    # Find the minimum price for this (product_no, size) pair
-    min_price = group['price_numeric'].min()
-    if min_price == float('inf'):
-        continue  # Skip if no valid prices in the group
-    # Mark the row(s) with the minimum price as TRUE
-    new_df.loc[(new_df['product_no'] == product_no) & 
-               (new_df['size'] == size) & 
-               (new_df['price_numeric'] == min_price), 'is_best_price'] = True
-
-# Drop the temporary price_numeric column
-new_df = new_df.drop(columns=['price_numeric'])
-
-new_df.to_csv("DATA_ANALYSIS_2.csv", index=False)
-print("Added product_no and is_best_price column. Output saved to 'DATA_ANALYSIS_2.csv'.")
-    
-# Filter and display rows where is_best_price is True
-best_price_rows = new_df[new_df['is_best_price'] == True]
-    
-# Drop the is_best_price column
-best_price_rows = best_price_rows.drop(columns=['is_best_price'])
-
-best_price_rows.rename(columns={'price': 'best_price', 'source': 'best_seller'}, inplace=True)
-
-# Dynamically get the list of companies and append '_price' to each
-companies = [f"{company}_price" for company in new_df['source'].unique().tolist()]
-
-# Add columns for each company's price
-for company in companies:
-    best_price_rows[company] = '-'
-
-# Populate company price columns using DATA_ANALYSIS_2 (new_df)
-for index, row in best_price_rows.iterrows():
-    product_no = row['product_no']
-    size = row['size']
-        
-    # Get all prices for this product_no and size from new_df
-    matching_rows = new_df[(new_df['product_no'] == product_no) & (new_df['size'] == size)]
-        
-    for _, match_row in matching_rows.iterrows():
-        source = match_row['source']
-        price = match_row['price']
-        # Map source to the corresponding _price column
-        source_column = f"{source}_price"
-        if source_column in companies:
-            best_price_rows.at[index, source_column] = price
-
-
-# Reorder columns to have company prices at the end
-columns = ['product_no', 'title', 'url', 'size']+ companies + ['best_price', 'best_seller','description', 'sku', 'images'] 
-best_price_rows = best_price_rows[columns]
-        
-best_price_rows.to_csv("FINAL_BEST_PRICES.csv", index=False)
-print("FINAL BEST PRICES OBTAINED FOR EVERY UNIQUE SIZE PER PRODUCT. Output saved to 'FINAL_BEST_PRICES.csv'.")
\ No newline at end of file
+        df, num_brands = load_links(links_csv)
+    with TRACER.span("scrape_links", site="pipeline"):
+        if CLUSTER_BROKER is not None:
+            broker = LocalBroker() if CLUSTER_BROKER == "local" else FileBroker(os.path.join(output_dir, CLUSTER_DIR))
+            scrape_links_cluster(df, broker, sink=sink, queue=queue, producer=producer)
+        elif USE_DEVTOOLS_TABS:
+            asyncio.run(scrape_links_async(df, sink=sink, queue=queue, producer=producer))
+        else:
+            scrape_links(df, sink=sink, queue=queue, producer=producer)
+
+    # Shut down the warm browsers and report how often they were reused
+    DRIVER_POOL.close()
+    print(f"Driver pool metrics: {DRIVER_POOL.metrics()}")
+    if PAGE_CACHE.enabled:
+        print(f"Page cache metrics: {PAGE_CACHE.metrics()}")
+    print(f"Output sink metrics: {sink.metrics()}")
+    print(f"Job queue metrics: {queue.metrics()}")
+    if crawler is not None:
+        print(f"Discovery metrics: {crawler.metrics()}")
+    if RATE_LIMITER.enabled:
+        print(f"Rate limiter metrics: {RATE_LIMITER.metrics()}")
+    if BUDGETS.stats["pages"]:
+        print(f"Page budget metrics: {BUDGETS.metrics()}")
+    write_dead_letters(queue, output_dir)
+    queue.close()
+
+    # Final combined output
+    images = fetch_images(sink, output_dir) if FETCH_IMAGES else None
+    matcher = ProductMatcher() if MATCH_PRODUCTS else None
+    snapshot = SnapshotWriter(os.path.join(output_dir, SNAPSHOT_DIR)) if PUBLISH_PRICES else None
+    if not write_outputs(sink, output_dir, num_brands, images, matcher, snapshot):
+        print("\nNo data scraped. Please check the URLs or scrapers.")
+        if snapshot is not None:
+            snapshot.discard()
+        sink.remove()
+        TRACER.close()
+        return
+    print("Basic data scraping complete. Output saved to 'DATA_ANALYSIS_1.csv'.")
+    print("Added product_no and is_best_price column. Output saved to 'DATA_ANALYSIS_2.csv'.")
+    if matcher is not None:
+        print(f"Product matching metrics: {matcher.metrics()}")
+    if snapshot is not None:
+        snapshot.publish()
+        print(f"Price snapshot {snapshot.name} published to '{SNAPSHOT_DIR}' for the price service.")
+    print("FINAL BEST PRICES OBTAINED FOR EVERY UNIQUE SIZE PER PRODUCT. Output saved to 'FINAL_BEST_PRICES.csv'.")
+    if images is not None:
+        print(f"Product images stored in '{IMAGE_DIR}'. Image IDs listed in 'IMAGES.csv'.")
+        images.close()
+
+    # Every output is written, so the next run starts from scratch
+    sink.remove()
+
+    TRACER.print_summary()
+    TRACER.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+################### IMPORTS ######################
+
+import math
+import re
+import time
+from collections import Counter
+import pandas as pd
+
+################### SETTINGS ######################
+
+# Two titles are the same product when their token sets have at least this weighted Jaccard
+# similarity. Tokens weigh log(1 + listings / listings with the token), so shared rare words
+# ("Panda", "Legend") count for more than shared common ones ("Low", "Jordan").
+MATCH_THRESHOLD = 0.45
+
+# A token in more listings than this is too common to look matches up by alone ("white", "low" in
+# a large catalog): scanning its listings would compare every title with a share of all the others.
+# It is looked up paired with each other token of the title instead, and a pair just as common
+# is not looked up at all.
+MAX_POSTINGS = 200
+
+# Words stores add or drop at will: brand prefixes, "Retro", "SE"
+NOISE_TOKENS = {"nike", "air", "adidas", "originals", "retro", "se", "the", "and", "with", "shoes", "sneakers"}
+
+# Editions that make a different product from the same model and colourway
+EDITION_TOKENS = {"gs", "ps", "td", "wmns", "womens", "kids"}
+
+# Release years are left out of titles as often as they are put in
+YEAR = re.compile(r"^(19|20)\d\d$")
+TOKEN = re.compile(r"[a-z0-9]+")
+
+MISSING = {"", "n/a", "error", "nan", "none"}
+
+# Score of a SKU link, ahead of every title link
+SKU_SCORE = 2.0
+
+################### NORMALIZATION ######################
+
+def title_tokens(title) -> frozenset:
+    # The words of a title that identify the product: "Jordan 1 Low SE 'Legend Light Brown'"
+    # -> {jordan, 1, low, legend, light, brown}
+    if not isinstance(title, str) or title.strip().lower() in MISSING:
+        return frozenset()
+    words = TOKEN.findall(title.lower().replace("'s", "s"))
+    return frozenset(word for word in words if word not in NOISE_TOKENS and not YEAR.match(word))
+
+
+def normalize_sku(sku):
+    # Style code without separators or case ("fn5032-200" -> "FN5032200"), or None
+    if not isinstance(sku, str) or sku.strip().lower() in MISSING:
+        return None
+    return re.sub(r"[^A-Z0-9]", "", sku.upper()) or None
+
+
+def conflicting(a: frozenset, b: frozenset) -> bool:
+    # Titles that share words but name another model number ("Jordan 1" and "Jordan 4")
+    # or edition ("GS") are different products, however similar the rest
+    numbers_a = {token for token in a if token.isdigit()}
+    numbers_b = {token for token in b if token.isdigit()}
+    if numbers_a and numbers_b and numbers_a != numbers_b:
+        return True
+    return (a & EDITION_TOKENS) != (b & EDITION_TOKENS)
+
+
+def token_weights(token_sets) -> dict:
+    frequency = Counter(token for tokens in token_sets for token in tokens)
+    return {token: math.log1p(len(token_sets) / count) for token, count in frequency.items()}
+
+
+def weighted_jaccard(a: frozenset, b: frozenset, weights: dict, total_a=None, total_b=None) -> float:
+    # Weight of the shared tokens over the weight of all of them; pass the titles' total
+    # weights when they are known
+    shared = sum(weights[token] for token in a & b)
+    if total_a is None:
+        total_a = sum(weights[token] for token in a)
+    if total_b is None:
+        total_b = sum(weights[token] for token in b)
+    union = total_a + total_b - shared
+    return shared / union if union else 0.0
+
+################### MATCHER ######################
+
+class ProductMatcher:
+    """Clusters listings from every store into canonical products by title and SKU.
+
+    Listings with the same normalized SKU are linked directly. Titles are compared through an
+    inverted index with prefix filtering: a title's tokens are taken rarest first until the ones
+    left weigh less than threshold times the whole title, and two titles that reach the threshold
+    must share a token of these prefixes. Only listings sharing such a rare token (or, for tokens
+    in more than max_postings listings, such a token and one more) are compared, so the work grows
+    with the catalog, not with its square. Links are then applied best first, and (with one_per_source) two listings of the
+    same store are never put in one product."""
+
+    def __init__(self, threshold=MATCH_THRESHOLD, one_per_source=True, max_postings=MAX_POSTINGS):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.max_postings = max_postings
+        self.one_per_source = one_per_source
+        self.stats = {}
+
+    def _prefix(self, tokens, weights, total):
+        # The rarest tokens, until the rest weigh less than threshold * total
+        prefix, rest = [], total
+        for token in sorted(tokens, key=lambda token: (-weights[token], token)):
+            if rest < self.threshold * total - 1e-9:
+                break
+            prefix.append(token)
+            rest -= weights[token]
+        return prefix
+
+    def candidate_pairs(self, token_sets, weights=None):
+        # (score, i, j) for every pair of listings whose titles reach the threshold
+        weights = weights or token_weights(token_sets)
+        totals = [sum(weights[token] for token in tokens) for tokens in token_sets]
+        frequency = Counter(token for tokens in token_sets for token in tokens)
+        stop_tokens = {token for token, count in frequency.items() if count > self.max_postings}
+        index, same, pairs, compared, skipped = {}, {}, [], 0, 0
+        for i, tokens in enumerate(token_sets):
+            if not tokens:
+                continue
+            seen = set()
+            # Titles with the same tokens, found whatever their tokens
+            if tokens in same:
+                seen.add(same[tokens])
+                pairs.append((1.0, same[tokens], i))
+            else:
+                same[tokens] = i
+            prefix = self._prefix(tokens, weights, totals[i])
+            keys = [token for token in prefix if token not in stop_tokens]
+            keys += [(token, other) for token in prefix if token in stop_tokens for other in tokens if other != token]
+            for key in keys:
+                postings = index.setdefault(key, [])
+                if len(postings) >= self.max_postings:
+                    skipped += 1
+                    continue
+                for j in postings:
+                    if j in seen:
+                        continue
+                    seen.add(j)
+                    # Length filter: the similarity is at most the lighter title over the heavier one
+                    if min(totals[i], totals[j]) < self.threshold * max(totals[i], totals[j]):
+                        continue
+                    compared += 1
+                    score = weighted_jaccard(tokens, token_sets[j], weights, totals[i], totals[j])
+                    if score >= self.threshold:
+                        pairs.append((score, j, i))
+                postings.append(i)
+        self.stats.update(compared=compared, stop_tokens=len(stop_tokens), keys_skipped=skipped)
+        return pairs
+
+    def sku_pairs(self, skus):
+        # Every listing after the first with a SKU, linked to the first listing with that SKU
+        first, pairs = {}, []
+        for i, sku in enumerate(skus):
+            if sku is None:
+                continue
+            if sku in first:
+                pairs.append((SKU_SCORE, first[sku], i))
+            else:
+                first[sku] = i
+        return pairs
+
+    def match(self, listings: pd.DataFrame) -> pd.Series:
+        # Product number (from 1, in order of first appearance) for each listing row; the
+        # listings need a title column, and sku and source columns are used when present
+        start = time.perf_counter()
+        token_sets = [title_tokens(title) for title in listings["title"]]
+        skus = [normalize_sku(sku) for sku in listings["sku"]] if "sku" in listings else [None] * len(listings)
+        sources = list(listings["source"]) if "source" in listings and self.one_per_source else [None] * len(listings)
+
+        sku_links = self.sku_pairs(skus)
+        title_links = self.candidate_pairs(token_sets)
+        parent = list(range(len(listings)))
+        members = [{source} if isinstance(source, str) else set() for source in sources]
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        merged = rejected = 0
+        for score, i, j in sorted(sku_links + title_links, key=lambda link: (-link[0], link[1], link[2])):
+            a, b = find(i), find(j)
+            if a == b:
+                continue
+            if score < SKU_SCORE and conflicting(token_sets[i], token_sets[j]):
+                rejected += 1
+                continue
+            if members[a] & members[b]:
+                rejected += 1
+                continue
+            a, b = min(a, b), max(a, b)
+            parent[b] = a
+            members[a] |= members[b]
+            merged += 1
+
+        numbers, product_no = {}, []
+        for i in range(len(listings)):
+            product_no.append(numbers.setdefault(find(i), len(numbers) + 1))
+        self.stats.update(
+            listings=len(listings),
+            products=len(numbers),
+            sku_links=len(sku_links),
+            title_links=len(title_links),
+            merged=merged,
+            rejected=rejected,
+            seconds=round(time.perf_counter() - start, 3),
+        )
+        return pd.Series(product_no, index=listings.index, name="product_no")
+
+    def metrics(self) -> dict:
+        return dict(self.stats)
@@ -0,0 +1,133 @@
+################### IMPORTS ######################
+
+import re
+import numpy as np
+import pandas as pd
+
+################### DISTINCT VALUES ######################
+
+def per_distinct(parse):
+    # Scraped columns repeat a few hundred distinct strings across every row: parse the
+    # distinct values once (as a column) and broadcast the result back by their codes
+    def wrapper(values: pd.Series):
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        parsed = parse(pd.Series(uniques, dtype=object)).take(codes)
+        parsed.index = values.index
+        return parsed
+    wrapper.__name__ = parse.__name__
+    wrapper.__doc__ = parse.__doc__
+    return wrapper
+
+################### PRICES ######################
+
+# Currency markers as the stores print them; a bare number is rupees
+CURRENCY_PATTERNS = [
+    ("INR", r"₹|\bRs\.?|\bINR\b"),
+    ("USD", r"\$|\bUSD\b"),
+    ("EUR", r"€|\bEUR\b"),
+]
+DEFAULT_CURRENCY = "INR"
+
+# "MRP" labels and thousands separators around the amount; the amount keeps its decimals
+PRICE_NOISE = re.compile(r"MRP|,", re.I)
+AMOUNT = r"(\d+(?:\.\d+)?)"
+
+
+@per_distinct
+def parse_prices(prices: pd.Series) -> pd.DataFrame:
+    # Whole-column parse into integer paise (cents) and an ISO currency; N/A, Error and blanks are <NA>
+    text = prices.where(prices.map(type) == str).astype("string")
+    amount = text.str.replace(PRICE_NOISE, "", regex=True).str.extract(AMOUNT, expand=False)
+    paise = (pd.to_numeric(amount, errors="coerce") * 100).round().astype("Int64")
+
+    currency = pd.Series(pd.NA, index=prices.index, dtype="string")
+    for code, pattern in reversed(CURRENCY_PATTERNS):
+        currency = currency.mask(text.str.contains(pattern, regex=True).fillna(False), code)
+    currency = currency.fillna(DEFAULT_CURRENCY).where(paise.notna())
+    return pd.DataFrame({"price_paise": paise, "currency": currency}, index=prices.index)
+
+
+def parse_price(price):
+    # parse_prices() for a single value; (None, None) when there is no amount
+    if not isinstance(price, str):
+        return None, None
+    match = re.search(AMOUNT, PRICE_NOISE.sub("", price))
+    if not match:
+        return None, None
+    currency = next((code for code, pattern in CURRENCY_PATTERNS if re.search(pattern, price)), DEFAULT_CURRENCY)
+    return round(float(match.group(1)) * 100), currency
+
+
+def price_values(prices: pd.Series) -> pd.Series:
+    # Rupees as floats for comparisons; prices without an amount, or in another currency (there are
+    # no exchange rates to convert them with), are inf so they never win a min()
+    parsed = parse_prices(prices)
+    rupees = parsed["price_paise"].astype("float64") / 100
+    return rupees.where(parsed["currency"] == DEFAULT_CURRENCY).fillna(np.inf)
+
+
+def display_prices(prices: pd.Series) -> pd.Series:
+    # The "Rs. " spelling the output CSVs use
+    return prices.astype(str).str.replace("₹", "Rs. ", regex=False)
+
+################### SIZES ######################
+
+# Men's sneaker chart (US / UK / EU) shared by the stores' size guides. US 6.5 and US 7 are both UK 6.
+SIZE_CHART = [
+    (3.5, 3, 35.5), (4, 3.5, 36), (4.5, 4, 36.5), (5, 4.5, 37.5), (5.5, 5, 38), (6, 5.5, 38.5),
+    (6.5, 6, 39), (7, 6, 40), (7.5, 6.5, 40.5), (8, 7, 41), (8.5, 7.5, 42), (9, 8, 42.5),
+    (9.5, 8.5, 43), (10, 9, 44), (10.5, 9.5, 44.5), (11, 10, 45), (11.5, 10.5, 45.5),
+    (12, 11, 46), (12.5, 11.5, 47), (13, 12, 47.5), (14, 13, 48.5), (15, 14, 49.5),
+]
+SIZE_TABLE = pd.DataFrame(SIZE_CHART, columns=["US", "UK", "EU"])
+
+# US or EU size -> UK size; UK sizes map to themselves
+TO_UK = {system: dict(zip(SIZE_TABLE[system].astype(float), SIZE_TABLE["UK"].astype(float))) for system in ("US", "EU")}
+# UK sizes exactly one US and one EU size convert to. UK 6 is not one: US 6.5 and US 7 (EU 39 and
+# EU 40) both convert to it, so those labels cannot be compared by their UK size.
+ONE_TO_ONE_UK = set(SIZE_TABLE["UK"][~SIZE_TABLE["UK"].duplicated(keep=False)].astype(float))
+
+SIZE_PATTERN = r"^(?P<system>UK|EU|US)\s*(?P<rest>.*)$"
+SIZE_NUMBER = r"^(\d+(?:\.\d+)?)"
+
+
+@per_distinct
+def canonical_sizes(sizes: pd.Series) -> pd.Series:
+    # "UK6", "uk  6" and "UK 6" all become "UK 6"; anything without a system prefix is only stripped.
+    # Non-string values (NaN) are left untouched.
+    is_text = sizes.map(type) == str
+    text = sizes.where(is_text).astype("string").str.strip()
+    parts = text.str.extract(SIZE_PATTERN, flags=re.I)
+    labelled = parts["system"].str.upper() + " " + parts["rest"]
+    canonical = labelled.fillna(text).astype(object)
+    return canonical.where(is_text, sizes)
+
+
+@per_distinct
+def normalize_sizes(sizes: pd.Series) -> pd.DataFrame:
+    # Canonical label, the system it was given in, and the UK size from SIZE_TABLE (<NA> when unknown)
+    canonical = canonical_sizes(sizes)
+    parts = canonical.where(canonical.map(type) == str).astype("string").str.extract(SIZE_PATTERN)
+    number = parts["rest"].str.extract(SIZE_NUMBER, expand=False)
+    number = pd.to_numeric(number, errors="coerce").astype("float64")
+
+    size_uk = number.where(parts["system"] == "UK")
+    for system, table in TO_UK.items():
+        size_uk = size_uk.fillna(number.where(parts["system"] == system).map(table))
+    return pd.DataFrame({
+        "size": canonical,
+        "size_system": parts["system"],
+        "size_uk": size_uk.astype("Float64"),
+    }, index=sizes.index)
+
+################### FRAMES ######################
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # Scraped rows with price_paise, currency, size_system and size_uk columns added
+    df = df.copy()
+    df[["price_paise", "currency"]] = parse_prices(df["price"])
+    sizes = normalize_sizes(df["size"])
+    df["size"] = sizes["size"]
+    df["size_system"] = sizes["size_system"]
+    df["size_uk"] = sizes["size_uk"]
+    return df
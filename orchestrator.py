@@ -0,0 +1,100 @@
+################### IMPORTS ######################
+
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+from site_spec import SITES
+
+################### DOMAIN LIMITS ######################
+
+# Maximum number of pages open at the same time on each store
+DOMAIN_LIMITS = {
+    "mainstreet": 1,
+    "crepdogcrew": 1,
+    "hypefly": 1,
+    "culture-circle": 1,
+}
+DEFAULT_DOMAIN_LIMIT = 1
+
+
+def domain_key(url: str) -> str:
+    # The site call_scraper dispatches the URL to (SITES.lookup, by host), falling back to the host name
+    site = SITES.lookup(url)
+    if site is not None:
+        return site.name
+    return urlparse(url).netloc.lower() or "unknown"
+
+################### CONCURRENT EXECUTOR ######################
+
+ScrapeTask = namedtuple("ScrapeTask", ["row", "column", "url"])
+TaskResult = namedtuple("TaskResult", ["task", "value", "error"])
+
+
+class ConcurrentScraper:
+    """Fans scrape tasks out over a worker pool while capping in-flight pages per domain."""
+
+    def __init__(self, scraper, max_workers=4, domain_limits=None, default_limit=DEFAULT_DOMAIN_LIMIT, limiter=None):
+        self.scraper = scraper
+        # An enabled rate_limiter.RateLimiter replaces the fixed caps with its adaptive ones
+        self.limiter = limiter
+        self.max_workers = max_workers
+        self.domain_limits = dict(DOMAIN_LIMITS if domain_limits is None else domain_limits)
+        self.default_limit = default_limit
+        self._lock = threading.Lock()
+        self.peak_in_flight = {}
+
+    def limit_for(self, domain: str) -> int:
+        if self.limiter is not None and self.limiter.enabled:
+            return self.limiter.limit_for(domain)
+        return max(1, self.domain_limits.get(domain, self.default_limit))
+
+    def _call(self, task):
+        try:
+            return TaskResult(task, self.scraper(task.url), None)
+        except Exception as e:
+            return TaskResult(task, None, e)
+
+    def run(self, tasks, on_result=None, keep_values=True) -> list:
+        # Results come back in the order the tasks were given, whatever order they finish in.
+        # With keep_values=False each value is dropped once on_result has seen it.
+        tasks = list(tasks)
+        pending = {}
+        for position, task in enumerate(tasks):
+            pending.setdefault(domain_key(task.url), deque()).append(position)
+
+        in_flight = {domain: 0 for domain in pending}
+        results = [None] * len(tasks)
+        futures = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or futures:
+                # Round-robin over domains that still have capacity
+                submitted = True
+                while submitted and len(futures) < self.max_workers:
+                    submitted = False
+                    for domain in list(pending):
+                        if len(futures) >= self.max_workers:
+                            break
+                        if in_flight[domain] >= self.limit_for(domain):
+                            continue
+                        position = pending[domain].popleft()
+                        if not pending[domain]:
+                            del pending[domain]
+                        in_flight[domain] += 1
+                        with self._lock:
+                            self.peak_in_flight[domain] = max(self.peak_in_flight.get(domain, 0), in_flight[domain])
+                        futures[executor.submit(self._call, tasks[position])] = (position, domain)
+                        submitted = True
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    position, domain = futures.pop(future)
+                    in_flight[domain] -= 1
+                    results[position] = future.result()
+                    if on_result is not None:
+                        on_result(results[position])
+                    if not keep_values:
+                        results[position] = results[position]._replace(value=None)
+
+        return results
@@ -0,0 +1,269 @@
+################### IMPORTS ######################
+
+import glob
+import hashlib
+import heapq
+import os
+import shutil
+import sqlite3
+import time
+import pandas as pd
+from catalog import PRODUCT_KEY, encode, materialize, referenced, split_rows
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+################### SETTINGS ######################
+
+RUN_DIR = ".scrape_run"
+# "parquet" and "arrow" (IPC) need pyarrow; "csv" parts work everywhere
+SINK_FORMAT = "parquet" if HAS_PYARROW else "csv"
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+DEFAULT_BATCH_SIZE = 20      # URLs buffered before a part file is written
+DEFAULT_CHUNK_ROWS = 50_000  # rows held in memory while reading the parts back
+
+# Position of the task in the link sheet; parts are merged back in this order
+TASK_COLUMN = "_task"
+TYPED_COLUMNS = {"price_paise": "Int64", "size_uk": "Float64"}
+
+# Every part is stored as a product table and a variant table (see catalog.py); a run directory
+# from a different layout is discarded on open()
+LAYOUT = "catalog"
+TABLES = ("products", "variants")
+
+################### OUTPUT SINK ######################
+
+class OutputSink:
+    """Appends scraped rows to columnar part files in batches and checkpoints the finished URLs,
+    so a crashed run can be resumed and its output read back in link-sheet order. Each part
+    holds a product table and a variant table, so a description is stored once per URL."""
+
+    def __init__(self, path=RUN_DIR, batch_size=DEFAULT_BATCH_SIZE, format=SINK_FORMAT):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown sink format: {format} (expected one of {tuple(FORMATS)})")
+        if format != "csv" and not HAS_PYARROW:
+            raise ImportError(f"The {format} sink format needs pyarrow")
+        self.path = path
+        self.batch_size = batch_size
+        self.format = format
+        self._buffer = []         # [(task index, url, DataFrame or None)]
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(self.path, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.path, "checkpoint.sqlite"))
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completed ("
+                " task INTEGER PRIMARY KEY, url TEXT, part TEXT, rows INTEGER, finished_at REAL)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS parts (name TEXT PRIMARY KEY, format TEXT, rows INTEGER)")
+        return self._db
+
+    ################### RESUME ######################
+
+    @staticmethod
+    def fingerprint(urls) -> str:
+        return hashlib.sha256("\n".join(urls).encode("utf-8")).hexdigest()
+
+    def open(self, urls) -> set:
+        # Starts or resumes a run over this task list; returns the URLs already finished.
+        # A different link sheet (or sink format) discards the previous run.
+        fingerprint = self.fingerprint(urls)
+        if os.path.exists(self.path):
+            db = self._connect()
+            stored = dict(db.execute("SELECT key, value FROM meta").fetchall())
+            if stored and (stored.get("fingerprint") != fingerprint or stored.get("format") != self.format
+                           or stored.get("layout") != LAYOUT):
+                print(f"[SINK] {self.path} belongs to a different run, starting over")
+                self.remove()
+        db = self._connect()
+        db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                       [("fingerprint", fingerprint), ("format", self.format), ("layout", LAYOUT)])
+        db.commit()
+        self._drop_orphans()
+        return {url for (url,) in db.execute("SELECT url FROM completed")}
+
+    def _drop_orphans(self):
+        # Part files written by a run that crashed before checkpointing them
+        known = {name for (name,) in self._connect().execute("SELECT name FROM parts")}
+        for path in glob.glob(os.path.join(self.path, "*part-*")):
+            if os.path.basename(path).split("-", 1)[-1] not in known:
+                os.remove(path)
+
+    ################### WRITING ######################
+
+    def append(self, task: int, url: str, df):
+        # df is None for URLs that produced nothing; they are still checkpointed
+        if df is not None:
+            df = df.copy()
+            df[TASK_COLUMN] = task
+        self._buffer.append((task, url, df))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        db = self._connect()
+        frames = [df for _, _, df in sorted(self._buffer, key=lambda item: item[0]) if df is not None and not df.empty]
+        name, rows = None, 0
+        if frames:
+            batch = pd.concat(frames, ignore_index=True)
+            rows = len(batch)
+            name = f"part-{time.time_ns()}{FORMATS[self.format]}"
+            for table, frame in zip(TABLES, split_rows(batch, TASK_COLUMN)):
+                tmp_path = os.path.join(self.path, f"tmp-{table}-{name}")
+                self._write(frame, tmp_path)
+                os.replace(tmp_path, os.path.join(self.path, f"{table}-{name}"))
+        # The part and its URLs are committed together; a crash before this leaves an orphan part
+        with db:
+            if name is not None:
+                db.execute("INSERT INTO parts VALUES (?, ?, ?)", (name, self.format, rows))
+            db.executemany(
+                "INSERT OR REPLACE INTO completed VALUES (?, ?, ?, ?, ?)",
+                [(task, url, name, 0 if df is None else len(df), time.time()) for task, url, df in self._buffer],
+            )
+        self._buffer = []
+
+    def _write(self, batch, path):
+        if self.format == "csv":
+            batch.to_csv(path, index=False)
+            return
+        table = pa.Table.from_pandas(batch, preserve_index=False)
+        if self.format == "parquet":
+            pq.write_table(table, path)
+        else:
+            with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    ################### READING ######################
+
+    def _parts(self) -> list:
+        return [name for (name,) in self._connect().execute("SELECT name FROM parts ORDER BY name")]
+
+    def _read_part(self, name, table, chunk_rows=DEFAULT_CHUNK_ROWS):
+        path = os.path.join(self.path, f"{table}-{name}")
+        if name.endswith(".csv"):
+            # Strings come back exactly as scraped ("N/A" stays "N/A"); typed columns are restored
+            for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows):
+                for column in (TASK_COLUMN, PRODUCT_KEY):
+                    chunk[column] = chunk[column].astype(int)
+                for column, dtype in TYPED_COLUMNS.items():
+                    if column in chunk:
+                        chunk[column] = pd.to_numeric(chunk[column].mask(chunk[column] == "")).astype(dtype)
+                yield chunk
+        elif name.endswith(".parquet"):
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+        else:
+            with pa.memory_map(path) as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    yield reader.get_batch(i).to_pandas()
+
+    def _task_groups(self, name):
+        # (task, part name, product rows, variant rows) in task order; each part is sorted by task.
+        # A part's products are one row per URL and are read whole; its variants a chunk at a time.
+        products = pd.concat(self._read_part(name, "products"), ignore_index=True)
+        by_task = dict(list(products.groupby(TASK_COLUMN, sort=False)))
+        for chunk in self._read_part(name, "variants"):
+            for task, rows in chunk.groupby(TASK_COLUMN, sort=False):
+                yield task, name, by_task.pop(task, None), rows
+
+    def iter_tables(self, chunk_rows=DEFAULT_CHUNK_ROWS):
+        # (products, variants) for every stored row in link-sheet order, about chunk_rows variants
+        # at a time. Parts are k-way merged, so only one chunk per part is held at a time.
+        def tables():
+            variant_table = encode(pd.concat(variants, ignore_index=True))
+            # A chunk can be all variants of a URL whose product row came with the chunk before
+            product_table = pd.concat(products, ignore_index=True) if products else variant_table[[TASK_COLUMN, PRODUCT_KEY]].iloc[:0]
+            return encode(product_table), variant_table
+
+        merged = heapq.merge(*(self._task_groups(name) for name in self._parts()), key=lambda group: group[0])
+        products, variants, size = [], [], 0
+        for _, _, product_rows, variant_rows in merged:
+            if product_rows is not None:
+                products.append(product_rows)
+            variants.append(variant_rows)
+            size += len(variant_rows)
+            if size >= chunk_rows:
+                yield tables()
+                products, variants, size = [], [], 0
+        if variants:
+            yield tables()
+
+    def iter_chunks(self, columns=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+        # iter_tables() materialized as flat rows. A URL whose variants straddle two chunks has
+        # its product row in the first, so it is carried along until none of its variants are left.
+        if columns is not None and TASK_COLUMN not in columns:
+            columns = list(columns) + [TASK_COLUMN]
+        carry = None
+        for products, variants in self.iter_tables(chunk_rows):
+            if carry is not None and not carry.empty:
+                products = encode(pd.concat([carry, products], ignore_index=True)) if len(products) else carry
+            chunk = materialize(products, variants, TASK_COLUMN)
+            carry = referenced(products, variants.tail(1), TASK_COLUMN)
+            yield chunk[columns] if columns is not None else chunk
+
+    def iter_numbered(self, number, column="product_no", chunk_rows=DEFAULT_CHUNK_ROWS):
+        # Flat rows grouped by product instead of link-sheet order, with the product's number in
+        # `column`. number maps the whole product table to a number per product row (see
+        # matching.ProductMatcher.match). The run's product and variant tables are held in memory
+        # (a fraction of the flat rows, see catalog.py) and materialized about chunk_rows at a
+        # time, never splitting a product.
+        tables = list(self.iter_tables(chunk_rows))
+        if not tables:
+            return
+        products = encode(pd.concat([products for products, _ in tables], ignore_index=True))
+        variants = encode(pd.concat([variants for _, variants in tables], ignore_index=True))
+        del tables
+        keys = [TASK_COLUMN, PRODUCT_KEY]
+        numbers = products[keys].assign(**{column: number(products).to_numpy()})
+        variants = variants.merge(numbers, on=keys, how="left", sort=False).sort_values(column, kind="stable")
+        variants = variants.reset_index(drop=True)
+        # Block boundaries at the first row of a product, about chunk_rows apart
+        starts = variants.index[variants[column] != variants[column].shift()]
+        bounds = [0]
+        for start in starts[1:]:
+            if start - bounds[-1] >= chunk_rows:
+                bounds.append(start)
+        for begin, end in zip(bounds, bounds[1:] + [len(variants)]):
+            block = variants.iloc[begin:end]
+            yield materialize(referenced(products, block, TASK_COLUMN), block, TASK_COLUMN)
+
+    def first_appearance(self, column: str) -> list:
+        # Distinct values of a column in the order they first appear in link-sheet order
+        first = {}
+        for products, variants in self.iter_tables():
+            for value in (products if column in products else variants)[column].unique():
+                first.setdefault(value, len(first))
+        return list(first)
+
+    ################### STATUS ######################
+
+    def metrics(self) -> dict:
+        db = self._connect()
+        tasks, rows = db.execute("SELECT COUNT(*), COALESCE(SUM(rows), 0) FROM completed").fetchone()
+        return {"completed_urls": tasks, "rows": rows, "parts": len(self._parts()), "format": self.format,
+                "buffered_urls": len(self._buffer)}
+
+    def close(self):
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def remove(self):
+        # The run finished and its CSVs are written: the next run starts from scratch
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+        self._buffer = []
+        shutil.rmtree(self.path, ignore_errors=True)
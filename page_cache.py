@@ -0,0 +1,206 @@
+################### IMPORTS ######################
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+################### SETTINGS ######################
+
+# off:     never read or write the cache
+# record:  always fetch, and store what was fetched
+# replay:  only read the cache, whatever its age; a miss is not fetched (offline runs)
+# refresh: read entries younger than the TTL, fetch and store the rest
+MODES = ("off", "record", "replay", "refresh")
+
+CACHE_DIR = ".page_cache"
+DEFAULT_TTL = 24 * 3600            # seconds before an entry is stale
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2  # compressed bytes kept before LRU eviction
+
+################### PAGE CACHE ######################
+
+class PageCache:
+    """Content-addressed store of scraped rows (per-size price snapshots), keyed by URL and variant."""
+
+    def __init__(self, path=CACHE_DIR, mode="off", ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode: {mode} (expected one of {MODES})")
+        self.path = path
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._db = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def reads(self) -> bool:
+        return self.mode in ("replay", "refresh")
+
+    @property
+    def writes(self) -> bool:
+        return self.mode in ("record", "refresh")
+
+    def _connect(self):
+        # Opened lazily so importing the module never touches the disk
+        if self._db is None:
+            os.makedirs(os.path.join(self.path, "blobs"), exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.path, "index.sqlite"), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, url TEXT, variant TEXT, digest TEXT,"
+                " size INTEGER, stored_at REAL, accessed_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (accessed_at)")
+        return self._db
+
+    @staticmethod
+    def key(url: str, variant: str) -> str:
+        return hashlib.sha256(f"{url}\n{variant}".encode("utf-8")).hexdigest()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.path, "blobs", digest[:2], digest[2:])
+
+    ################### RAW ENTRIES ######################
+
+    def get(self, url: str, variant: str = "html", max_age=None):
+        # Returns the cached text, or None on a miss or a stale entry
+        if not self.reads:
+            return None
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT digest, stored_at FROM entries WHERE key = ?", (self.key(url, variant),)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            digest, stored_at = row
+            max_age = self.ttl if max_age is None else max_age
+            if self.mode == "refresh" and time.time() - stored_at > max_age:
+                self.stats["stale"] += 1
+                return None
+            try:
+                with open(self._blob_path(digest), "rb") as f:
+                    content = zlib.decompress(f.read()).decode("utf-8")
+            except (OSError, zlib.error):
+                self.stats["misses"] += 1
+                return None
+            db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), self.key(url, variant)))
+            db.commit()
+            self.stats["hits"] += 1
+            return content
+
+    def put(self, url: str, content: str, variant: str = "html"):
+        if not self.writes or content is None:
+            return
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        compressed = zlib.compress(data, 6)
+        with self._lock:
+            db = self._connect()
+            blob_path = self._blob_path(digest)
+            # Identical content is stored once, whatever URL or variant it came from
+            if not os.path.exists(blob_path):
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                tmp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(compressed)
+                os.replace(tmp_path, blob_path)
+            now = time.time()
+            db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.key(url, variant), url, variant, digest, len(compressed), now, now),
+            )
+            db.commit()
+            self.stats["writes"] += 1
+            self._evict(db)
+
+    def _evict(self, db):
+        # Drop least recently used entries until the cache fits, then delete orphaned blobs
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, digest, size in db.execute("SELECT key, digest, size FROM entries ORDER BY accessed_at").fetchall():
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            if db.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+                total -= size
+            if total <= self.max_bytes:
+                break
+        db.commit()
+
+    ################### STRUCTURED ENTRIES ######################
+
+    def get_json(self, url: str, variant: str):
+        content = self.get(url, variant)
+        return json.loads(content) if content is not None else None
+
+    def put_json(self, url: str, value, variant: str):
+        self.put(url, json.dumps(value, ensure_ascii=False), variant)
+
+    def get_rows(self, url: str):
+        # Scraped rows for a URL: one record per size with its price snapshot
+        records = self.get_json(url, "rows")
+        return pd.DataFrame(records) if records is not None else None
+
+    def put_rows(self, url: str, df):
+        # Failed scrapes (an "Error" title or price on any row) are not cached, so the next
+        # lookup fetches the page again instead of replaying the failure for the whole TTL
+        if df is None or any(column in df and df[column].eq("Error").any() for column in ("title", "price")):
+            return
+        self.put_json(url, df.to_dict(orient="records"), "rows")
+
+    def cached_scrape(self, url: str, scraper):
+        # Scrape through the cache; in replay mode a miss returns None instead of going online
+        if not self.enabled:
+            return scraper(url)
+        df = self.get_rows(url)
+        if df is not None:
+            return df
+        if self.mode == "replay":
+            print(f"[CACHE] No cached copy of {url} in replay mode, skipping")
+            return None
+        df = scraper(url)
+        self.put_rows(url, df)
+        return df
+
+    async def cached_scrape_async(self, url: str, scraper):
+        # cached_scrape() for coroutine scrapers (DevTools tab mode)
+        if not self.enabled:
+            return await scraper(url)
+        df = self.get_rows(url)
+        if df is not None:
+            return df
+        if self.mode == "replay":
+            print(f"[CACHE] No cached copy of {url} in replay mode, skipping")
+            return None
+        df = await scraper(url)
+        self.put_rows(url, df)
+        return df
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(self.stats, mode=self.mode)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+PAGE_CACHE = PageCache(mode=os.environ.get("PAGE_CACHE_MODE", "off"))
@@ -0,0 +1,209 @@
+################### IMPORTS ######################
+
+import logging
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Time one full page_source parse per product so the report can show what the targeted reads replaced
+PROFILE_PRICE_READS = False
+
+################### IN-PAGE SCRIPTS ######################
+
+# textOf() matches BeautifulSoup: stripText=true is get_text(strip=True), false is .text.strip()
+TEXT_HELPERS = """
+function textOf(el, stripText) {
+    if (!stripText) { return el.textContent.trim(); }
+    var parts = [], walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT), node;
+    while ((node = walker.nextNode())) {
+        var text = node.nodeValue.trim();
+        if (text) { parts.push(text); }
+    }
+    return parts.join('');
+}
+function readPrice(selectors, stripText) {
+    for (var i = 0; i < selectors.length; i++) {
+        var el = document.querySelector(selectors[i]);
+        if (el) { return textOf(el, stripText); }
+    }
+    return null;
+}
+"""
+
+# Counts the page's fetch and XHR requests (installed once per document), so a step can tell
+# whether the variant switch went to the network and whether that request has come back
+NETWORK_HELPERS = """
+if (window.__priceReaderNet === undefined) {
+    var net = window.__priceReaderNet = {inflight: 0, started: 0, lastEnd: performance.now()};
+    var done = function () { net.inflight -= 1; net.lastEnd = performance.now(); };
+    if (window.fetch) {
+        var pageFetch = window.fetch;
+        window.fetch = function () {
+            net.inflight += 1;
+            net.started += 1;
+            return pageFetch.apply(this, arguments).finally(done);
+        };
+    }
+    var pageSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        net.inflight += 1;
+        net.started += 1;
+        this.addEventListener('loadend', done);
+        return pageSend.apply(this, arguments);
+    };
+}
+var net = window.__priceReaderNet;
+"""
+
+# Walks every variant inside the page and calls back with {target: price}. Each step waits for
+# the price text to change. An unchanged price (sizes that share one) is only accepted once the
+# DOM and the network have been quiet for settleMs, and either a request the switch started has
+# come back or unchangedMs have passed, so a slow variant fetch is not read as the previous price.
+BATCH_PRICE_SCRIPT = TEXT_HELPERS + NETWORK_HELPERS + """
+var mode = arguments[0], selectCss = arguments[1], targets = arguments[2], selectors = arguments[3],
+    stripText = arguments[4], settleMs = arguments[5], stepTimeoutMs = arguments[6], unchangedMs = arguments[7],
+    callback = arguments[arguments.length - 1];
+var results = {}, index = 0;
+
+function step() {
+    if (index >= targets.length) { callback(results); return; }
+    var target = targets[index], before = readPrice(selectors, stripText);
+    var started = performance.now(), lastMutation = started, requestsBefore = net.started;
+    var observer = new MutationObserver(function () { lastMutation = performance.now(); });
+    observer.observe(document.body, {subtree: true, childList: true, characterData: true, attributes: true});
+
+    function finish(price) {
+        observer.disconnect();
+        results[target] = price;
+        index += 1;
+        step();
+    }
+
+    try {
+        if (mode === 'select') {
+            var select = document.querySelector(selectCss);
+            select.value = target;
+            select.dispatchEvent(new Event('change', {bubbles: true}));
+        } else {
+            document.getElementById(target).click();
+        }
+    } catch (e) {
+        finish(null);
+        return;
+    }
+
+    (function poll() {
+        var now = performance.now(), price = readPrice(selectors, stripText);
+        var changed = price && price !== before && now - lastMutation >= 50;
+        var quiet = net.inflight === 0 && now - lastMutation >= settleMs && now - net.lastEnd >= settleMs;
+        var answered = net.started > requestsBefore || now - started >= unchangedMs;
+        if (changed || (quiet && answered) || now - started >= stepTimeoutMs) {
+            finish(price);
+        } else {
+            setTimeout(poll, 25);
+        }
+    })();
+}
+
+step();
+"""
+
+################### PRICE READS ######################
+
+# A variant whose price text did not change is read after at least this long, unless the page
+# fetched something for the switch and went quiet again (the fixed wait the scrapers used to take)
+UNCHANGED_PRICE_MS = 3000
+
+
+def read_variant_prices(driver, mode, targets, selectors, select_css=None, strip_text=True,
+                        settle_ms=400, step_timeout_ms=8000, unchanged_ms=UNCHANGED_PRICE_MS):
+    # One in-page call for every variant. mode is "select" (targets are <option> values
+    # of select_css) or "click" (targets are element ids). Returns None if the batch fails.
+    if not targets:
+        return {}
+    driver.set_script_timeout(len(targets) * step_timeout_ms / 1000 + 5)
+    try:
+        results = driver.execute_async_script(
+            BATCH_PRICE_SCRIPT, mode, select_css, list(targets), list(selectors), strip_text, settle_ms, step_timeout_ms,
+            unchanged_ms,
+        )
+    except Exception as e:
+        logger.warning("Batched price read failed (%s), reading variants one by one", e)
+        return None
+    if not results:
+        return None
+    # Variants the page could not switch to come back as None for the caller to retry
+    return {target: results.get(target) for target in targets}
+
+
+async def read_tab_variant_prices(tab, mode, targets, selectors, select_css=None, strip_text=True,
+                                  settle_ms=400, step_timeout_ms=8000, unchanged_ms=UNCHANGED_PRICE_MS):
+    # read_variant_prices() for a DevTools tab (devtools.Tab)
+    if not targets:
+        return {}
+    try:
+        results = await tab.execute_async_script(
+            BATCH_PRICE_SCRIPT, mode, select_css, list(targets), list(selectors), strip_text, settle_ms, step_timeout_ms,
+            unchanged_ms, timeout=len(targets) * step_timeout_ms / 1000 + 5,
+        )
+    except Exception as e:
+        logger.warning("Batched price read failed in tab (%s)", e)
+        return None
+    if not results:
+        return None
+    return {target: results.get(target) for target in targets}
+
+################### PER-PRODUCT REPORT ######################
+
+class PriceReadReport:
+    """CPU and memory spent on price reads for one product, against the full-parse approach."""
+
+    def __init__(self, driver, url, profile=None):
+        self.url = url
+        self.reads = 0
+        self.batched = False
+        self.cpu_ms = 0.0
+        self.full_parse_cpu_ms = None
+        self.full_parse_peak_kb = None
+        self.page_kb = None
+        if PROFILE_PRICE_READS if profile is None else profile:
+            self._measure_full_parse(driver)
+
+    def _measure_full_parse(self, driver):
+        # What every size used to cost: serialize the DOM and parse all of it
+        tracemalloc.start()
+        start = time.process_time()
+        source = driver.page_source
+        BeautifulSoup(source, 'html.parser')
+        self.full_parse_cpu_ms = (time.process_time() - start) * 1000
+        self.full_parse_peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+        self.page_kb = len(source.encode("utf-8")) / 1024
+
+    def timed(self, function, *args, reads=1, **kwargs):
+        start = time.process_time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.cpu_ms += (time.process_time() - start) * 1000
+            self.reads += reads
+
+    def summary(self) -> dict:
+        summary = {
+            "url": self.url,
+            "reads": self.reads,
+            "batched": self.batched,
+            "cpu_ms": round(self.cpu_ms, 2),
+        }
+        if self.full_parse_cpu_ms is not None:
+            summary.update({
+                "replaced_parse_cpu_ms": round(self.full_parse_cpu_ms * self.reads, 2),
+                "replaced_parse_peak_kb": round(self.full_parse_peak_kb, 1),
+                "page_kb_not_serialized": round(self.page_kb * self.reads, 1),
+            })
+        return summary
+
+    def log(self):
+        logger.info("price reads %s", self.summary())
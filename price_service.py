@@ -0,0 +1,353 @@
+################### IMPORTS ######################
+
+import argparse
+import functools
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlparse
+import pandas as pd
+from matching import normalize_sku
+from normalize import SIZE_NUMBER, SIZE_PATTERN, TO_UK, normalize_frame
+
+logger = logging.getLogger(__name__)
+
+################### SETTINGS ######################
+
+SNAPSHOT_DIR = "price_snapshots"
+LATEST_FILE = "LATEST"            # names the newest published snapshot; replaced atomically
+HISTORY_SNAPSHOTS = 30            # snapshots kept on disk and read back for price history
+WATCH_INTERVAL = 2.0              # seconds between checks for a newer snapshot
+PRICE_SERVICE_PORT = os.environ.get("PRICE_SERVICE_PORT")
+
+# Columns of a snapshot: one row per scraped (product, size, seller) offer
+SNAPSHOT_COLUMNS = ["product_no", "title", "sku", "url", "source", "size", "size_uk", "price", "price_paise", "currency"]
+
+SIZE_LABEL = re.compile(SIZE_PATTERN, re.I)
+SIZE_AMOUNT = re.compile(SIZE_NUMBER)
+
+################### SIZES ######################
+
+@functools.lru_cache(maxsize=4096)
+def size_key(size):
+    # The UK size as a float when the label has a known system ("UK 9", "US 10", "EU 44" -> 9.0);
+    # a bare number is read as UK, as the stores list them; any other label is kept as text
+    if size is None or (isinstance(size, float) and size != size):
+        return None
+    text = str(size).strip()
+    match = SIZE_LABEL.match(text)
+    system, rest = (match.group("system").upper(), match.group("rest")) if match else ("UK", text)
+    number = SIZE_AMOUNT.match(rest.strip())
+    if number is None:
+        return text.upper() or None
+    value = float(number.group(1))
+    return value if system == "UK" else TO_UK[system].get(value, text.upper())
+
+################### SNAPSHOTS ######################
+
+class SnapshotWriter:
+    """Writes one run's offers as a snapshot file, a block at a time, and publishes it when the
+    run's outputs are complete. Until then readers keep seeing the previous snapshot."""
+
+    def __init__(self, directory=SNAPSHOT_DIR, name=None):
+        # name defaults to the UTC time, so names sort oldest first
+        self.directory = directory
+        now = time.time()
+        self.name = name or time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f".{int(now % 1 * 1e6):06d}"
+        self.rows = 0
+        os.makedirs(directory, exist_ok=True)
+        self._tmp = os.path.join(directory, self.name + ".csv.tmp")
+
+    def append(self, block: pd.DataFrame):
+        # Rows numbered by product_no (a DATA_ANALYSIS_2 block); sizes and prices are normalized again
+        offers = normalize_frame(block[[column for column in ("product_no", "title", "sku", "url", "source", "size", "price") if column in block]])
+        offers = offers.reindex(columns=SNAPSHOT_COLUMNS)
+        offers.to_csv(self._tmp, index=False, mode="a" if self.rows else "w", header=not self.rows)
+        self.rows += len(offers)
+
+    def publish(self) -> str:
+        # Moves the snapshot into place, then points LATEST at it; both steps are atomic renames
+        if not self.rows:
+            self.discard()
+            return None
+        path = os.path.join(self.directory, self.name + ".csv")
+        os.replace(self._tmp, path)
+        latest_tmp = os.path.join(self.directory, LATEST_FILE + ".tmp")
+        with open(latest_tmp, "w") as f:
+            f.write(self.name)
+        os.replace(latest_tmp, os.path.join(self.directory, LATEST_FILE))
+        for old in snapshot_names(self.directory)[:-HISTORY_SNAPSHOTS]:
+            os.remove(os.path.join(self.directory, old + ".csv"))
+        return path
+
+    def discard(self):
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+
+def snapshot_names(directory) -> list:
+    # Published snapshots, oldest first (names start with their UTC time)
+    return sorted(os.path.basename(path)[:-len(".csv")] for path in glob.glob(os.path.join(directory, "*.csv")))
+
+
+def latest_snapshot(directory):
+    try:
+        with open(os.path.join(directory, LATEST_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_snapshot(directory, name) -> pd.DataFrame:
+    return pd.read_csv(os.path.join(directory, name + ".csv"), keep_default_na=False, na_values={"price_paise": [""], "size_uk": [""]})
+
+################### INDEX ######################
+
+class Offer(NamedTuple):
+    source: str
+    price: str
+    price_paise: int
+    currency: str
+    size: str
+    url: str
+
+
+class Product(NamedTuple):
+    product_no: int
+    title: str
+    sku: str
+    urls: tuple
+
+
+class PriceIndex:
+    """One snapshot's offers keyed by (product_no, size key), cheapest first, with every URL's
+    price per snapshot carried over from the index before it. Never changed once built: a new
+    snapshot gets a new index, so readers need no locks."""
+
+    def __init__(self, offers: pd.DataFrame, snapshot: str, previous=None):
+        self.snapshot = snapshot
+        self.built_at = time.time()
+        grouped, titles, skus, product_skus, urls, normalized = {}, {}, {}, {}, {}, {}
+        history = dict(previous.history) if previous is not None else {}
+        for row in offers.itertuples(index=False):
+            product_no = int(row.product_no)
+            key = size_key(row.size)
+            titles.setdefault(product_no, row.title)
+            sku = normalized[row.sku] if row.sku in normalized else normalized.setdefault(row.sku, normalize_sku(row.sku))
+            if sku is not None:
+                skus.setdefault(sku, product_no)
+                product_skus.setdefault(product_no, row.sku)
+            urls.setdefault(product_no, {})[row.url] = None
+            if key is None or row.price_paise != row.price_paise:  # no size, or a price without an amount
+                continue
+            offer = Offer(row.source, row.price, int(row.price_paise), row.currency, row.size, row.url)
+            grouped.setdefault((product_no, key), []).append(offer)
+            past = history.get((row.url, key), ())
+            if not past or past[-1][0] != snapshot:
+                history[(row.url, key)] = (past + ((snapshot, offer.price_paise),))[-HISTORY_SNAPSHOTS:]
+        self.offers = {key: tuple(sorted(group, key=lambda offer: (offer.price_paise, offer.source))) for key, group in grouped.items()}
+        self.products = {product_no: Product(product_no, title, product_skus.get(product_no), tuple(urls[product_no]))
+                         for product_no, title in titles.items()}
+        self.by_sku = skus
+        self.by_url = {url: product_no for product_no, product_urls in urls.items() for url in product_urls}
+        self.history = history
+        self.sizes = {}
+        for product_no, key in self.offers:
+            self.sizes.setdefault(product_no, []).append(key)
+
+    def resolve(self, product):
+        # product_no for a product number, SKU or product URL, or None
+        if isinstance(product, int) or (isinstance(product, str) and product.isdigit()):
+            product_no = int(product)
+            return product_no if product_no in self.products else None
+        if product in self.by_url:
+            return self.by_url[product]
+        sku = normalize_sku(product)
+        return self.by_sku.get(sku) if sku is not None else None
+
+    def prices(self, product, size) -> tuple:
+        # Every seller's offer for the size, cheapest first
+        product_no = self.resolve(product)
+        if product_no is None:
+            return ()
+        return self.offers.get((product_no, size_key(size)), ())
+
+    def best(self, product, size):
+        offers = self.prices(product, size)
+        return offers[0] if offers else None
+
+    def price_history(self, product, size, source=None) -> dict:
+        # {seller: ((snapshot, price_paise), ...)} for the sellers listing the size now
+        key = size_key(size)
+        return {offer.source: self.history.get((offer.url, key), ())
+                for offer in self.prices(product, size) if source is None or offer.source == source}
+
+
+class PriceService:
+    """The latest published snapshot as a PriceIndex. load() builds a newer snapshot's index off
+    to the side and swaps it in with one reference assignment; a query reads the reference once,
+    so it sees the old snapshot or the new one, never a mix."""
+
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+        self._index = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.stats = {"swaps": 0, "load_s": 0.0, "queries": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def index(self) -> PriceIndex:
+        index = self._index
+        if index is None:
+            raise LookupError(f"no price snapshot published in {self.directory}")
+        return index
+
+    def load(self) -> bool:
+        # Swaps in the snapshot LATEST names, if it is newer than the one served; True if it was
+        with self._load_lock:
+            name = latest_snapshot(self.directory)
+            current = self._index
+            if name is None or (current is not None and current.snapshot == name):
+                return False
+            start = time.perf_counter()
+            if current is None:
+                # First load: the price history comes from the older snapshots still on disk
+                names = snapshot_names(self.directory)
+                older = [older for older in names if older < name][-(HISTORY_SNAPSHOTS - 1):]
+                for older in older:
+                    current = PriceIndex(read_snapshot(self.directory, older), older, current)
+            index = PriceIndex(read_snapshot(self.directory, name), name, current)
+            self._index = index
+            self.stats["swaps"] += 1
+            self.stats["load_s"] = round(time.perf_counter() - start, 3)
+            logger.info("Serving price snapshot %s (%d product sizes)", name, len(index.offers))
+            return True
+
+    def watch(self, interval=WATCH_INTERVAL) -> threading.Thread:
+        # Polls LATEST in the background and swaps in every newly published snapshot
+        def poll():
+            while not self._stop.wait(interval):
+                try:
+                    self.load()
+                except Exception:
+                    logger.exception("Loading price snapshot failed; still serving %s",
+                                     self._index.snapshot if self._index else "nothing")
+        thread = threading.Thread(target=poll, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+    ################### QUERIES ######################
+
+    def best(self, product, size):
+        self._count()
+        return self.index.best(product, size)
+
+    def prices(self, product, size) -> tuple:
+        self._count()
+        return self.index.prices(product, size)
+
+    def price_history(self, product, size, source=None) -> dict:
+        self._count()
+        return self.index.price_history(product, size, source)
+
+    def product(self, product):
+        index = self.index
+        product_no = index.resolve(product)
+        return index.products.get(product_no) if product_no is not None else None
+
+    def _count(self):
+        with self._stats_lock:
+            self.stats["queries"] += 1
+
+    def metrics(self) -> dict:
+        index = self._index
+        return dict(self.stats, snapshot=index.snapshot if index else None,
+                    products=len(index.products) if index else 0, product_sizes=len(index.offers) if index else 0)
+
+################### HTTP ######################
+
+def start_price_server(service, port: int, host="127.0.0.1"):
+    # JSON over HTTP: /best, /prices and /history take ?product=<number, SKU or URL>&size=<"UK 9">
+    # (and /history an optional &source=); /status reports the snapshot being served
+    class PriceHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive
+        disable_nagle_algorithm = True  # headers and body go out at once, not 40ms apart
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {name: values[0] for name, values in parse_qs(url.query).items()}
+            try:
+                status, body = 200, self.answer(url.path.rstrip("/"), query)
+            except LookupError as e:
+                status, body = 503, {"error": str(e)}
+            except KeyError as e:
+                status, body = 400, {"error": f"missing parameter {e}"}
+            if body is None:
+                status, body = 404, {"error": "not found"}
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def answer(self, path, query):
+            if path == "/status":
+                return service.metrics()
+            if path not in ("/best", "/prices", "/history"):
+                return None
+            # Counted like the service's own query methods, but read from one snapshot for the whole answer
+            service._count()
+            index = service.index
+            if path == "/best":
+                offer = index.best(query["product"], query["size"])
+                return {"snapshot": index.snapshot, "offer": offer._asdict() if offer else None}
+            if path == "/prices":
+                offers = index.prices(query["product"], query["size"])
+                return {"snapshot": index.snapshot, "offers": [offer._asdict() for offer in offers]}
+            if path == "/history":
+                history = index.price_history(query["product"], query["size"], query.get("source"))
+                return {"snapshot": index.snapshot,
+                        "history": {source: [{"snapshot": name, "price_paise": paise} for name, paise in points]
+                                    for source, points in history.items()}}
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), PriceHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve(directory=SNAPSHOT_DIR, port=None, host="127.0.0.1"):
+    # Serves the latest snapshot until interrupted, swapping in each one a run publishes
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    service = PriceService(directory)
+    service.load()
+    service.watch()
+    server = start_price_server(service, int(port or PRICE_SERVICE_PORT or 8765), host)
+    print(f"Serving best prices from {directory} on http://{host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        service.stop()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--port", type=int)
+    args = parser.parse_args()
+    serve(args.dir, args.port)
@@ -0,0 +1,332 @@
+################### IMPORTS ######################
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from orchestrator import DEFAULT_DOMAIN_LIMIT, DOMAIN_LIMITS, domain_key
+
+logger = logging.getLogger(__name__)
+
+################### SETTINGS ######################
+
+# Requests per second each store gets to start with; the limiter moves between MIN_RATE and the
+# store's MAX_RATES entry as it sees how the store responds
+DOMAIN_RATES = {
+    "mainstreet": 1.0,
+    "crepdogcrew": 1.0,
+    "hypefly": 0.5,          # the one store that already fights automation
+    "culture-circle": 0.5,
+}
+DEFAULT_RATE = 1.0
+MAX_RATES = {"mainstreet": 4.0, "crepdogcrew": 4.0, "hypefly": 1.0, "culture-circle": 2.0}
+DEFAULT_MAX_RATE = 2.0
+MIN_RATE = 0.05
+BURST = 2                    # tokens a quiet domain can save up
+
+# Pages open at once per store, between 1 and MAX_CONCURRENCY; starts at orchestrator.DOMAIN_LIMITS
+MAX_CONCURRENCY = 4
+SUCCESSES_PER_STEP = 20      # healthy responses in a row before concurrency goes up by one
+
+# Latency above this (seconds, smoothed) counts as the store struggling
+TARGET_LATENCY = 8.0
+LATENCY_SMOOTHING = 0.2
+
+# Backoff after a 429/403 or a challenge page, doubling with each one in a row
+PENALTY_BASE = 30.0
+PENALTY_MAX = 600.0
+
+# Interstitials bot defenses serve in place of the page
+# (Cloudflare's challenge-platform script also runs on normal pages, so only challenge markup counts)
+CHALLENGE_MARKERS = re.compile(
+    r"just a moment\.\.\.|attention required! \| cloudflare|cf_chl_opt|verify you are human"
+    r"|px-captcha|captcha-delivery",
+    re.I,
+)
+BLOCKED_STATUSES = (403, 429)
+
+# Title and HTTP status of the page a browser just navigated to (Navigation Timing level 2)
+PAGE_STATUS_SCRIPT = (
+    "var entry = performance.getEntriesByType('navigation')[0] || {};"
+    "return [document.title, entry.responseStatus || null];"
+)
+
+################### ERRORS ######################
+
+class Blocked(Exception):
+    """The store answered with a rate limit, a refusal or a challenge page."""
+
+    def __init__(self, domain, status=None, reason=None):
+        self.domain = domain
+        self.status = status
+        self.reason = reason or (f"HTTP {status}" if status else "challenge page")
+        super().__init__(f"{domain} blocked the request: {self.reason}")
+
+
+def is_challenge(text) -> bool:
+    return bool(text) and CHALLENGE_MARKERS.search(text[:20000]) is not None
+
+################### DOMAIN STATE ######################
+
+class DomainState:
+    __slots__ = ("rate", "max_rate", "tokens", "refilled_at", "concurrency", "in_flight", "latency",
+                 "streak", "strikes", "penalty_until", "first_at", "last_at", "stats")
+
+    def __init__(self, rate, max_rate, concurrency):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.tokens = 1.0
+        self.refilled_at = time.monotonic()
+        self.concurrency = concurrency
+        self.in_flight = 0            # pages open through page_async()
+        self.latency = None           # smoothed seconds per request
+        self.streak = 0               # healthy responses since the last adjustment
+        self.strikes = 0              # blocks in a row, for the penalty
+        self.penalty_until = 0.0
+        self.first_at = None
+        self.last_at = None
+        self.stats = {"requests": 0, "throttled": 0, "forbidden": 0, "challenges": 0,
+                      "slow": 0, "backoffs": 0, "waited_s": 0.0}
+
+    def refill(self, now):
+        self.tokens = min(BURST, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+
+class Request:
+    """What one request through the limiter saw; observe() raises Blocked for 429/403 and challenges."""
+
+    __slots__ = ("domain", "status", "challenge", "retry_after")
+
+    def __init__(self, domain):
+        self.domain = domain
+        self.status = None
+        self.challenge = False
+        self.retry_after = None
+
+    def observe(self, status=None, text=None, retry_after=None):
+        self.status = status
+        self.challenge = is_challenge(text)
+        try:
+            self.retry_after = float(retry_after) if retry_after is not None else None
+        except ValueError:
+            self.retry_after = None  # an HTTP date; the penalty applies instead
+        if status in BLOCKED_STATUSES:
+            raise Blocked(self.domain, status)
+        if self.challenge:
+            raise Blocked(self.domain, status, "challenge page")
+
+################### RATE LIMITER ######################
+
+class RateLimiter:
+    """Token bucket per store with AIMD on rate and concurrency. One lock guards the state,
+    so worker threads and asyncio tasks can share it: threads sleep, coroutines await."""
+
+    def __init__(self, rates=None, max_rates=None, enabled=True):
+        self.rates = dict(DOMAIN_RATES if rates is None else rates)
+        self.max_rates = dict(MAX_RATES if max_rates is None else max_rates)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._domains = {}
+
+    def _state(self, domain) -> DomainState:
+        state = self._domains.get(domain)
+        if state is None:
+            rate = self.rates.get(domain, DEFAULT_RATE)
+            concurrency = DOMAIN_LIMITS.get(domain, DEFAULT_DOMAIN_LIMIT)
+            state = self._domains[domain] = DomainState(rate, max(rate, self.max_rates.get(domain, DEFAULT_MAX_RATE)), concurrency)
+        return state
+
+    def limit_for(self, domain: str) -> int:
+        # Current page concurrency for the domain, for schedulers that keep their own in-flight count
+        with self._lock:
+            return self._state(domain).concurrency
+
+    ################### ADMISSION ######################
+
+    def _reserve(self, domain, page=False) -> float:
+        # Takes a token (or a page slot) and returns 0, or returns how long to wait before asking again
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(domain)
+            if state.penalty_until > now:
+                return state.penalty_until - now
+            if page:
+                if state.in_flight >= state.concurrency:
+                    return 0.05
+                state.in_flight += 1
+                return 0.0
+            state.refill(now)
+            if state.tokens >= 1:
+                state.tokens -= 1
+                return 0.0
+            return (1 - state.tokens) / state.rate
+
+    def _waited(self, domain, seconds):
+        with self._lock:
+            self._state(domain).stats["waited_s"] += seconds
+
+    def acquire(self, domain):
+        waited = 0.0
+        while self.enabled:
+            delay = self._reserve(domain)
+            if not delay:
+                break
+            time.sleep(delay)
+            waited += delay
+        if waited:
+            self._waited(domain, waited)
+
+    async def acquire_async(self, domain):
+        waited = 0.0
+        while self.enabled:
+            delay = self._reserve(domain)
+            if not delay:
+                break
+            await asyncio.sleep(delay)
+            waited += delay
+        if waited:
+            self._waited(domain, waited)
+
+    ################### FEEDBACK ######################
+
+    def record(self, domain, latency, request=None, error=None):
+        # Adjusts the domain after a request: halve on blocks, ease off when slow, creep up when healthy
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(domain)
+            stats = state.stats
+            stats["requests"] += 1
+            state.first_at = state.first_at if state.first_at is not None else now - latency
+            state.last_at = now
+            state.latency = latency if state.latency is None else \
+                (1 - LATENCY_SMOOTHING) * state.latency + LATENCY_SMOOTHING * latency
+
+            if isinstance(error, Blocked):
+                if error.status == 429:
+                    stats["throttled"] += 1
+                elif error.status == 403:
+                    stats["forbidden"] += 1
+                else:
+                    stats["challenges"] += 1
+                stats["backoffs"] += 1
+                state.strikes += 1
+                state.streak = 0
+                state.rate = max(MIN_RATE, state.rate / 2)
+                state.concurrency = max(1, state.concurrency // 2)
+                penalty = min(PENALTY_MAX, PENALTY_BASE * 2 ** (state.strikes - 1))
+                if request is not None and request.retry_after:
+                    penalty = max(penalty, min(PENALTY_MAX, request.retry_after))
+                state.penalty_until = now + penalty
+                state.tokens = 0.0
+                logger.warning("%s: %s, backing off %.1fs at %.2f req/s", domain, error.reason, penalty, state.rate)
+                return
+            if error is not None:
+                return  # network errors and parse failures say nothing about politeness
+
+            state.strikes = 0
+            if state.latency > TARGET_LATENCY:
+                stats["slow"] += 1
+                state.streak = 0
+                state.rate = max(MIN_RATE, state.rate * 0.8)
+                state.concurrency = max(1, state.concurrency - 1)
+                return
+            state.rate = min(state.max_rate, state.rate + 0.05)
+            state.streak += 1
+            if state.streak >= SUCCESSES_PER_STEP:
+                state.streak = 0
+                state.concurrency = min(MAX_CONCURRENCY, state.concurrency + 1)
+
+    ################### CONTEXT MANAGERS ######################
+
+    @contextmanager
+    def request(self, url: str):
+        # One polite request: waits for a token, times it and feeds the outcome back
+        domain = domain_key(url)
+        self.acquire(domain)
+        request = Request(domain)
+        start = time.monotonic()
+        try:
+            yield request
+        except Exception as e:
+            if self.enabled:
+                self.record(domain, time.monotonic() - start, request, e)
+            raise
+        if self.enabled:
+            self.record(domain, time.monotonic() - start, request)
+
+    @asynccontextmanager
+    async def request_async(self, url: str):
+        domain = domain_key(url)
+        await self.acquire_async(domain)
+        request = Request(domain)
+        start = time.monotonic()
+        try:
+            yield request
+        except Exception as e:
+            if self.enabled:
+                self.record(domain, time.monotonic() - start, request, e)
+            raise
+        if self.enabled:
+            self.record(domain, time.monotonic() - start, request)
+
+    @asynccontextmanager
+    async def page_async(self, url: str):
+        # Holds one of the domain's page slots; the thread pool gets the same cap from limit_for()
+        domain = domain_key(url)
+        while self.enabled:
+            delay = self._reserve(domain, page=True)
+            if not delay:
+                break
+            await asyncio.sleep(delay)
+        try:
+            yield
+        finally:
+            if self.enabled:
+                with self._lock:
+                    self._state(domain).in_flight -= 1
+
+    ################### METRICS ######################
+
+    def metrics(self) -> dict:
+        with self._lock:
+            report = {}
+            for domain, state in sorted(self._domains.items()):
+                elapsed = (state.last_at - state.first_at) if state.first_at is not None else 0.0
+                report[domain] = dict(
+                    state.stats,
+                    waited_s=round(state.stats["waited_s"], 2),
+                    achieved_rps=round(state.stats["requests"] / elapsed, 3) if elapsed > 0 else None,
+                    rate_rps=round(state.rate, 3),
+                    concurrency=state.concurrency,
+                    latency_s=round(state.latency, 2) if state.latency is not None else None,
+                )
+            return report
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP scraper_domain_requests_total Requests sent per domain, by outcome",
+            "# TYPE scraper_domain_requests_total counter",
+        ]
+        gauges = []
+        for domain, metrics in self.metrics().items():
+            lines.append(f'scraper_domain_requests_total{{domain="{domain}",outcome="all"}} {metrics["requests"]}')
+            for outcome in ("throttled", "forbidden", "challenges", "slow"):
+                lines.append(f'scraper_domain_requests_total{{domain="{domain}",outcome="{outcome}"}} {metrics[outcome]}')
+            gauges.append((domain, metrics))
+        lines += ["# HELP scraper_domain_backoffs_total Backoffs after a block or challenge",
+                  "# TYPE scraper_domain_backoffs_total counter"]
+        lines += [f'scraper_domain_backoffs_total{{domain="{domain}"}} {metrics["backoffs"]}' for domain, metrics in gauges]
+        for name, key, help_text in (
+            ("scraper_domain_achieved_rps", "achieved_rps", "Requests per second actually sent"),
+            ("scraper_domain_rate_rps", "rate_rps", "Current token refill rate"),
+            ("scraper_domain_concurrency", "concurrency", "Current page concurrency"),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            lines += [f'{name}{{domain="{domain}"}} {metrics[key] or 0}' for domain, metrics in gauges]
+        return "\n".join(lines) + "\n"
+
+
+RATE_LIMITER = RateLimiter()
@@ -0,0 +1,141 @@
+################### IMPORTS ######################
+
+import json
+import logging
+from collections import Counter
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Log what each page's resource policy blocked, and add it to the pool metrics
+REPORT_RESOURCE_SAVINGS = True
+
+################### RESOURCE TYPES ######################
+
+# URL patterns per DevTools resource type, for Network.setBlockedURLs (Selenium drivers).
+# DevTools tabs match on the resource type itself through the Fetch domain.
+TYPE_PATTERNS = {
+    "Image": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*"],
+    "Font": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "Media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*"],
+}
+
+# Analytics, ad and widget hosts common on Shopify and Next.js storefronts; nothing the scrapers read comes from them
+TRACKER_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googleadservices.com",
+    "connect.facebook.net",
+    "analytics.tiktok.com",
+    "hotjar.com",
+    "clarity.ms",
+    "static.klaviyo.com",
+    "cdn.judge.me",
+    "wati.io",
+]
+
+# Typical transfer sizes used to estimate the bytes a blocked request would have cost
+ESTIMATED_BYTES = {
+    "Image": 80 * 1024,
+    "Font": 40 * 1024,
+    "Media": 512 * 1024,
+    "Script": 60 * 1024,
+    "Other": 10 * 1024,
+}
+
+################### POLICY ######################
+
+class ResourcePolicy:
+    """Resource types and domains a site's pages load without. Stubbed domains get an empty
+    200 response instead of a failed request (DevTools tabs only; Selenium drivers block them)."""
+
+    def __init__(self, block_types=(), block_domains=(), stub_domains=()):
+        self.block_types = tuple(block_types)
+        self.block_domains = tuple(block_domains)
+        self.stub_domains = tuple(stub_domains)
+
+    def url_patterns(self) -> list:
+        patterns = [pattern for resource_type in self.block_types for pattern in TYPE_PATTERNS.get(resource_type, [])]
+        patterns += [f"*{domain}*" for domain in self.block_domains + self.stub_domains]
+        return patterns
+
+    def fetch_patterns(self) -> list:
+        # Fetch.enable patterns: only matching requests are paused, everything else never leaves the network stack
+        patterns = [{"resourceType": resource_type, "requestStage": "Request"} for resource_type in self.block_types]
+        patterns += [{"urlPattern": f"*{domain}*", "requestStage": "Request"} for domain in self.block_domains + self.stub_domains]
+        return patterns
+
+    def stubs(self, url: str) -> bool:
+        host = urlparse(url).netloc.lower()
+        return any(host == domain or host.endswith("." + domain) for domain in self.stub_domains)
+
+    def apply(self, driver):
+        # Blocked for the lifetime of the driver's tab, across navigations and pool resets
+        patterns = self.url_patterns()
+        if patterns:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+SITE_RESOURCE_POLICIES = {
+    # The scrapers read <img> src attributes, never the image bytes
+    "mainstreet": ResourcePolicy(["Image", "Font", "Media"], TRACKER_DOMAINS),
+    "crepdogcrew": ResourcePolicy(["Image", "Font", "Media"], TRACKER_DOMAINS),
+    # The size dropdown is rendered by the page's own scripts; trackers are answered
+    # with empty scripts so nothing waiting on them stalls the render
+    "hypefly": ResourcePolicy(["Image", "Font", "Media"], stub_domains=TRACKER_DOMAINS),
+    "culture-circle": ResourcePolicy(["Image", "Font", "Media"], stub_domains=TRACKER_DOMAINS),
+}
+
+################### SAVINGS REPORT ######################
+
+class ResourceSavings:
+    """Requests and bytes one page load saved under its resource policy."""
+
+    def __init__(self, url=None):
+        self.url = url
+        self.requests_loaded = 0
+        self.bytes_loaded = 0
+        self.blocked = Counter()      # resource type -> requests blocked or stubbed
+
+    def loaded(self, encoded_bytes):
+        self.requests_loaded += 1
+        self.bytes_loaded += int(encoded_bytes or 0)
+
+    def block(self, resource_type):
+        self.blocked[resource_type if resource_type in ESTIMATED_BYTES else "Other"] += 1
+
+    @property
+    def requests_blocked(self) -> int:
+        return sum(self.blocked.values())
+
+    @property
+    def bytes_saved_est(self) -> int:
+        return sum(ESTIMATED_BYTES[resource_type] * count for resource_type, count in self.blocked.items())
+
+    def summary(self) -> dict:
+        return {
+            "url": self.url,
+            "requests_loaded": self.requests_loaded,
+            "kb_loaded": round(self.bytes_loaded / 1024, 1),
+            "requests_blocked": self.requests_blocked,
+            "kb_saved_est": round(self.bytes_saved_est / 1024, 1),
+            "blocked": dict(self.blocked),
+        }
+
+    def log(self):
+        logger.info("resources %s", self.summary())
+
+
+def savings_from_performance_log(entries, url=None) -> ResourceSavings:
+    # Chrome's performance log (goog:loggingPrefs) carries the Network events of every load
+    savings = ResourceSavings(url)
+    for entry in entries:
+        message = json.loads(entry["message"])["message"]
+        method, params = message.get("method"), message.get("params", {})
+        if method == "Network.loadingFinished":
+            savings.loaded(params.get("encodedDataLength"))
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            savings.block(params.get("type"))
+    return savings
@@ -0,0 +1,146 @@
+################### IMPORTS ######################
+
+import logging
+import re
+import pandas as pd
+from urllib.parse import urlparse
+from bs4 import BeautifulSoup
+from http_session import SESSION, html_text
+from site_spec import SITES
+from rate_limiter import RATE_LIMITER, Blocked
+from tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+################### STORE SETTINGS ######################
+
+# Shopify stores that expose /products/<handle>.js. The price format matches what
+# each Selenium scraper reads off the page. hypefly serves /products/ URLs from a
+# Next.js storefront, not Shopify, so it always goes through its browser scraper.
+SHOPIFY_STORES = {
+    "mainstreet": {
+        "price_format": "Rs. {:,.2f}",
+        "sku_from_description": False,
+    },
+    "crepdogcrew": {
+        "price_format": "₹{:,.0f}",
+        "sku_from_description": True,
+    },
+}
+
+
+def store_for(url: str):
+    # The Shopify store of the site the URL belongs to (SITES.lookup, by host)
+    site = SITES.lookup(url)
+    return site.name if site is not None and site.name in SHOPIFY_STORES else None
+
+################### FAST PATH ######################
+
+def product_json_url(url: str) -> str:
+    parsed = urlparse(url)
+    match = re.search(r"/products/([^/?#]+)", parsed.path)
+    if not match:
+        raise ValueError(f"Not a Shopify product URL: {url}")
+    # Keep any prefix before /products/ (locale paths like /en-in/products/...)
+    return f"{parsed.scheme}://{parsed.netloc}{parsed.path[:match.end()]}.js"
+
+
+def fetch_product(url: str, session=None, timeout=10) -> dict:
+    with RATE_LIMITER.request(url) as request:
+        response = (session or SESSION).get(product_json_url(url), headers={"Accept": "application/json"}, timeout=timeout)
+        request.observe(response.status_code, html_text(response), response.headers.get("Retry-After"))
+    response.raise_for_status()
+    return response.json()
+
+
+def parse_description(body_html, sku_from_description):
+    # Mirrors the page scrapers: mainstreet keeps the whole description text,
+    # crepdogcrew joins the <p> blocks and pulls the "SKU - ..." line out of them
+    soup = BeautifulSoup(body_html or "", "html.parser")
+    if not sku_from_description:
+        return soup.get_text(strip=True) or "N/A", "N/A"
+
+    sku, desc_parts = "N/A", []
+    for p in soup.find_all("p"):
+        text = p.get_text(strip=True)
+        if "SKU" in text.upper():
+            match = re.search(r"SKU\s*[-:–]?\s*(.+)", text, re.I)
+            if match:
+                sku = match.group(1).strip()
+        else:
+            desc_parts.append(text)
+    return " ".join(desc_parts).strip() or "N/A", sku
+
+
+def size_option_index(product):
+    for position, option in enumerate(product.get("options") or []):
+        name = option.get("name", "") if isinstance(option, dict) else str(option)
+        if "size" in name.lower():
+            return position
+    return None
+
+
+def product_to_rows(url: str, product: dict, store: str) -> list:
+    settings = SHOPIFY_STORES[store]
+    title = (product.get("title") or "N/A").strip()
+    description, sku = parse_description(product.get("description"), settings["sku_from_description"])
+
+    images = []
+    for src in product.get("images") or []:
+        if src.startswith("//"):
+            src = "https:" + src
+        images.append(src)
+    if not images:
+        images = ["N/A"]
+
+    # Only sizes the storefront lets you pick, like the browser scrapers
+    size_index = size_option_index(product)
+    size_price_mapping = {}
+    for variant in product.get("variants") or []:
+        if not variant.get("available", True):
+            continue
+        if size_index is not None:
+            size = variant.get(f"option{size_index + 1}") or variant.get("title")
+        else:
+            size = variant.get("title")
+        # Shopify's .js endpoint reports prices in the smallest currency unit
+        price = settings["price_format"].format(variant["price"] / 100)
+        size_price_mapping.setdefault(size, price)
+
+    if not size_price_mapping:
+        raise ValueError(f"No available variants in product JSON for {url}")
+    if list(size_price_mapping) == ["Default Title"]:
+        size_price_mapping = {"N/A": size_price_mapping["Default Title"]}
+
+    return [{
+        "title": title,
+        "url": url,
+        "size": size,
+        "price": price,
+        "description": description,
+        "sku": sku,
+        "images": ', '.join(images)
+    } for size, price in size_price_mapping.items()]
+
+
+def scrape_shopify_product(url: str, store=None, session=None) -> pd.DataFrame:
+    store = store or store_for(url)
+    if store is None:
+        raise ValueError(f"No Shopify fast path configured for {url}")
+    with TRACER.span("fast_path_fetch", site=store, url=url):
+        product = fetch_product(url, session)
+    with TRACER.span("fast_path_parse", site=store, url=url) as span:
+        rows = product_to_rows(url, product, store)
+        span.set(variant_count=len(rows))
+    return pd.DataFrame(rows)
+
+
+def scrape_with_fast_path(url: str, fallback, store=None, session=None) -> pd.DataFrame:
+    # One JSON request per product; the Selenium scraper only runs if that fails
+    try:
+        return scrape_shopify_product(url, store, session)
+    except Blocked:
+        raise  # a browser would only make the store push back harder
+    except Exception as e:
+        logger.warning("Shopify fast path failed for %s (%s), falling back to the browser", url, e)
+        return fallback(url)
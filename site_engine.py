@@ -0,0 +1,536 @@
+################### IMPORTS ######################
+
+import logging
+import pandas as pd
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from deadlines import BUDGETS
+from driver_pool import DRIVER_POOL
+from html_parser import make_soup
+from price_reader import PriceReadReport, read_tab_variant_prices, read_variant_prices
+from rate_limiter import PAGE_STATUS_SCRIPT, RATE_LIMITER, Blocked
+from site_spec import SITES
+from tracing import TRACER
+from waits import mark_dom, scroll_to_bottom, wait_for_dom_quiet, wait_for_elements, wait_for_page_settled
+from waits import scroll_tab_to_bottom, tab_mark_dom, tab_wait_until, wait_for_tab_dom_quiet, wait_for_tab_elements, wait_for_tab_settled
+
+logger = logging.getLogger(__name__)
+
+# Seconds a navigation may take at most, cut shorter by the page's deadline (Selenium's own
+# default is 300)
+PAGE_LOAD_TIMEOUT = 30.0
+
+################### PAGE SCRIPTS ######################
+
+# Clicks the first node matching an XPath; false if there is none
+CLICK_XPATH_SCRIPT = """
+var el = document.evaluate(arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+if (!el) { return false; }
+el.scrollIntoView({block: 'center'});
+el.click();
+return true;
+"""
+IMAGE_SOURCES_SCRIPT = "return Array.from(document.querySelectorAll(arguments[0])).map(function (img) { return img.src; }).filter(Boolean);"
+
+# Values of a <select>'s options, skipping placeholders and options whose text holds arguments[1]; null without a select
+OPTION_VALUES_SCRIPT = """
+var select = document.querySelector(arguments[0]), skip = arguments[1];
+if (!select) { return null; }
+return Array.from(select.options)
+    .filter(function (o) { return o.value && !(skip && o.text.indexOf(skip) >= 0); })
+    .map(function (o) { return o.value; });
+"""
+
+# Page shape in one call: HTTP status, load state, title, how many nodes the variant picker and the
+# waited-for image selectors match, and the text of the sold-out candidates (see site_spec.Probe)
+PROBE_SCRIPT = """
+var spec = arguments[0], entry = performance.getEntriesByType('navigation')[0] || {};
+function count(kind, selector) {
+    if (kind === 'xpath') {
+        return document.evaluate('count(' + selector + ')', document, null, XPathResult.NUMBER_TYPE, null).numberValue;
+    }
+    return document.querySelectorAll(selector).length;
+}
+return {
+    status: entry.responseStatus || null,
+    ready: document.readyState,
+    title: document.title,
+    picker: spec.picker && spec.picker[1] ? count(spec.picker[0], spec.picker[1]) : null,
+    images: spec.images.map(function (css) { return count('css', css); }),
+    soldOut: spec.soldOut ? Array.from(document.querySelectorAll(spec.soldOut)).map(function (el) { return el.textContent.trim(); }) : []
+};
+"""
+
+# Seconds one variant of a batched price read may take before the batch gives up on it; a page
+# running out of budget shortens the steps, but never below the floor, where the previous size's
+# price could be read as this one's
+PRICE_STEP_S = 8.0
+MIN_PRICE_STEP_S = 1.0
+
+# Chrome arguments for a site spec that brings no profile of its own
+DEFAULT_CHROME_ARGS = ["--no-sandbox", "--disable-dev-shm-usage"]
+
+################### ROWS ######################
+
+# Outcome and variant count recorded on each scrape span
+def describe_result(df):
+    if df is None or df.empty:
+        return {"outcome": "empty", "variant_count": 0}
+    if (df["title"] == "Error").all():
+        return {"outcome": "error", "variant_count": 0}
+    return {"outcome": "ok", "variant_count": len(df)}
+
+
+def site_rows(url, details, sizes_prices, images) -> pd.DataFrame:
+    return pd.DataFrame([{
+        "title": details["title"],
+        "url": url,
+        "size": size,
+        "price": price,
+        "description": details["description"],
+        "sku": details["sku"],
+        "images": images
+    } for size, price in sizes_prices])
+
+
+def error_rows(url) -> pd.DataFrame:
+    return pd.DataFrame([{
+        "title": "Error",
+        "url": url,
+        "size": "N/A",
+        "price": "Error",
+        "description": "Error",
+        "sku": "N/A",
+        "images": "Error"
+    }])
+
+
+################### PAGE SHAPE ######################
+
+class PageError(Exception):
+    """The probe found a not-found or error page where the product should be."""
+
+
+class PageShape:
+    """What probe_page() made of a loaded page. kind is "ok", "sold_out", "no_variants", "error",
+    or "unknown" while the document is still loading, in which case nothing is skipped."""
+
+    __slots__ = ("kind", "reason", "absent")
+
+    def __init__(self, kind, reason=None, absent=()):
+        self.kind = kind
+        self.reason = reason
+        self.absent = set(absent)     # waited-for selectors with no match on the loaded page
+
+    def skips(self, selector) -> bool:
+        return selector in self.absent
+
+
+def probe_page(site, result) -> PageShape:
+    # Classifies the PROBE_SCRIPT result; waits for absent selectors cannot succeed on a loaded page
+    probe = site.probe
+    status, title = result.get("status"), result.get("title") or ""
+    if status and status >= 400:
+        return PageShape("error", f"HTTP {status}")
+    if probe.error_title.search(title):
+        return PageShape("error", f"title {title!r}")
+    if result.get("ready") != "complete":
+        return PageShape("unknown")
+    absent = {css for css, count in zip(probe.image_waits, result.get("images") or []) if not count}
+    if probe.picker and result.get("picker") == 0:
+        absent.add(probe.picker[1])
+    sold_out = [text for text in result.get("soldOut") or []
+                if probe.sold_out_text is None or probe.sold_out_text.search(text)]
+    if sold_out:
+        return PageShape("sold_out", sold_out[0], absent)
+    if probe.picker and probe.picker[1] in absent:
+        return PageShape("no_variants", None, absent)
+    return PageShape("ok", None, absent)
+
+
+def record_shape(site, shape, url, span):
+    # Notes the shape on the trace and the page's deadline; an error page ends the scrape here
+    span.set(shape=shape.kind)
+    deadline = BUDGETS.current()
+    if deadline is not None:
+        deadline.shape = shape.kind
+    if shape.kind == "error":
+        BUDGETS.skip(site.probe.planned_s, "the page's waits")
+        raise PageError(f"{url} is an error page ({shape.reason})")
+
+
+def price_step_ms(targets) -> int:
+    # Per-variant step timeout for a batched read, shortened to fit what is left of the page's budget
+    budget = BUDGETS.timeout(len(targets) * PRICE_STEP_S, "price reads")
+    return int(1000 * max(MIN_PRICE_STEP_S, budget / len(targets)))
+
+
+def finish_sizes(variants, sizes_prices) -> list:
+    # The spec's placeholder row when the page listed no sizes at all
+    if not sizes_prices and variants.empty:
+        return [(variants.empty["size"], variants.empty["price"])]
+    return sizes_prices
+
+
+def parse_page(site, soup, url: str) -> pd.DataFrame:
+    # Everything a site reads from a parsed page, for sites whose sizes are in the markup
+    # (static and none); used by the saved-page benchmarks
+    details = site.details(soup)
+    sizes_prices = site.variants.item_prices(soup) if site.variants.strategy == "static" else []
+    return site_rows(url, details, finish_sizes(site.variants, sizes_prices), site.images.extract(soup, details))
+
+
+def register_profiles(pool=DRIVER_POOL, sites=SITES):
+    # A site spec without a driver_pool.SITE_PROFILES entry gets a profile from its chrome_args
+    for site in sites:
+        if site.name not in pool.profiles:
+            pool.profiles[site.name] = list(site.chrome_args or DEFAULT_CHROME_ARGS)
+
+
+register_profiles()
+
+################### SELENIUM ######################
+
+# driver.get() through the rate limiter; a 403/429 or a challenge page raises rate_limiter.Blocked
+def load_page(driver, url):
+    with RATE_LIMITER.request(url) as request:
+        driver.set_page_load_timeout(BUDGETS.timeout(PAGE_LOAD_TIMEOUT, "page load", required=True))
+        driver.get(url)
+        title, status = driver.execute_script(PAGE_STATUS_SCRIPT)
+        request.observe(status, title)
+
+
+def click(driver, action) -> bool:
+    # Runs a spec click action; an optional one that fails is logged and skipped
+    try:
+        if action.wait:
+            timeout = BUDGETS.timeout(action.wait, f"clickable {action.xpath}", action.required)
+            el = WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((By.XPATH, action.xpath)))
+        else:
+            el = driver.find_element(By.XPATH, action.xpath)
+        mark_dom(driver)
+        if action.native:
+            ActionChains(driver).move_to_element(el).click().perform()
+        else:
+            driver.execute_script("arguments[0].click();", el)
+        if action.wait_for:
+            wait_for_elements(driver, action.wait_for["css"], timeout=action.wait_for.get("timeout", 10))
+        if action.quiet is not None:
+            wait_for_dom_quiet(driver, **action.quiet)
+        return True
+    except Exception as e:
+        if action.required:
+            raise
+        logger.info("click on %s skipped: %s", action.xpath, e)
+        return False
+
+
+def retries_for(variants, shape, missed) -> int:
+    # Sold-out variants keep the price they show, so reading them again only costs the step timeout
+    if shape.kind == "sold_out" and variants.retries and missed:
+        BUDGETS.skip(len(missed) * variants.retries * PRICE_STEP_S, "per-size price retries")
+        return 0
+    return variants.retries
+
+
+def read_prices(driver, url, variants, targets, shape) -> dict:
+    # Walks every variant inside the page in one script call, then retries the ones it missed one by one
+    report = PriceReadReport(driver, url)
+    prices = {}
+    if not targets:
+        return prices
+    batch = report.timed(read_variant_prices, driver, variants.strategy, targets, variants.price_selectors,
+                         select_css=variants.select, strip_text=variants.strip_text,
+                         step_timeout_ms=price_step_ms(targets), reads=0)
+    if batch:
+        report.batched = True
+        for target, price in batch.items():
+            if price is not None:
+                prices[target] = price
+                report.reads += 1
+
+    retries = retries_for(variants, shape, [target for target in targets if target not in prices])
+    for target in targets:
+        for attempt in range(retries):
+            if target in prices:
+                break
+            retry = report.timed(read_variant_prices, driver, variants.strategy, [target], variants.price_selectors,
+                                 select_css=variants.select, strip_text=variants.strip_text,
+                                 step_timeout_ms=price_step_ms([target]), reads=0)
+            if retry and retry.get(target) is not None:
+                prices[target] = retry[target]
+                report.reads += 1
+            else:
+                print(f"[ERROR] Attempt {attempt + 1} failed for size {target}")
+    report.log()
+    return prices
+
+
+def size_list_missing(site, url, shape) -> bool:
+    # True when the probe saw no size button, so the click and its waits are skipped
+    click = site.variants.click
+    if not shape.skips(click.xpath):
+        return False
+    BUDGETS.skip(click.wait + (click.wait_for or {}).get("timeout", 10 if click.wait_for else 0), "size list click")
+    print(f"Failed to open the size list: {url}")
+    return True
+
+
+def driver_sizes(site, driver, url, soup, shape) -> list:
+    variants = site.variants
+    if variants.strategy == "select":
+        targets = driver.execute_script(OPTION_VALUES_SCRIPT, variants.select, variants.skip_text)
+        if targets is None:
+            print(f"[ERROR] Size dropdown not found: {url}")
+            return [("N/A", variants.missing.extract(soup) if variants.missing else "N/A")]
+        prices = read_prices(driver, url, variants, targets, shape)
+        return list({size: variants.clean_price(prices.get(size)) for size in targets}.items())
+    if variants.strategy == "click":
+        found, swatches = variants.swatches(soup)
+        if not found:
+            return [("N/A", variants.missing.extract(soup) if variants.missing else "N/A")]
+        prices = read_prices(driver, url, variants, [target for _, target in swatches], shape)
+        return list({size: variants.clean_price(prices.get(target)) for size, target in swatches}.items())
+    if variants.strategy == "reveal":
+        if not size_list_missing(site, url, shape) and not click(driver, variants.click):
+            print(f"Failed to open the size list: {url}")
+        soup = make_soup(driver.page_source, site.name)
+    if variants.strategy in ("reveal", "static"):
+        return variants.item_prices(soup)
+    return []
+
+
+def driver_images(site, driver, shape) -> tuple:
+    # Image URLs read off the rendered page (src properties), first rule with a result wins
+    for rule in site.images.rules:
+        if rule.wait and shape.skips(rule.css):
+            BUDGETS.skip(rule.wait, f"elements {rule.css}")
+        elif rule.wait:
+            wait_for_elements(driver, rule.css, timeout=rule.wait)
+        sources = driver.execute_script(IMAGE_SOURCES_SCRIPT, rule.css)
+        values = rule.collect(sources)
+        if values:
+            return rule.value(values), len(sources if rule.many else sources[:1])
+    return site.images.default, 0
+
+
+def scrape_driver_page(site, driver, url) -> pd.DataFrame:
+    with TRACER.span("page_load"):
+        load_page(driver, url)
+        if site.settle:
+            wait_for_page_settled(driver)
+    with TRACER.span("probe") as span:
+        shape = probe_page(site, driver.execute_script(PROBE_SCRIPT, site.probe.script_args()))
+        record_shape(site, shape, url, span)
+    if site.scroll:
+        with TRACER.span("scroll"):
+            scroll_to_bottom(driver)
+    if site.ready:
+        with TRACER.span("ready_wait"):
+            if not wait_for_elements(driver, site.ready["css"], timeout=site.ready.get("timeout", 10)):
+                raise TimeoutError(f"{site.ready['css']} did not appear")
+    for action in site.actions:
+        click(driver, action)
+
+    with TRACER.span("parse"):
+        soup = make_soup(driver.page_source, site.name)
+        details = site.details(soup)
+
+    with TRACER.span("variants") as span:
+        sizes_prices = finish_sizes(site.variants, driver_sizes(site, driver, url, soup, shape))
+        span.set(variant_count=len(sizes_prices))
+
+    if site.images.live:
+        with TRACER.span("images") as span:
+            images, count = driver_images(site, driver, shape)
+            span.set(outcome="ok" if count else "missing", image_count=count)
+    else:
+        images = site.images.extract(soup, details)
+    return site_rows(url, details, sizes_prices, images)
+
+
+def describe_deadline(deadline) -> dict:
+    return {"shape": deadline.shape, "saved_s": round(deadline.skipped_s + deadline.clipped_s, 1),
+            "budget_left_s": round(deadline.remaining(), 1)}
+
+
+def run_driver(site, url: str) -> pd.DataFrame:
+    # Scrapes one product page of a site spec in a warm browser of the site's profile,
+    # every wait drawing on the page's budget
+    with TRACER.span("scrape", site=site.name, url=url) as span:
+        with TRACER.span("driver_acquire"):
+            driver = DRIVER_POOL.acquire(site.name)
+        # A driver that raised is quit, not pooled, as DRIVER_POOL.driver() does
+        broken = False
+        try:
+            with BUDGETS.page(site.budget) as deadline:
+                try:
+                    df = scrape_driver_page(site, driver, url)
+                finally:
+                    span.set(**describe_deadline(deadline))
+        except Blocked:
+            broken = True
+            raise
+        except Exception as e:
+            broken = True
+            if site.on_error != "error_row":
+                raise
+            print(f"[ERROR] Failed to scrape {url}: {str(e)}")
+            df = error_rows(url)
+        finally:
+            DRIVER_POOL.release(site.name, driver, broken=broken)
+        described = describe_result(df)
+        span.outcome = described.pop("outcome")
+        span.set(**described)
+        return df
+
+################### DEVTOOLS TABS ######################
+
+# The same steps as coroutines driving a tab of the shared DevTools browser
+
+# load_page() for a DevTools tab
+async def load_tab(tab, url):
+    async with RATE_LIMITER.request_async(url) as request:
+        await tab.goto(url, BUDGETS.timeout(PAGE_LOAD_TIMEOUT, "page load", required=True))
+        title, status = await tab.execute_script(PAGE_STATUS_SCRIPT)
+        request.observe(status, title)
+
+
+async def wait_for_tab_ready(tab, css_selector, timeout):
+    # WebDriverWait(...).until(presence_of_element_located(...)) for a tab
+    if not await wait_for_tab_elements(tab, css_selector, timeout):
+        raise TimeoutError(f"{css_selector} did not appear within {timeout}s")
+
+
+async def click_tab(tab, action) -> bool:
+    # click() for a tab; the node is clicked by script, polled for up to action.wait seconds
+    await tab_mark_dom(tab)
+    if action.wait:
+        clicked = await tab_wait_until(tab, lambda tab: tab.execute_script(CLICK_XPATH_SCRIPT, action.xpath),
+                                       action.wait, label=f"clickable {action.xpath}")
+    else:
+        clicked = await tab.execute_script(CLICK_XPATH_SCRIPT, action.xpath)
+    if not clicked:
+        if action.required:
+            raise TimeoutError(f"{action.xpath} could not be clicked")
+        logger.info("click on %s skipped: not found", action.xpath)
+        return False
+    if action.wait_for:
+        await wait_for_tab_elements(tab, action.wait_for["css"], timeout=action.wait_for.get("timeout", 10))
+    if action.quiet is not None:
+        await wait_for_tab_dom_quiet(tab, **action.quiet)
+    return True
+
+
+async def read_tab_prices(tab, variants, targets, shape) -> dict:
+    # One batched walk over every variant, then each variant the batch missed on its own
+    if not targets:
+        return {}
+    prices = await read_tab_variant_prices(tab, variants.strategy, targets, variants.price_selectors,
+                                           variants.select, variants.strip_text,
+                                           step_timeout_ms=price_step_ms(targets)) or {}
+    retries = retries_for(variants, shape, [target for target in targets if prices.get(target) is None])
+    for target in targets:
+        for _ in range(retries):
+            if prices.get(target) is not None:
+                break
+            retry = await read_tab_variant_prices(tab, variants.strategy, [target], variants.price_selectors,
+                                                  variants.select, variants.strip_text,
+                                                  step_timeout_ms=price_step_ms([target]))
+            prices[target] = retry.get(target) if retry else None
+    return prices
+
+
+async def tab_sizes(site, tab, url, soup, shape) -> list:
+    variants = site.variants
+    if variants.strategy == "select":
+        targets = await tab.execute_script(OPTION_VALUES_SCRIPT, variants.select, variants.skip_text)
+        if targets is None:
+            print(f"[ERROR] Size dropdown not found: {url}")
+            return [("N/A", variants.missing.extract(soup) if variants.missing else "N/A")]
+        prices = await read_tab_prices(tab, variants, targets, shape)
+        return list({size: variants.clean_price(prices.get(size)) for size in targets}.items())
+    if variants.strategy == "click":
+        found, swatches = variants.swatches(soup)
+        if not found:
+            return [("N/A", variants.missing.extract(soup) if variants.missing else "N/A")]
+        prices = await read_tab_prices(tab, variants, [target for _, target in swatches], shape)
+        return list({size: variants.clean_price(prices.get(target)) for size, target in swatches}.items())
+    if variants.strategy == "reveal":
+        if not size_list_missing(site, url, shape) and not await click_tab(tab, variants.click):
+            print(f"Failed to open the size list: {url}")
+        soup = make_soup(await tab.content(), site.name)
+    if variants.strategy in ("reveal", "static"):
+        return variants.item_prices(soup)
+    return []
+
+
+async def tab_images(site, tab, shape) -> tuple:
+    for rule in site.images.rules:
+        if rule.wait and shape.skips(rule.css):
+            BUDGETS.skip(rule.wait, f"elements {rule.css}")
+        elif rule.wait:
+            await wait_for_tab_elements(tab, rule.css, timeout=rule.wait)
+        sources = await tab.execute_script(IMAGE_SOURCES_SCRIPT, rule.css)
+        values = rule.collect(sources)
+        if values:
+            return rule.value(values), len(sources if rule.many else sources[:1])
+    return site.images.default, 0
+
+
+async def scrape_tab_page(site, tab, url) -> pd.DataFrame:
+    with TRACER.span("page_load"):
+        await load_tab(tab, url)
+        if site.settle:
+            await wait_for_tab_settled(tab)
+    with TRACER.span("probe") as span:
+        shape = probe_page(site, await tab.execute_script(PROBE_SCRIPT, site.probe.script_args()))
+        record_shape(site, shape, url, span)
+    if site.scroll:
+        with TRACER.span("scroll"):
+            await scroll_tab_to_bottom(tab)
+    if site.ready:
+        with TRACER.span("ready_wait"):
+            await wait_for_tab_ready(tab, site.ready["css"], site.ready.get("timeout", 10))
+    for action in site.actions:
+        await click_tab(tab, action)
+
+    with TRACER.span("parse"):
+        soup = make_soup(await tab.content(), site.name)
+        details = site.details(soup)
+
+    with TRACER.span("variants") as span:
+        sizes_prices = finish_sizes(site.variants, await tab_sizes(site, tab, url, soup, shape))
+        span.set(variant_count=len(sizes_prices))
+
+    if site.images.live:
+        with TRACER.span("images") as span:
+            images, count = await tab_images(site, tab, shape)
+            span.set(outcome="ok" if count else "missing", image_count=count)
+    else:
+        images = site.images.extract(soup, details)
+    return site_rows(url, details, sizes_prices, images)
+
+
+async def run_tab(site, tab, url: str) -> pd.DataFrame:
+    # run_driver() in a DevTools tab opened for the site
+    with TRACER.span("scrape", site=site.name, url=url) as span:
+        try:
+            with BUDGETS.page(site.budget) as deadline:
+                try:
+                    df = await scrape_tab_page(site, tab, url)
+                finally:
+                    span.set(**describe_deadline(deadline))
+        except Blocked:
+            raise
+        except Exception as e:
+            if site.on_error != "error_row":
+                raise
+            print(f"[ERROR] Failed to scrape {url}: {str(e)}")
+            df = error_rows(url)
+        described = describe_result(df)
+        span.outcome = described.pop("outcome")
+        span.set(**described)
+        return df
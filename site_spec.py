@@ -0,0 +1,605 @@
+################### IMPORTS ######################
+
+import glob
+import json
+import os
+import re
+from urllib.parse import urlparse
+import soupsieve
+
+################### SPEC FORMAT ######################
+
+# A site is described by data only; site_engine.py runs it in a pooled browser or a DevTools tab.
+#
+#   name       site key: driver pool profile, resource policy, tracing label
+#   hosts      host names dispatched to the site ("www." is ignored, subdomains match)
+#   fast_path  "shopify" or "embedded_state" to try before the browser (see main.FAST_PATHS)
+#   chrome_args  Chrome arguments for a site that has no profile in driver_pool.SITE_PROFILES
+#   on_error   "error_row" returns one row of "Error" values when the page fails; "raise" lets it propagate
+#   load       scroll (bool), ready {css, timeout}, settle (bool: network idle + DOM quiet),
+#              actions [click] run before the page is parsed
+#   fields     title / description / sku: a rule or a list of fallback rules, read from the parsed page
+#   images     the same, with "live": true to read <img> src properties from the rendered page
+#   variants   strategy "select" | "click" | "reveal" | "static" | "none", see VARIANT_KEYS
+#   discovery  how crawler.py finds product URLs on collection and listing pages, see DISCOVERY_KEYS
+#   budget     seconds a page may take in the browser, every wait included (default deadlines.PAGE_BUDGET)
+#   probe      error_title (pattern) and sold_out {css, text}: what the page-shape probe looks for, see PROBE_KEYS
+#
+# A rule reads values from the page:
+#   css        selector; matches of "within" (each the first match inside the previous one) scope it
+#   all        every match instead of the first
+#   text       "joined" (get_text(strip=True), the default) or "strip" (.text.strip()); or
+#   attr       an attribute value (empty ones are skipped); strings: N picks a stripped string
+#   where      {"attr": name, "contains": "{field}"} keeps nodes whose attribute holds a field's value
+#   regex      keep group 1 of each value that matches; exclude drops values that match
+#   remove     a pattern deleted from each value before stripping it; prefix is prepended
+#   https      "fix" turns //host URLs into https://host, "only" also drops every other URL
+#   join       joins all values into one ("keep_empty": the join of nothing is "" instead of no value)
+#   pick       "first" (default) or "last"; wait (live rules) waits that long for the selector
+# A field's default (normally "N/A") is used when none of its rules produced a value.
+#
+# A click action: xpath, wait (seconds to wait for it to be clickable, 0 = click only if present),
+# native (a real mouse click instead of a script click), wait_for {css, timeout}, quiet {quiet_ms, timeout},
+# required (raise when the click fails instead of carrying on).
+
+RULE_KEYS = {"css", "within", "all", "text", "attr", "strings", "where", "regex", "exclude", "remove", "prefix",
+             "https", "join", "keep_empty", "pick", "wait"}
+FIELD_KEYS = RULE_KEYS | {"rules", "default", "live"}
+VARIANT_KEYS = {
+    "strategy",
+    # select: <option> values of a <select>, skipping options whose text contains skip_text
+    "select", "skip_text",
+    # click: swatches (options) in the option group whose label contains a word; target is the id attribute
+    "group", "options", "target",
+    # reveal: click to open the size list, then read it like static; static: items already in the page
+    "click", "items", "dedupe",
+    # size / price rules relative to each item or option
+    "size", "price",
+    # select / click: live price nodes, batch reads and per-variant retries
+    "price_selectors", "strip_text", "retries", "price_remove",
+    # price of a page without a size picker; row used when there are no sizes at all
+    "missing", "empty",
+}
+ACTION_KEYS = {"xpath", "wait", "native", "wait_for", "quiet", "required"}
+DISCOVERY_KEYS = {
+    # "shopify": page through /collections/<handle>/products.json instead of the collection's HTML
+    "feed",
+    # <a> tags matching links whose path matches product_pattern are product URLs
+    "links", "product_pattern",
+    # the next listing page: the first <a> matching next, otherwise page_param counted up in the query
+    "next", "page_param",
+}
+PROBE_KEYS = {
+    # a page whose <title> matches is an error page, whatever its HTTP status
+    "error_title",
+    # {css, text}: the page is sold out when a node matching css has text matching text (any text without one)
+    "sold_out",
+}
+SPEC_KEYS = {"name", "hosts", "fast_path", "chrome_args", "on_error", "load", "fields", "images", "variants", "discovery",
+             "budget", "probe"}
+LOAD_KEYS = {"scroll", "ready", "settle", "actions"}
+STRATEGIES = ("select", "click", "reveal", "static", "none")
+
+# Titles of not-found and server error pages, for sites whose spec gives no error_title
+DEFAULT_ERROR_TITLE = r"(?i)\b404\b|page not found|^not found|internal server error|something went wrong"
+
+# Shopify themes relabel the add-to-cart button when every variant is sold out
+SHOPIFY_SOLD_OUT = {"css": "form[action*='/cart/add'] button[type='submit']", "text": "(?i)^sold out$"}
+
+# Specs in this directory (one JSON object per file) are added to the built-in ones at startup
+SITE_SPEC_DIR = os.environ.get("SITE_SPEC_DIR", "sites")
+
+################### SITES ######################
+
+SITE_SPECS = [
+    {
+        "name": "mainstreet",
+        "hosts": ["marketplace.mainstreet.co.in", "mainstreet.co.in"],
+        "fast_path": "shopify",
+        "on_error": "error_row",
+        "load": {"scroll": True, "ready": {"css": ".product__title", "timeout": 10}},
+        "fields": {
+            "title": {"css": "h2.h1", "text": "strip"},
+            "description": {"css": "div.product__description"},
+        },
+        "images": {
+            "live": True,
+            "rules": [
+                {"css": "ul[id*='Slider-Thumbnails'] li button img", "all": True, "wait": 20},
+                {"css": "div.product__media.media--transparent img"},
+            ],
+            "https": "fix",
+            "join": ", ",
+        },
+        "variants": {
+            "strategy": "select",
+            "select": "select.select__select",
+            "skip_text": "Unavailable",
+            "price_selectors": ["span.price-item--sale", "span.price-item--regular"],
+            "strip_text": False,
+            "retries": 2,
+            "missing": [{"css": "span.price-item--sale", "text": "strip"}, {"css": "span.price-item--regular", "text": "strip"}],
+            "empty": {"size": "N/A", "price": "N/A"},
+        },
+        "discovery": {"feed": "shopify"},
+        "probe": {"sold_out": SHOPIFY_SOLD_OUT},
+    },
+    {
+        "name": "crepdogcrew",
+        "hosts": ["crepdogcrew.com"],
+        "fast_path": "shopify",
+        "load": {"scroll": True, "ready": {"css": ".product-info__title", "timeout": 15}},
+        "fields": {
+            "title": {"css": "h1.product-info__title"},
+            # The SKU is a "SKU - ..." line inside the description
+            "description": {"within": ["div.accordion__content", "div.prose"], "css": "p", "all": True,
+                            "exclude": "(?i)sku", "join": " ", "keep_empty": True},
+            "sku": {"within": ["div.accordion__content", "div.prose"], "css": "p",
+                    "regex": "(?i)SKU\\s*[-:–]?\\s*(.+)", "pick": "last"},
+        },
+        "images": [
+            {"css": "page-dots img", "all": True, "attr": "src", "https": "only", "join": ", "},
+            {"css": "div.product-gallery__media.snap-center.is-selected img", "attr": "src", "https": "only"},
+        ],
+        "variants": {
+            "strategy": "click",
+            "group": {"css": "fieldset.variant-picker__option", "label": "legend", "contains": "size"},
+            "options": "label.block-swatch:not(.is-disabled)",
+            "size": {"css": "span", "default": "N/A"},
+            "target": "for",
+            "price_selectors": ["sale-price span.cvc-money"],
+            "price_remove": "MRP",
+            "retries": 1,
+            "missing": {"css": "sale-price span.cvc-money", "remove": "MRP"},
+        },
+        "discovery": {"feed": "shopify"},
+        "probe": {"sold_out": SHOPIFY_SOLD_OUT},
+    },
+    {
+        "name": "hypefly",
+        "hosts": ["hypefly.co.in"],
+        "load": {"settle": True},
+        "fields": {
+            "title": {"css": "h1"},
+            "description": {"within": ["div.bg-gray-200"], "css": "div.staticPage"},
+            "sku": {"within": ["div.bg-gray-200"], "css": "p", "all": True, "regex": "(?s)^SKU:(.*)"},
+        },
+        "images": {"css": "img", "where": {"attr": "alt", "contains": "{title}"}, "attr": "src",
+                   "prefix": "https://hypefly.co.in"},
+        "variants": {
+            "strategy": "reveal",
+            "click": {"xpath": "//button[.//p[text()='Size:']]", "wait": 10, "native": True,
+                      "wait_for": {"css": "ul.grid li", "timeout": 5}, "quiet": {}},
+            "items": "ul.grid li",
+            "size": {"strings": 0},
+            "price": {"strings": 1, "default": "N/A"},
+        },
+        "discovery": {"page_param": "page"},
+        "probe": {"sold_out": {"css": "button", "text": "(?i)^(sold out|out of stock)$"}},
+    },
+    {
+        "name": "culture-circle",
+        "hosts": ["culture-circle.com"],
+        "fast_path": "embedded_state",
+        "load": {
+            "scroll": True,
+            "ready": {"css": ".a_productHeading__jLymj", "timeout": 10},
+            "actions": [{"xpath": "//button[contains(text(), 'Read more')]", "quiet": {"quiet_ms": 300, "timeout": 3}}],
+        },
+        "fields": {
+            "title": {"within": ["div.a_productHeading__jLymj"], "css": "h2", "text": "strip"},
+            "description": {"css": "p.w-full"},
+        },
+        "images": {
+            "rules": [
+                {"css": "img.a_thumbnailImage___06oR", "all": True, "attr": "src"},
+                {"within": ["div.a_imageWrapper__fi6Ev"], "css": "img.a_mainImage__kjiv_", "attr": "src"},
+            ],
+            "join": ", ",
+        },
+        "variants": {
+            "strategy": "static",
+            "items": "div.a_sizeSlide__FHiSL",
+            "size": {"css": "div.a_sizeSlideSize__jBG1p"},
+            "price": {"css": "p.a_sizeSlidePrice__NASxX"},
+            "dedupe": "pair",
+            "empty": {"size": "N/A", "price": "N/A"},
+        },
+        "discovery": {"product_pattern": "/products/all/[^/?#]+", "page_param": "page"},
+    },
+]
+
+################### COMPILER ######################
+
+class SpecError(ValueError):
+    pass
+
+
+def _check_keys(where, mapping, allowed):
+    unknown = set(mapping) - allowed
+    if unknown:
+        raise SpecError(f"{where}: unknown keys {sorted(unknown)}")
+
+
+def _compile_css(where, css):
+    try:
+        return soupsieve.compile(css)
+    except Exception as e:
+        raise SpecError(f"{where}: bad selector {css!r} ({e})") from e
+
+
+def _compile_regex(where, pattern):
+    try:
+        return re.compile(pattern) if pattern is not None else None
+    except re.error as e:
+        raise SpecError(f"{where}: bad pattern {pattern!r} ({e})") from e
+
+
+class Rule:
+    """One compiled rule: selectors and patterns are compiled once, values are read in one call."""
+
+    __slots__ = ("css", "selector", "within", "many", "text", "attr", "strings", "where", "regex", "exclude",
+                 "remove", "prefix", "https", "join", "keep_empty", "pick", "wait")
+
+    def __init__(self, where, spec, inherited=None):
+        spec = dict(inherited or {}, **spec)
+        _check_keys(where, spec, RULE_KEYS)
+        self.css = spec.get("css")
+        self.selector = _compile_css(where, self.css) if self.css else None
+        self.within = [_compile_css(where, css) for css in spec.get("within", [])]
+        self.pick = spec.get("pick", "first")
+        if self.pick not in ("first", "last"):
+            raise SpecError(f"{where}: pick must be 'first' or 'last'")
+        self.many = spec.get("all", False) or self.pick == "last"
+        self.text = spec.get("text", "joined")
+        if self.text not in ("joined", "strip"):
+            raise SpecError(f"{where}: text must be 'joined' or 'strip'")
+        self.attr = spec.get("attr")
+        self.strings = spec.get("strings")
+        self.where = spec.get("where")
+        self.regex = _compile_regex(where, spec.get("regex"))
+        self.exclude = _compile_regex(where, spec.get("exclude"))
+        self.remove = _compile_regex(where, spec.get("remove"))
+        self.prefix = spec.get("prefix", "")
+        self.https = spec.get("https")
+        self.join = spec.get("join")
+        self.keep_empty = spec.get("keep_empty", False)
+        self.wait = spec.get("wait", 0)
+
+    def roots(self):
+        # The outermost selector this rule reads below, for the parse strainer
+        if self.within:
+            return [self.within[0].pattern]
+        return [self.css] if self.css else []
+
+    def nodes(self, node, fields):
+        # Candidate nodes below node; None when "within" did not match
+        for scope in self.within:
+            node = scope.select_one(node)
+            if node is None:
+                return None
+        if self.selector is None:
+            found = [node]
+        elif self.many or self.where is not None or self.regex is not None:
+            found = self.selector.select(node)
+        else:
+            first = self.selector.select_one(node)
+            found = [first] if first is not None else []
+        if self.where is not None:
+            needle = self.where["contains"].format(**fields)
+            found = [el for el in found if needle in (el.get(self.where["attr"]) or "")]
+        return found
+
+    def raw(self, el):
+        if self.attr is not None:
+            return el.get(self.attr) or None
+        if self.strings is not None:
+            strings = list(el.stripped_strings)
+            return strings[self.strings] if len(strings) > self.strings else None
+        return el.text.strip() if self.text == "strip" else el.get_text(strip=True)
+
+    def collect(self, raw_values) -> list:
+        # Filters and rewrites raw values (None ones are dropped), then keeps one or joins them
+        values = []
+        for value in raw_values:
+            if value is None:
+                continue
+            if self.exclude is not None and self.exclude.search(value):
+                continue
+            if self.regex is not None:
+                match = self.regex.search(value)
+                if not match:
+                    continue
+                value = match.group(1).strip()
+            if self.remove is not None:
+                value = self.remove.sub("", value).strip()
+            if self.https is not None:
+                if value.startswith("//"):
+                    value = "https:" + value
+                elif self.https == "only":
+                    continue
+            values.append(self.prefix + value)
+        if not self.many:
+            values = values[:1]
+        if self.join is not None and (values or self.keep_empty):
+            return [self.join.join(values).strip()]
+        return values
+
+    def values(self, node, fields=None) -> list:
+        found = self.nodes(node, fields or {})
+        if found is None:
+            return []
+        return self.collect(self.raw(el) for el in found)
+
+    def value(self, values):
+        return values[-1] if self.pick == "last" else values[0]
+
+
+class Field:
+    """A rule with fallbacks: the first rule that reads something wins."""
+
+    def __init__(self, where, spec, default="N/A"):
+        if isinstance(spec, list):
+            spec = {"rules": spec}
+        _check_keys(where, spec, FIELD_KEYS)
+        shared = {k: v for k, v in spec.items() if k not in ("rules", "live", "default")}
+        rules = spec["rules"] if "rules" in spec else [{}]
+        self.live = spec.get("live", False)
+        self.rules = [Rule(f"{where}[{i}]", rule, shared) for i, rule in enumerate(rules)]
+        self.default = spec.get("default", default)
+
+    def roots(self):
+        return [] if self.live else [root for rule in self.rules for root in rule.roots()]
+
+    def extract(self, node, fields=None):
+        for rule in self.rules:
+            values = rule.values(node, fields)
+            if values:
+                return rule.value(values)
+        return self.default
+
+
+class Action:
+    def __init__(self, where, spec):
+        _check_keys(where, spec, ACTION_KEYS)
+        if "xpath" not in spec:
+            raise SpecError(f"{where}: an action needs an xpath")
+        self.xpath = spec["xpath"]
+        self.wait = spec.get("wait", 0)
+        self.native = spec.get("native", False)
+        self.wait_for = spec.get("wait_for")
+        self.quiet = spec.get("quiet")
+        self.required = spec.get("required", False)
+
+
+class Variants:
+    """Where a site's sizes and prices come from; see VARIANT_KEYS."""
+
+    def __init__(self, where, spec):
+        _check_keys(where, spec, VARIANT_KEYS)
+        self.strategy = spec.get("strategy", "none")
+        if self.strategy not in STRATEGIES:
+            raise SpecError(f"{where}: strategy must be one of {STRATEGIES}")
+        self.select = spec.get("select")
+        self.skip_text = spec.get("skip_text")
+        group = spec.get("group")
+        self.group = None
+        if group is not None:
+            self.group = (_compile_css(where, group["css"]), _compile_css(where, group["label"]), group["contains"].lower())
+            self.group_css = group["css"]
+        self.options = _compile_css(where, spec["options"]) if spec.get("options") else None
+        self.target = spec.get("target", "id")
+        self.click = Action(f"{where}.click", spec["click"]) if spec.get("click") else None
+        self.items_css = spec.get("items")
+        self.items = _compile_css(where, self.items_css) if self.items_css else None
+        self.dedupe = spec.get("dedupe", "size")
+        # An item without a size (or a price, unless the rule has a default) is skipped
+        self.size = Field(f"{where}.size", spec.get("size", {}), default=None)
+        price = spec.get("price")
+        self.price = Field(f"{where}.price", price, default=None) if price is not None else None
+        self.price_selectors = spec.get("price_selectors", [])
+        self.strip_text = spec.get("strip_text", True)
+        self.retries = spec.get("retries", 1)
+        self.price_remove = _compile_regex(where, spec.get("price_remove"))
+        self.missing = Field(f"{where}.missing", spec["missing"]) if spec.get("missing") else None
+        self.empty = spec.get("empty")
+        required = {"select": ["select", "price_selectors"], "click": ["group", "options", "price_selectors"],
+                    "reveal": ["click", "items"], "static": ["items"]}.get(self.strategy, [])
+        missing = [key for key in required if not spec.get(key)]
+        if missing:
+            raise SpecError(f"{where}: strategy {self.strategy!r} needs {missing}")
+
+    def roots(self):
+        roots = []
+        if self.group is not None:
+            roots.append(self.group_css)
+        if self.items_css:
+            roots.append(self.items_css)
+        if self.missing is not None:
+            roots += self.missing.roots()
+        return roots
+
+    ################### PARSED PAGE ######################
+
+    def swatches(self, soup):
+        # (size, target) of every option in the option groups, and whether the page has a group at all
+        found, swatches = False, []
+        groups, label, word = self.group
+        for group in groups.select(soup):
+            legend = label.select_one(group)
+            if legend is not None and word in legend.get_text(strip=True).lower():
+                found = True
+                for option in self.options.select(group):
+                    target = option.get(self.target)
+                    if target:
+                        swatches.append((self.size.extract(option), target))
+        return found, swatches
+
+    def item_prices(self, soup) -> list:
+        # (size, price) of every item; items without a size (or a price, when it has no default) are skipped
+        pairs, seen = [], {}
+        for item in self.items.select(soup):
+            size = self.size.extract(item)
+            price = self.price.extract(item) if self.price is not None else "N/A"
+            if size is None or price is None:
+                continue
+            if self.dedupe == "pair":
+                if (size, price) not in seen:
+                    seen[(size, price)] = True
+                    pairs.append((size, price))
+            else:
+                seen[size] = price
+        return pairs if self.dedupe == "pair" else list(seen.items())
+
+    def clean_price(self, price):
+        # A price read from the live page; None (never read) is "Error"
+        if price is None:
+            return "Error"
+        if not price:
+            return "N/A"
+        return self.price_remove.sub("", price).strip() if self.price_remove is not None else price
+
+
+class Discovery:
+    """How product URLs are found on a site's collection and listing pages; see DISCOVERY_KEYS."""
+
+    def __init__(self, where, spec):
+        _check_keys(where, spec, DISCOVERY_KEYS)
+        self.feed = spec.get("feed")
+        if self.feed not in (None, "shopify"):
+            raise SpecError(f"{where}: feed must be 'shopify'")
+        self.links = _compile_css(where, spec.get("links", "a[href]"))
+        self.product_pattern = _compile_regex(where, spec.get("product_pattern", r"/products/[^/?#]+"))
+        self.next = _compile_css(where, spec.get("next", "a[rel~='next']"))
+        self.page_param = spec.get("page_param")
+
+
+class Probe:
+    """What the page-shape probe reads off a freshly loaded page (site_engine.probe_page): error and
+    sold-out markers, and the selectors the site's longer waits are for."""
+
+    def __init__(self, where, spec, site):
+        _check_keys(where, spec, PROBE_KEYS)
+        self.error_title = _compile_regex(where, spec.get("error_title", DEFAULT_ERROR_TITLE))
+        sold_out = spec.get("sold_out")
+        self.sold_out_css = sold_out["css"] if sold_out else None
+        if self.sold_out_css:
+            _compile_css(where, self.sold_out_css)
+        self.sold_out_text = _compile_regex(where, sold_out.get("text")) if sold_out else None
+        variants = site.variants
+        # The node the variant strategy starts from: ("css" | "xpath", selector), or None
+        self.picker = {
+            "select": ("css", variants.select),
+            "click": ("css", getattr(variants, "group_css", None)),
+            "reveal": ("xpath", variants.click.xpath if variants.click else None),
+        }.get(variants.strategy)
+        # Live image rules that wait for their selector
+        self.image_waits = [rule.css for rule in site.images.rules if rule.wait] if site.images.live else []
+        # The longest the page's fixed waits can take, saved in full when the page is an error page
+        clicks = site.actions + ([variants.click] if variants.click else [])
+        self.planned_s = (
+            (site.ready.get("timeout", 10) if site.ready else 0)
+            + sum(action.wait + (action.wait_for or {}).get("timeout", 10 if action.wait_for else 0) for action in clicks)
+            + sum(rule.wait for rule in site.images.rules if rule.wait and site.images.live)
+        )
+
+    def script_args(self) -> dict:
+        return {"picker": self.picker, "images": self.image_waits, "soldOut": self.sold_out_css}
+
+
+class Site:
+    """A compiled site spec."""
+
+    def __init__(self, spec):
+        name = spec.get("name")
+        if not name:
+            raise SpecError("a site spec needs a name")
+        _check_keys(name, spec, SPEC_KEYS)
+        self.name = name
+        self.hosts = [host.lower().removeprefix("www.") for host in spec.get("hosts", [])]
+        self.fast_path = spec.get("fast_path")
+        self.chrome_args = spec.get("chrome_args", [])
+        self.on_error = spec.get("on_error", "raise")
+        load = spec.get("load", {})
+        _check_keys(f"{name}.load", load, LOAD_KEYS)
+        self.scroll = load.get("scroll", False)
+        self.ready = load.get("ready")
+        self.settle = load.get("settle", False)
+        self.actions = [Action(f"{name}.load.actions[{i}]", action) for i, action in enumerate(load.get("actions", []))]
+        # Reject unknown fields now rather than on the first page
+        self.fields = {field: Field(f"{name}.fields.{field}", rule) for field, rule in spec.get("fields", {}).items()}
+        unknown = set(self.fields) - {"title", "description", "sku"}
+        if unknown:
+            raise SpecError(f"{name}.fields: unknown fields {sorted(unknown)}")
+        self.images = Field(f"{name}.images", spec.get("images", {"rules": []}))
+        self.variants = Variants(f"{name}.variants", spec.get("variants", {}))
+        self.discovery = Discovery(f"{name}.discovery", spec.get("discovery", {}))
+        self.budget = spec.get("budget")
+        self.probe = Probe(f"{name}.probe", spec.get("probe", {}), self)
+        self.soup_selectors = list(dict.fromkeys(
+            [root for field in self.fields.values() for root in field.roots()]
+            + self.images.roots() + self.variants.roots()
+        ))
+
+    def details(self, soup) -> dict:
+        # title, description and sku in that order (a rule can refer to earlier fields, like "{title}")
+        fields = {}
+        for field in ("title", "description", "sku"):
+            rule = self.fields.get(field)
+            fields[field] = rule.extract(soup, fields) if rule is not None else "N/A"
+        return fields
+
+    def __repr__(self):
+        return f"<Site {self.name} {self.variants.strategy}>"
+
+################### REGISTRY ######################
+
+class SiteRegistry:
+    """Compiled sites by host name. Lookups are dict hits on the host and its parent domains, then
+    on the prefixes mounted explicitly (see mount)."""
+
+    def __init__(self, specs=()):
+        self.sites = {}
+        self._hosts = {}
+        self._mounts = {}         # (host:port, first path segment) -> site
+        for spec in specs:
+            self.register(spec)
+
+    def register(self, spec):
+        site = spec if isinstance(spec, Site) else Site(spec)
+        self.sites[site.name] = site
+        for host in site.hosts:
+            self._hosts[host] = site
+        return site
+
+    def mount(self, prefix: str, name: str):
+        # Dispatches URLs under prefix ("http://127.0.0.1:8000/hypefly") to a site, for fixture
+        # servers and proxies that serve several stores from one host
+        parsed = urlparse(prefix)
+        self._mounts[(parsed.netloc.lower(), parsed.path.strip("/"))] = self.sites[name]
+
+    def load_dir(self, path=SITE_SPEC_DIR):
+        for file in sorted(glob.glob(os.path.join(path, "*.json"))):
+            with open(file, encoding="utf-8") as f:
+                self.register(json.load(f))
+
+    def lookup(self, url: str):
+        parsed = urlparse(url)
+        labels = (parsed.hostname or "").lower().removeprefix("www.").split(".")
+        for start in range(len(labels) - 1):
+            site = self._hosts.get(".".join(labels[start:]))
+            if site is not None:
+                return site
+        if self._mounts:
+            return self._mounts.get((parsed.netloc.lower(), parsed.path.strip("/").split("/", 1)[0]))
+        return None
+
+    def __getitem__(self, name) -> Site:
+        return self.sites[name]
+
+    def __iter__(self):
+        return iter(self.sites.values())
+
+
+SITES = SiteRegistry(SITE_SPECS)
+SITES.load_dir()
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+from benchmarks.fixture_server import mount_sites, serve, site_routes, site_urls
+from rate_limiter import RATE_LIMITER
+
+# The scraped rows the saved pages in benchmarks/pages/ are built from
+RECORDED_CSV = "DATA_ANALYSIS_1.csv"
+
+
+@pytest.fixture(scope="session")
+def recorded():
+    return pd.read_csv(RECORDED_CSV, keep_default_na=False)
+
+
+@pytest.fixture
+def no_rate_limit():
+    # The fixture server is local: politeness delays would only slow the tests down
+    enabled, RATE_LIMITER.enabled = RATE_LIMITER.enabled, False
+    yield
+    RATE_LIMITER.enabled = enabled
+
+
+@pytest.fixture(scope="session")
+def site_server():
+    # The recorded product pages and Shopify product JSON of the four stores, dispatched like live URLs
+    with serve(site_routes()) as server:
+        mount_sites(server.base_url)
+        server.urls = site_urls(server.base_url, server.routes)
+        yield server
@@ -0,0 +1,44 @@
+import pandas as pd
+from main import build_best_price_table, mark_best_prices
+from normalize import normalize_frame
+
+
+def offers(rows):
+    # One product's (size, price, source) rows as the output sink hands them to write_outputs
+    df = pd.DataFrame(rows, columns=["size", "price", "source"])
+    df = df.assign(product_no=1, title="Dunk Low", url="https://example.com/dunk", description="N/A", sku="N/A", images="N/A")
+    return mark_best_prices(normalize_frame(df))
+
+
+def test_sizes_in_other_systems_compete():
+    marked = offers([("UK 8", "Rs. 10,000", "Mainstreet"), ("US 9", "Rs. 9,000", "Hypefly"), ("EU 42.5", "Rs. 9,500", "Crepdogcrew")])
+    assert marked["is_best_price"].tolist() == [False, True, False]
+    table = build_best_price_table(marked)
+    assert len(table) == 1
+    assert table.iloc[0][["Mainstreet_price", "Hypefly_price", "Crepdogcrew_price"]].tolist() == ["Rs. 10,000", "Rs. 9,000", "Rs. 9,500"]
+
+
+def test_sizes_sharing_a_uk_size_stay_apart():
+    # EU 39 and EU 40 both convert to UK 6
+    marked = offers([("EU 39", "Rs. 9,000", "Mainstreet"), ("EU 40", "Rs. 8,000", "Mainstreet"), ("UK 6", "Rs. 8,500", "Hypefly")])
+    assert marked["is_best_price"].all()
+    table = build_best_price_table(marked)
+    assert table["size"].tolist() == ["EU 39", "EU 40", "UK 6"]
+    assert table["best_price"].tolist() == ["Rs. 9,000", "Rs. 8,000", "Rs. 8,500"]
+
+
+def test_one_store_two_labels_of_one_size_stay_apart():
+    marked = offers([("UK 8", "Rs. 10,000", "Mainstreet"), ("US 9", "Rs. 9,000", "Mainstreet"), ("UK 8", "Rs. 9,500", "Hypefly")])
+    table = build_best_price_table(marked)
+    assert table["size"].tolist() == ["US 9", "UK 8"]
+    assert table.set_index("size").loc["UK 8", "Mainstreet_price"] == "Rs. 10,000"
+
+
+def test_qualified_labels_compare_by_label():
+    marked = offers([("UK 5(GS)", "Rs. 7,000", "Mainstreet"), ("UK 5", "Rs. 9,000", "Hypefly")])
+    assert marked["is_best_price"].all()
+
+
+def test_other_currencies_never_win():
+    marked = offers([("UK 8", "$120", "Mainstreet"), ("UK 8", "Rs. 10,000", "Hypefly")])
+    assert marked["is_best_price"].tolist() == [False, True]
@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+from benchmarks.fixture_server import serve
+from images import ImageStore, split_image_urls
+
+pytest.importorskip("PIL")
+from benchmarks.bench_images import image_routes  # noqa: E402  (draws its stub images with Pillow)
+
+
+def test_split_image_urls_keeps_cdn_commas():
+    cell = "https://res.cloudinary.com/x/image/upload/w_400,h_400/a.jpg, //cdn.shopify.com/b.jpg, N/A"
+    assert split_image_urls(cell) == ["https://res.cloudinary.com/x/image/upload/w_400,h_400/a.jpg",
+                                      "https://cdn.shopify.com/b.jpg"]
+
+
+def test_store_keeps_one_image_per_photo(tmp_path):
+    # Each photo is served by three stores: the same JPEG twice and a smaller PNG of it
+    routes, cells = image_routes(3)
+    with serve(routes) as server:
+        urls = {key: server.base_url + path for key, path in cells.items()}
+        store = ImageStore(str(tmp_path), workers=4)
+        store.fetch_all(list(urls.values()))
+        ids = store.ids_for(pd.Series(list(urls.values())))
+        store.close()
+    per_photo = ids.groupby([number for number, _ in urls]).nunique()
+    assert (per_photo == 1).all()
+    assert ids.nunique() == 3
+    assert not ids.map(split_image_urls).map(len).any()
@@ -0,0 +1,62 @@
+import time
+import pytest
+from job_queue import JobQueue
+from orchestrator import domain_key
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite"), max_attempts=2, backoff_base=0.2, backoff_max=1.0, lease_seconds=0.2)
+    urls = ["https://marketplace.mainstreet.co.in/products/a", "https://marketplace.mainstreet.co.in/products/b",
+            "https://hypefly.co.in/products/a"]
+    for task, url in enumerate(urls):
+        queue.enqueue(task, url, task, domain_key(url))
+    yield queue
+    queue.close()
+
+
+def test_domain_keys_come_from_the_site_registry(site_server):
+    assert domain_key("https://www.culture-circle.com/products/all/dunk-low-panda") == "culture-circle"
+    assert domain_key(site_server.urls["hypefly"][0]) == "hypefly"
+    assert domain_key("https://example.com/mainstreet/products/x") == "example.com"
+
+
+def test_lease_takes_per_domain_rounds(queue):
+    assert [job.task for job in queue.lease(per_domain=1)] == [0, 2]
+    assert [job.task for job in queue.lease(per_domain=1)] == [1]
+    assert queue.lease(per_domain=1) == []
+
+
+def test_expired_lease_is_handed_out_again(queue):
+    first = queue.lease(per_domain=1)[0]
+    queue.lease(per_domain=1)
+    time.sleep(0.25)
+    again = [job for job in queue.lease(per_domain=1) if job.task == first.task]
+    assert again and again[0].attempts == 2
+
+
+def test_failure_backs_off_the_whole_domain(queue):
+    mainstreet, hypefly = queue.lease(per_domain=1)
+    queue.complete(hypefly)
+    assert queue.fail(mainstreet, "TimeoutError: page load", phase="page_load")
+    # The other mainstreet job waits out the backoff too
+    assert queue.lease(per_domain=1) == []
+    assert 0 < queue.next_due() <= 0.25
+    time.sleep(0.3)
+    retried = queue.lease(per_domain=2)
+    assert [job.task for job in retried] == [0, 1]
+    assert retried[0].attempts == 2
+    for job in retried:
+        queue.complete(job)
+    assert queue.counts()["done"] == 3
+
+
+def test_used_up_attempts_are_dead_lettered(queue):
+    for attempt in range(2):
+        job = next(job for job in queue.lease(per_domain=1) if job.task == 2)
+        retried = queue.fail(job, ValueError("no rows"), phase="parse")
+        time.sleep(0.3)
+    assert not retried
+    dead = queue.dead_letters()
+    assert [(letter["task"], letter["attempts"], letter["phase"]) for letter in dead] == [(2, 2, "parse")]
+    assert queue.counts()["dead"] == 1
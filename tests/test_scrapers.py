@@ -0,0 +1,42 @@
+import pytest
+from benchmarks.fixture_server import serve
+from benchmarks.saved_pages import handle_of, load_pages, size_rows_of
+from html_parser import make_soup
+from main import ScrapeTask, call_scraper, sink_rows
+from shopify_fast_path import scrape_with_fast_path
+from site_spec import SITES
+
+COLUMNS = ["title", "size", "price", "description", "sku", "images"]
+
+
+def recorded_rows(recorded, site, handle):
+    return recorded[(recorded["source"].str.lower() == site) & (recorded["url"].map(handle_of) == handle)]
+
+
+@pytest.mark.parametrize("site", ["mainstreet", "crepdogcrew", "culture-circle"])
+def test_fast_paths_reproduce_recorded_rows(site, site_server, recorded, no_rate_limit):
+    # call_scraper takes the browserless path for these stores (Shopify JSON, embedded state)
+    for url in site_server.urls[site]:
+        rows = sink_rows(ScrapeTask(0, site, url), call_scraper(url))
+        expected = recorded_rows(recorded, site, handle_of(url))
+        assert rows[COLUMNS].astype(str).values.tolist() == expected[COLUMNS].astype(str).values.tolist()
+
+
+def test_shopify_fast_path_falls_back_to_the_browser(site_server, no_rate_limit):
+    # Without the product JSON the fast path fails and the browser scraper gets the URL
+    pages = {path: route for path, route in site_server.routes.items() if not path.endswith(".js")}
+    with serve(pages) as server:
+        url = server.base_url + "/mainstreet/products/" + handle_of(site_server.urls["mainstreet"][0])
+        assert scrape_with_fast_path(url, lambda url: ("browser", url), store="mainstreet") == ("browser", url)
+
+
+@pytest.mark.parametrize("site", [site.name for site in SITES if site.name in ("mainstreet", "crepdogcrew", "hypefly", "culture-circle")])
+def test_site_specs_parse_saved_pages(site, recorded):
+    # The browser path's parse step, on the saved pages without a browser
+    spec = SITES[site]
+    for handle, page in load_pages(site).items():
+        soup = make_soup(page, site)
+        expected = recorded_rows(recorded, site, handle)
+        assert spec.details(soup) == expected.iloc[0][["title", "description", "sku"]].to_dict()
+        if spec.variants.strategy in ("reveal", "static"):
+            assert spec.variants.item_prices(soup) == size_rows_of(expected)
@@ -0,0 +1,226 @@
+################### IMPORTS ######################
+
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+################### SETTINGS ######################
+
+# Spans are written here as JSON lines, relative to the run's output directory; unset disables the export
+TRACE_FILE = os.environ.get("TRACE_FILE")
+# Durations kept per (site, phase) for the p95; counts and totals cover every span
+RESERVOIR_SIZE = 1024
+# Serve Prometheus-style text on this port while the run is going; unset disables it
+METRICS_PORT = os.environ.get("METRICS_PORT")
+
+################### SPANS ######################
+
+class PhaseStats:
+    """Count, total and a uniform reservoir sample of one (site, phase)'s durations."""
+    __slots__ = ("count", "total_ms", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.samples = []
+
+    def add(self, duration_ms):
+        self.count += 1
+        self.total_ms += duration_ms
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(duration_ms)
+            return
+        slot = random.randrange(self.count)
+        if slot < RESERVOIR_SIZE:
+            self.samples[slot] = duration_ms
+
+    def percentile(self, q) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] if ordered else 0.0
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "started_at", "duration_ms", "outcome")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.outcome = "ok"
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        record = {
+            "phase": self.name,
+            "site": self.attrs.get("site", "unknown"),
+            "url": self.attrs.get("url"),
+            "started_at": round(self.started_at, 3),
+            "duration_ms": round(self.duration_ms, 2),
+            "outcome": self.outcome,
+        }
+        record.update({k: v for k, v in self.attrs.items() if k not in ("site", "url")})
+        return record
+
+
+class Tracer:
+    """Times pipeline phases and keeps per-(site, phase) aggregates for reports and metrics."""
+
+    def __init__(self, path=None):
+        self.path = path
+        # Open spans per thread or asyncio task; nested spans inherit their attributes (site, url)
+        self._spans = contextvars.ContextVar(f"spans_{id(self)}", default=())
+        # (phase, exception) of the innermost span that raised most recently in this context
+        self._failure = contextvars.ContextVar(f"failure_{id(self)}", default=None)
+        self._lock = threading.Lock()
+        self._file = None
+        self.phases = defaultdict(PhaseStats)  # (site, phase) -> PhaseStats
+        self.outcomes = defaultdict(int)      # (site, phase, outcome) -> count
+
+    def export(self, path):
+        # Write this run's spans to path, replacing what an earlier run left there
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self.path = path
+            self._file = open(path, "w", encoding="utf-8") if path else None
+
+    def current(self):
+        stack = self._spans.get()
+        return stack[-1] if stack else None
+
+    def last_failure(self):
+        # Where the last exception in this thread or task was raised, even if the caller caught it
+        return self._failure.get()
+
+    def clear_failure(self):
+        self._failure.set(None)
+
+    def start(self, name, **attrs) -> Span:
+        parent = self.current()
+        merged = {k: v for k, v in parent.attrs.items() if k in ("site", "url")} if parent else {}
+        merged.update(attrs)
+        span = Span(name, merged)
+        self._spans.set(self._spans.get() + (span,))
+        return span
+
+    def finish(self, span, outcome=None, **attrs):
+        span.duration_ms = (time.perf_counter() - span.start) * 1000
+        if outcome is not None:
+            span.outcome = outcome
+        span.attrs.update(attrs)
+        # Children left open by an exception are dropped along with this span
+        stack = self._spans.get()
+        if span in stack:
+            self._spans.set(stack[:stack.index(span)])
+        self._record(span)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        span = self.start(name, **attrs)
+        try:
+            yield span
+        except Exception as e:
+            span.outcome = "error"
+            span.set(error=type(e).__name__)
+            failure = self._failure.get()
+            if failure is None or failure[1] is not e:
+                self._failure.set((name, e))
+            raise
+        finally:
+            self.finish(span)
+
+    def _record(self, span):
+        record = span.to_dict()
+        with self._lock:
+            self.phases[(record["site"], span.name)].add(span.duration_ms)
+            self.outcomes[(record["site"], span.name, span.outcome)] += 1
+            if self.path:
+                if self._file is None:
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                self._file.flush()
+
+    ################### REPORTS ######################
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP scraper_phase_seconds Time spent per pipeline phase",
+            "# TYPE scraper_phase_seconds summary",
+        ]
+        with self._lock:
+            totals = {key: (stats.total_ms, stats.count) for key, stats in self.phases.items()}
+            outcomes = dict(self.outcomes)
+        for (site, phase), (total_ms, count) in sorted(totals.items()):
+            labels = f'site="{site}",phase="{phase}"'
+            lines.append(f"scraper_phase_seconds_sum{{{labels}}} {total_ms / 1000:.6f}")
+            lines.append(f"scraper_phase_seconds_count{{{labels}}} {count}")
+        lines.append("# HELP scraper_phase_total Finished phases by outcome")
+        lines.append("# TYPE scraper_phase_total counter")
+        for (site, phase, outcome), count in sorted(outcomes.items()):
+            lines.append(f'scraper_phase_total{{site="{site}",phase="{phase}",outcome="{outcome}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self, top=3) -> dict:
+        # Slowest phases per site by total time, with count and p95
+        with self._lock:
+            phases = {key: (stats.total_ms, stats.count, stats.percentile(0.95)) for key, stats in self.phases.items()}
+        by_site = defaultdict(list)
+        for (site, phase), (total_ms, count, p95) in phases.items():
+            by_site[site].append({
+                "phase": phase,
+                "total_s": round(total_ms / 1000, 2),
+                "count": count,
+                "p95_ms": round(p95, 1),
+            })
+        return {site: sorted(phases, key=lambda p: p["total_s"], reverse=True)[:top] for site, phases in by_site.items()}
+
+    def print_summary(self, top=3):
+        print("\nSlowest phases per site:")
+        for site, phases in sorted(self.summary(top).items()):
+            print(f"  {site}:")
+            for phase in phases:
+                print(f"    {phase['phase']:<20} {phase['total_s']:>8.2f}s total  {phase['count']:>4}x  p95 {phase['p95_ms']:.0f}ms")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+################### METRICS ENDPOINT ######################
+
+def start_metrics_server(tracer, port: int, host="127.0.0.1", extra=()):
+    # extra: more objects with a prometheus_text() method, appended to the tracer's metrics
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = "".join(source.prometheus_text() for source in (tracer, *extra)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+TRACER = Tracer()
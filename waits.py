@@ -0,0 +1,212 @@
+################### IMPORTS ######################
+
+import asyncio
+import logging
+import time
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from deadlines import BUDGETS
+
+logger = logging.getLogger(__name__)
+
+################### IN-PAGE PROBES ######################
+
+# Installs a MutationObserver once per document and returns the milliseconds since the last DOM change
+DOM_QUIET_SCRIPT = """
+if (window.__waitsLastMutation === undefined) {
+    window.__waitsLastMutation = performance.now();
+    new MutationObserver(function () { window.__waitsLastMutation = performance.now(); })
+        .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+}
+if (arguments[0]) { window.__waitsLastMutation = performance.now(); }
+return performance.now() - window.__waitsLastMutation;
+"""
+
+# Document state plus the number of resources fetched so far
+NETWORK_SCRIPT = """
+return [document.readyState, performance.getEntriesByType('resource').length];
+"""
+
+HEIGHT_SCRIPT = "return document.body.scrollHeight"
+
+################### WAIT ENGINE ######################
+
+def wait_until(driver, condition, timeout=10, poll=0.1, label="condition", required=True):
+    # Polls condition(driver) until it returns something truthy, logging how long it took.
+    # Non-required waits return None on timeout instead of raising. The timeout is capped by
+    # the page's deadline (deadlines.BUDGETS); a required wait with no time left raises at once.
+    timeout = BUDGETS.timeout(timeout, label, required)
+    start = time.monotonic()
+    outcome = "ok"
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=poll).until(condition)
+    except TimeoutException:
+        outcome = "timeout"
+        if required:
+            raise
+        return None
+    finally:
+        logger.info("waited %.2fs for %s (%s, timeout %.1fs)", time.monotonic() - start, label, outcome, timeout)
+
+
+def mark_dom(driver):
+    # Restart the quiet timer, e.g. right before clicking something that re-renders the page
+    driver.execute_script(DOM_QUIET_SCRIPT, True)
+
+
+def dom_quiet(quiet_ms=500):
+    def condition(driver):
+        return driver.execute_script(DOM_QUIET_SCRIPT, False) >= quiet_ms
+    return condition
+
+
+def network_idle(idle_ms=500):
+    # Idle once the document is loaded and no new resource entries appeared for idle_ms
+    state = {"count": -1, "since": time.monotonic()}
+
+    def condition(driver):
+        ready_state, count = driver.execute_script(NETWORK_SCRIPT)
+        now = time.monotonic()
+        if ready_state != "complete" or count != state["count"]:
+            state["count"], state["since"] = count, now
+            return False
+        return (now - state["since"]) * 1000 >= idle_ms
+    return condition
+
+
+def wait_for_dom_quiet(driver, quiet_ms=500, timeout=10):
+    return wait_until(driver, dom_quiet(quiet_ms), timeout, label=f"DOM quiet {quiet_ms}ms", required=False) is not None
+
+
+def wait_for_network_idle(driver, idle_ms=500, timeout=10):
+    return wait_until(driver, network_idle(idle_ms), timeout, label=f"network idle {idle_ms}ms", required=False) is not None
+
+
+def wait_for_page_settled(driver, quiet_ms=500, timeout=10):
+    # Network idle and no DOM mutations, sharing one time budget
+    deadline = time.monotonic() + timeout
+    wait_for_network_idle(driver, quiet_ms, timeout)
+    return wait_for_dom_quiet(driver, quiet_ms, max(0.1, deadline - time.monotonic()))
+
+
+def scroll_to_bottom(driver, timeout=30, settle_ms=500, step_timeout=5):
+    # Scroll until the page stops growing; each step waits for new content or for the page to settle
+    timeout = BUDGETS.timeout(timeout, "scroll")
+    start = time.monotonic()
+    last_height = driver.execute_script(HEIGHT_SCRIPT)
+    steps = 0
+    while time.monotonic() - start < timeout:
+        mark_dom(driver)
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        steps += 1
+        quiet = dom_quiet(settle_ms)
+        wait_until(
+            driver,
+            lambda d: d.execute_script(HEIGHT_SCRIPT) > last_height or quiet(d),
+            min(step_timeout, max(0.1, timeout - (time.monotonic() - start))),
+            label="scroll step",
+            required=False,
+        )
+        new_height = driver.execute_script(HEIGHT_SCRIPT)
+        if new_height == last_height:
+            break
+        last_height = new_height
+    logger.info("scrolled to bottom in %.2fs (%d steps)", time.monotonic() - start, steps)
+
+
+def wait_for_elements(driver, css_selector, timeout=10):
+    return wait_until(
+        driver,
+        lambda d: d.find_elements(By.CSS_SELECTOR, css_selector),
+        timeout,
+        label=f"elements {css_selector}",
+        required=False,
+    ) or []
+
+################### TAB WAITS ######################
+
+# The same probes awaited on a DevTools tab (devtools.Tab) instead of polled through WebDriverWait
+
+async def tab_wait_until(tab, condition, timeout=10, poll=0.1, label="condition"):
+    # Awaits condition(tab) until it returns something truthy; None on timeout
+    timeout = BUDGETS.timeout(timeout, label)
+    start = time.monotonic()
+    outcome = "timeout"
+    try:
+        while True:
+            value = await condition(tab)
+            if value:
+                outcome = "ok"
+                return value
+            if time.monotonic() - start >= timeout:
+                return None
+            await asyncio.sleep(poll)
+    finally:
+        logger.info("waited %.2fs for %s (%s, timeout %.1fs)", time.monotonic() - start, label, outcome, timeout)
+
+
+async def tab_mark_dom(tab):
+    await tab.execute_script(DOM_QUIET_SCRIPT, True)
+
+
+def tab_dom_quiet(quiet_ms=500):
+    async def condition(tab):
+        return await tab.execute_script(DOM_QUIET_SCRIPT, False) >= quiet_ms
+    return condition
+
+
+def tab_network_idle(idle_ms=500):
+    state = {"count": -1, "since": time.monotonic()}
+
+    async def condition(tab):
+        ready_state, count = await tab.execute_script(NETWORK_SCRIPT)
+        now = time.monotonic()
+        if ready_state != "complete" or count != state["count"]:
+            state["count"], state["since"] = count, now
+            return False
+        return (now - state["since"]) * 1000 >= idle_ms
+    return condition
+
+
+async def wait_for_tab_dom_quiet(tab, quiet_ms=500, timeout=10):
+    return await tab_wait_until(tab, tab_dom_quiet(quiet_ms), timeout, label=f"DOM quiet {quiet_ms}ms") is not None
+
+
+async def wait_for_tab_settled(tab, quiet_ms=500, timeout=10):
+    deadline = time.monotonic() + timeout
+    await tab_wait_until(tab, tab_network_idle(quiet_ms), timeout, label=f"network idle {quiet_ms}ms")
+    return await wait_for_tab_dom_quiet(tab, quiet_ms, max(0.1, deadline - time.monotonic()))
+
+
+async def wait_for_tab_elements(tab, css_selector, timeout=10):
+    async def condition(tab):
+        return await tab.execute_script("return document.querySelectorAll(arguments[0]).length;", css_selector)
+    return await tab_wait_until(tab, condition, timeout, label=f"elements {css_selector}") or 0
+
+
+async def scroll_tab_to_bottom(tab, timeout=30, settle_ms=500, step_timeout=5):
+    timeout = BUDGETS.timeout(timeout, "scroll")
+    start = time.monotonic()
+    last_height = await tab.execute_script(HEIGHT_SCRIPT)
+    steps = 0
+    while time.monotonic() - start < timeout:
+        await tab_mark_dom(tab)
+        await tab.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        steps += 1
+        quiet = tab_dom_quiet(settle_ms)
+
+        async def grown_or_quiet(tab):
+            return await tab.execute_script(HEIGHT_SCRIPT) > last_height or await quiet(tab)
+
+        await tab_wait_until(
+            tab,
+            grown_or_quiet,
+            min(step_timeout, max(0.1, timeout - (time.monotonic() - start))),
+            label="scroll step",
+        )
+        new_height = await tab.execute_script(HEIGHT_SCRIPT)
+        if new_height == last_height:
+            break
+        last_height = new_height
+    logger.info("scrolled to bottom in %.2fs (%d steps)", time.monotonic() - start, steps)